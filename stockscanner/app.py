@@ -1,7 +1,7 @@
 import logging
 
 from stockscanner.model.config import Config
-from stockscanner.model.watchers.index_watcher import IndexWatcher
+from stockscanner.model.watchers.watch_scheduler import WatchScheduler
 from stockscanner.model.watchers.change_watcher import ChangeWatcher
 
 
@@ -14,10 +14,9 @@ logger.info("Reading the configuration")
 config = Config.load_config()
 
 # init app
-index_watcher = IndexWatcher(ticker="NIFTY 50", watch_freq=config["watch_freq"], db=config["db"],
-                             hist_start_year=config["hist_start_year"])
-logger.info("staring the index watcher")
-index_watcher.start()
+watch_scheduler = WatchScheduler.from_config(config)
+logger.info(f"staring the index watchers for {config.get('tickers', ['NIFTY 50'])}")
+watch_scheduler.start()
 
 change_watcher = ChangeWatcher()
 change_watcher.start()
\ No newline at end of file
@@ -1,23 +1,54 @@
 # Run this module to back a strategies that you have coded against historical data
+import argparse
+
 from stockscanner.model.config import Config
+from stockscanner.model.reporting.report import compare
+from stockscanner.model.strategies.parallel_runner import ParallelBacktestRunner
 from stockscanner.model.strategies.strategy_manager import StrategyManager
 import matplotlib.pyplot as plt
 
-config = Config.load_config()
 
-sm: StrategyManager = StrategyManager.get_instance()
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="run the backtests on this many processes sharing one loaded dataset")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time spent per stage (DAO reads, valuations, rebalances, weights) and the "
+                             "peak memory of every backtest. Runs them in this process")
+    parser.add_argument("--cprofile", metavar="TEST_NAME", default=None,
+                        help="also run this backtest under cProfile and dump its stats")
+    parser.add_argument("--cprofile-output", default=None, help="stats file for --cprofile (default TEST_NAME.prof)")
+    args = parser.parse_args()
+
+    config = Config.load_config()
+
+    strategy_configs = config["backtest"]
+    if args.workers > 1 and not (args.profile or args.cprofile):
+        reports = ParallelBacktestRunner(config, max_workers=args.workers).run(strategy_configs)
+    else:
+        sm: StrategyManager = StrategyManager.get_instance()
+        sm.profile = args.profile
+        reports = {}
+        for strategy_config in strategy_configs:
+            test_name = strategy_config["test_name"]
+            cprofile_output = None
+            if test_name == args.cprofile:
+                cprofile_output = args.cprofile_output or f"{test_name}.prof"
+            report = sm.back_test_strategy(strategy_config, cprofile_output=cprofile_output)
+            reports[test_name] = report
+        for result in sm.profiles.values():
+            print(result.format())
+
+    print(compare(reports).to_string())
+
+    legend = []
+    for test_name, report in reports.items():
+        plt.scatter(report.get_dates(), report.get_values())
+        legend.append(test_name)
 
-strategy_configs = config["backtest"]
-reports = {}
-for strategy_config in strategy_configs:
-    test_name = strategy_config["test_name"]
-    report = sm.back_test_strategy(strategy_config)
-    reports[test_name] = report
+    plt.legend(legend)
+    plt.show()
 
-legend = []
-for test_name, report in reports.items():
-    plt.scatter(*zip(*report.performance))
-    legend.append(test_name)
 
-plt.legend(legend)
-plt.show()
+if __name__ == '__main__':
+    main()
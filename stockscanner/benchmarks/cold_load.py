@@ -0,0 +1,68 @@
+# Cold load time of a symbol's OHLC + PE frames from the csv files, the sqlite db and a snapshot.
+# Every measurement runs in a fresh interpreter so nothing is cached in memory.
+# Run from a directory containing config.json, the csv files and data.db:  python -m stockscanner.benchmarks.cold_load
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+LOADERS = {
+    "csv": """
+from stockscanner.persistence.fs.fs_impl import TickerFileSystemDB
+def load():
+    dao = TickerFileSystemDB()
+    return dao.read_all_data(SYMBOL), dao.read_all_pe_data(SYMBOL)
+""",
+    "sqlite": """
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+def load():
+    dao = SqliteTickerDaoImpl()
+    return dao.read_all_data(SYMBOL), dao.read_all_pe_data(SYMBOL)
+""",
+    "snapshot": """
+from stockscanner.persistence.snapshot import Snapshot
+def load():
+    snapshot = Snapshot.load(SNAPSHOT)
+    return snapshot.frames[(SYMBOL, "ohlc")], snapshot.frames[(SYMBOL, "pe")]
+""",
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+df, df_pe = load()
+print(time.perf_counter() - start, len(df) + len(df_pe))
+"""
+
+
+def measure(kind, symbol, snapshot_path):
+    code = f"SYMBOL = {symbol!r}\nSNAPSHOT = {snapshot_path!r}\n" + LOADERS[kind] + TIMER
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    elapsed, rows = out.split()[-2:]
+    return float(elapsed), int(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbol", default="NIFTY 50")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from stockscanner.persistence.snapshot import Snapshot, get_size
+    from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "data.snapshot")
+        Snapshot.from_dao(SqliteTickerDaoImpl(), [args.symbol]).save(snapshot_path)
+        print(f"snapshot: {get_size(snapshot_path)} bytes")
+        for kind in LOADERS:
+            runs = [measure(kind, args.symbol, snapshot_path) for _ in range(args.repeat)]
+            times = [t for t, _ in runs]
+            print(f"{kind:<10} {runs[0][1]:>8} rows  median {statistics.median(times) * 1000:8.2f} ms  "
+                  f"min {min(times) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
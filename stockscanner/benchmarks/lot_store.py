@@ -0,0 +1,86 @@
+# Memory and throughput of the open lot store at 100k lots, against the list of Entry objects it replaced.
+# Appends n lots, sells them off FIFO in chunks of 1.5 lots and asks for the cost basis along the way.
+#   python -m stockscanner.benchmarks.lot_store [--lots 100000]
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from stockscanner.model.asset.holding import Entry
+from stockscanner.model.asset.lots import LotStore
+
+
+class EntryList:
+    # the previous layout: Entry objects in a list, consumed with pop(0)
+    def __init__(self) -> None:
+        self.history = []
+
+    def append(self, d, quantity, price):
+        self.history.append(Entry(d, quantity, price))
+
+    def consume(self, quantity):
+        cost = 0
+        while quantity > 0 and self.history:
+            lot = self.history[0]
+            if quantity >= lot.quantity:
+                self.history.pop(0)
+                cost += lot.quantity * lot.price
+                quantity -= lot.quantity
+            else:
+                lot.quantity -= quantity
+                cost += quantity * lot.price
+                quantity = 0
+        return cost
+
+    def cost_basis(self):
+        return sum(lot.quantity * lot.price for lot in self.history)
+
+
+STORES = {"entry_list": EntryList, "lot_store": LotStore}
+
+
+def lots(n):
+    start = date(2000, 1, 1)
+    return [(start + timedelta(days=i // 4), 1.0 + (i % 7) * 0.25, 100.0 + (i % 101)) for i in range(n)]
+
+
+def run(factory, rows, queries):
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = factory()
+    for d, quantity, price in rows:
+        store.append(d, quantity, price)
+    appended = time.perf_counter()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total = sum(quantity for _, quantity, _ in rows)
+    chunk = total / len(rows) * 1.5
+    every = max(len(rows) // queries, 1)
+    sells = 0
+    while total > chunk:
+        store.consume(chunk)
+        total -= chunk
+        sells += 1
+        if sells % every == 0:
+            store.cost_basis()
+    done = time.perf_counter()
+    return {"memory": memory, "append": appended - start, "consume": done - appended, "sells": sells}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lots", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = lots(args.lots)
+    for name, factory in STORES.items():
+        result = run(factory, rows, args.queries)
+        print(f"{name:<12} {args.lots} lots  memory {result['memory'] / 1024 / 1024:7.2f} MB  "
+              f"append {args.lots / result['append']:>11,.0f} lots/s  "
+              f"fifo {result['sells'] / result['consume']:>11,.0f} sells/s ({result['consume']:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# End to end ingestion throughput: IndexWatcher fetches the whole history of every symbol from a local NSE stand-in
+# (benchmarks/nse_server.py), parses it and persists it to a fresh sqlite db, once per concurrency setting.
+# Reports rows/sec and requests/sec for each.
+# Run from a directory containing config.json:
+#   python -m stockscanner.benchmarks.nse_ingest [--workers 1 2 4 8] [--latency 0.05] [--error-rate 0.02]
+#       [--throttle 50] [--years 15] [--symbols 2] [--output ingest.json]
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from stockscanner.benchmarks import synthetic
+from stockscanner.benchmarks.nse_server import NseStandIn
+from stockscanner.model.watchers.index_watcher import IndexWatcher
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+from stockscanner.utils import HttpUtils
+
+
+def write_config(base_config: dict, path: str, base_url: str, workers: int, requests_per_sec: float):
+    config = dict(base_config)
+    config["db"] = "sqlite3"
+    config["nse"] = {"base_url": base_url}
+    # one pooled connection per worker, so the pool is not what limits the concurrency
+    config["http"] = dict(base_config.get("http", {}), max_connections_per_host=workers)
+    config["downloader"] = dict(base_config.get("downloader", {}), workers=workers,
+                                requests_per_sec=requests_per_sec)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def count_rows(db_path: str, symbols) -> int:
+    con = sqlite3.connect(db_path)
+    try:
+        tables = {name for (name,) in con.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        names = [symbol.strip().replace(" ", "_") + suffix for symbol in symbols for suffix in ("_OHLC", "_PE")]
+        return sum(con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for name in names if name in tables)
+    finally:
+        con.close()
+
+
+def run_ingest(server: NseStandIn, symbols, hist_start_year: int, base_config: dict, workers: int,
+               requests_per_sec: float) -> dict:
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="stockscanner_ingest_")
+    try:
+        os.chdir(work_dir)
+        write_config(base_config, "config.json", server.url, workers, requests_per_sec)
+        # the shared session and the table cache are rebuilt against the new config and db
+        HttpUtils.SessionManager.reset()
+        SqliteTickerDaoImpl.data.clear()
+        before = server.get_stats()
+        failed = 0
+        start = time.perf_counter()
+        for symbol in symbols:
+            watcher = IndexWatcher(symbol, 60, "sqlite3", hist_start_year)
+            stats = watcher.download_historical_data()
+            failed += stats["failed"] if stats else 0
+            watcher.ticker_dao.close()
+        elapsed = time.perf_counter() - start
+        after = server.get_stats()
+        session = HttpUtils.SessionManager.get_instance().get_stats()
+        rows = count_rows(os.path.join(work_dir, "data.db"), symbols)
+    finally:
+        HttpUtils.SessionManager.reset()
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    served = {key: after[key] - before[key] for key in after}
+    return {
+        "workers": workers,
+        "elapsed": elapsed,
+        "rows": rows,
+        "requests": served["requests"],
+        "rows_per_sec": rows / elapsed,
+        "requests_per_sec": served["requests"] / elapsed,
+        "server_errors": served["errors"],
+        "throttled": served["throttled"],
+        "bytes": served["bytes"],
+        "failed_ranges": failed,
+        "connections_opened": session["connections_opened"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--symbols", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stand-in takes per response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle", type=float, default=None, help="requests/sec the stand-in allows")
+    parser.add_argument("--requests-per-sec", type=float, default=1000,
+                        help="client side budget (the downloader's requests_per_sec)")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--log-level", default="WARNING", help="the per range progress is logged at INFO")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    with open("config.json") as f:
+        base_config = json.load(f)
+    end = date.today() - timedelta(1)
+    dataset = {symbol: synthetic.generate_symbol(args.years, end=end, seed=i)
+               for i, symbol in enumerate(synthetic.symbols_for(args.symbols))}
+    symbols = list(dataset.keys())
+    hist_start_year = dataset[symbols[0]][0]['Date'].iloc[0].year
+    server = NseStandIn(dataset, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle=args.throttle).start()
+    results = []
+    try:
+        for workers in args.workers:
+            result = run_ingest(server, symbols, hist_start_year, base_config, workers, args.requests_per_sec)
+            results.append(result)
+            print(f"workers {workers:3d}: {result['rows']:8d} rows in {result['requests']:5d} requests, "
+                  f"{result['elapsed']:7.2f} s  {result['rows_per_sec']:10.0f} rows/s  "
+                  f"{result['requests_per_sec']:7.1f} req/s  ({result['server_errors']} errors, "
+                  f"{result['throttled']} throttled, {result['failed_ranges']} failed ranges)", file=sys.stderr)
+    finally:
+        server.stop()
+
+    out = json.dumps({
+        "meta": {"years": args.years, "symbols": args.symbols, "latency": args.latency, "jitter": args.jitter,
+                 "error_rate": args.error_rate, "throttle": args.throttle,
+                 "requests_per_sec": args.requests_per_sec},
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == '__main__':
+    main()
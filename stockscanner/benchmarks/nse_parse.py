@@ -0,0 +1,93 @@
+# Compares the BeautifulSoup + per row parsing path with nse_parser on a page shaped like the NSE
+# historicalindices.jsp response, built from the bundled NIFTY 50 history.
+# Run from the stockscanner directory:  python -m stockscanner.benchmarks.nse_parse
+import argparse
+import os
+import tempfile
+import time
+
+import bs4
+
+import stockscanner
+from stockscanner.model.watchers import nse_parser
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+
+SAMPLE_FILE = os.path.join(os.path.dirname(stockscanner.__file__), "NIFTY 50.csv")
+
+
+def load_sample(file_name=SAMPLE_FILE):
+    with open(file_name) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return lines[0], lines[1:]
+
+
+def render_page(headers, entries) -> str:
+    # the page carries the rows twice: as an html table and as the ':' separated csv in a hidden div
+    table_rows = []
+    for entry in entries:
+        cells = "".join(f"<td class=\"number\">{v.strip(chr(34)).strip()}</td>" for v in entry.split(","))
+        table_rows.append(f"<tr>{cells}</tr>")
+    header_cells = "".join(f"<th>{h.strip(chr(34))}</th>" for h in headers.split(","))
+    return (
+        "<html><head><title>Historical Data</title>"
+        "<script type=\"text/javascript\">var dataUrl = 'historicalindices.jsp';</script></head><body>"
+        "<table><tr><th colspan=\"7\" class=\"tablehead\">Historical Data</th></tr>"
+        f"<tr>{header_cells}</tr>{''.join(table_rows)}</table>"
+        "<div id='csvFileName' style='display:none'>data.csv</div>"
+        f"<div id='csvContentDiv' style='display:none'>{headers}:{':'.join(entries)}:</div>"
+        "</body></html>")
+
+
+def parse_with_soup(page):
+    soup = bs4.BeautifulSoup(page, "lxml")
+    lst = soup.find("div", {"id": "csvContentDiv"}).text.split(":")
+    lst.pop(0)
+    lst.pop()
+    return [SqliteTickerDaoImpl.parse_ohlc_entry(entry) for entry in lst], lst
+
+
+def parse_with_parser(page):
+    return nse_parser.parse_page(page, nse_parser.OHLC_COLUMNS)
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=None, help="rows of the last n years only (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    headers, entries = load_sample()
+    if args.years:
+        entries = entries[-250 * args.years:]
+    page = render_page(headers, entries)
+    print(f"{len(entries)} rows, page of {len(page) / 1024:.0f} KiB")
+
+    soup_time, (rows, lst) = timed(lambda: parse_with_soup(page), args.repeat)
+    parser_time, batch = timed(lambda: parse_with_parser(page), args.repeat)
+    assert len(batch) == len(rows)
+    print(f"{'bs4 + per row parsing':<32} {soup_time * 1000:9.1f} ms")
+    print(f"{'nse_parser':<32} {parser_time * 1000:9.1f} ms   ({soup_time / parser_time:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dao = SqliteTickerDaoImpl(db_path=os.path.join(tmp, "bench.db"))
+        save_many_time, _ = timed(lambda: dao.save_many("BENCH", lst), args.repeat)
+        save_frame_time, _ = timed(lambda: dao.save_frame("BENCH", batch.frame, batch.entries), args.repeat)
+        dao.close()
+    print(f"{'sqlite save_many(entries)':<32} {save_many_time * 1000:9.1f} ms")
+    print(f"{'sqlite save_frame(frame)':<32} {save_frame_time * 1000:9.1f} ms")
+    print(f"{'end to end, old path':<32} {(soup_time + save_many_time) * 1000:9.1f} ms")
+    print(f"{'end to end, new path':<32} {(parser_time + save_frame_time) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# Local stand-in for the NSE historicalindices.jsp and historical_pepb.jsp pages, serving synthetic data in the
+# csvContentDiv format. Latency, error rate and throttling are configurable, so the download pipeline can be
+# exercised and measured offline. Point "nse": {"base_url": ...} in config.json at the printed url.
+# Run:  python -m stockscanner.benchmarks.nse_server [--port 8080] [--latency 0.2] [--error-rate 0.05] [--throttle 5]
+import argparse
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.benchmarks import synthetic
+from stockscanner.benchmarks.nse_parse import render_page
+from stockscanner.utils import Constants
+from stockscanner.utils.RateLimitUtils import TokenBucket
+
+OHLC_HEADER = ",".join(f'"{h}"' for h in synthetic.FS_OHLC_HEADER)
+PE_HEADER = ",".join(f'"{h}"' for h in synthetic.FS_PE_HEADER)
+# NSE answers at most a year per request
+MAX_RANGE_DAYS = 365
+NO_RECORDS = "<html><body><div class='nodata'>No Records</div></body></html>"
+
+
+def format_entries(df: pd.DataFrame) -> List[str]:
+    # rows as NSE writes them: quoted, right aligned numbers
+    dates = df['Date'].dt.strftime("%d-%b-%Y").tolist()
+    columns = [df[c].tolist() for c in df.columns[1:]]
+    return ['"' + d + '",' + ",".join(f'"{v:12.2f}"' for v in values)
+            for d, *values in zip(dates, *columns)]
+
+
+class Table:
+    def __init__(self, headers: str, df: pd.DataFrame) -> None:
+        self.headers = headers
+        self.days = df['Date'].values.astype("datetime64[D]")
+        self.entries = format_entries(df)
+
+    def between(self, start_date: date, end_date: date) -> List[str]:
+        lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side="left")
+        hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side="right")
+        return self.entries[lo:hi]
+
+
+class NseStandIn:
+    """
+    Serves the two history pages for every symbol of a synthetic dataset on a ThreadingHTTPServer.
+    Every request sleeps latency (+ up to jitter) seconds. A share of them (error_rate) answers 500 and anything over
+    throttle requests/sec answers 429 with a Retry-After, like the real site under load.
+    """
+
+    def __init__(self, dataset: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]], host: str = "127.0.0.1",
+                 port: int = 0, latency: float = 0, jitter: float = 0, error_rate: float = 0,
+                 throttle: float = None, seed: int = 0) -> None:
+        self.ohlc = {symbol: Table(OHLC_HEADER, df) for symbol, (df, _) in dataset.items()}
+        self.pe = {symbol: Table(PE_HEADER, df_pe) for symbol, (_, df_pe) in dataset.items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = TokenBucket(throttle) if throttle else None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rows": 0, "bytes": 0, "errors": 0, "throttled": 0}
+        self.server = ThreadingHTTPServer((host, port), self.__handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    def __count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def respond(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, bytes]:
+        status, page = self.__respond(path, query)
+        body = page.encode()
+        self.__count("bytes", len(body))
+        return status, body
+
+    def __respond(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, str]:
+        self.__count("requests")
+        if self.latency or self.jitter:
+            with self.lock:
+                delay = self.latency + self.random.uniform(0, self.jitter)
+            time.sleep(delay)
+        if self.limiter and not self.limiter.try_acquire():
+            self.__count("throttled")
+            return 429, "Too Many Requests"
+        if self.error_rate:
+            with self.lock:
+                failed = self.random.random() < self.error_rate
+            if failed:
+                self.__count("errors")
+                return 500, "Internal Server Error"
+
+        if path == Constants.HISTORICAL_INDICES:
+            tables, symbol = self.ohlc, query.get("indexType", [""])[0]
+        elif path == Constants.HISTORICAL_PE_PB:
+            tables, symbol = self.pe, query.get("indexName", [""])[0]
+        else:
+            # the landing page, where the client picks up its cookies
+            return 200, "<html><body>NSE stand-in</body></html>"
+        try:
+            start_date = datetime.strptime(query["fromDate"][0], "%d-%m-%Y").date()
+            end_date = datetime.strptime(query["toDate"][0], "%d-%m-%Y").date()
+        except (KeyError, ValueError):
+            return 400, "Bad Request"
+        if symbol not in tables or (end_date - start_date).days >= MAX_RANGE_DAYS:
+            return 200, NO_RECORDS
+        entries = tables[symbol].between(start_date, end_date)
+        if len(entries) == 0:
+            return 200, NO_RECORDS
+        self.__count("rows", len(entries))
+        return 200, render_page(tables[symbol].headers, entries)
+
+    def __handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so the client's connection pool is exercised as it is against NSE
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, body = stand_in.respond(url.path, parse_qs(url.query))
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Set-Cookie", "nsit=standin; Path=/")
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--symbols", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0, help="up to this many more seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with a 500")
+    parser.add_argument("--throttle", type=float, default=None, help="requests/sec above which 429 is answered")
+    args = parser.parse_args()
+
+    end = date.today() - timedelta(1)
+    dataset = {symbol: synthetic.generate_symbol(args.years, end=end, seed=i)
+               for i, symbol in enumerate(synthetic.symbols_for(args.symbols))}
+    server = NseStandIn(dataset, args.host, args.port, args.latency, args.jitter, args.error_rate, args.throttle)
+    print(f"Serving {', '.join(dataset)} on {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.get_stats())
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Readers against a backfill: one thread writes the history of a new symbol in range sized batches while reader
+# threads keep doing point reads of another symbol, on the same sqlite file. Reports writer rows/s and reader
+# ops/s and latency for each journal mode and reader count.
+# Run from a directory containing config.json:
+#   python -m stockscanner.benchmarks.sqlite_contention [--readers 0 1 2 4] [--modes WAL DELETE] [--years 10]
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from stockscanner.benchmarks import synthetic
+from stockscanner.persistence.sqlite.connection_manager import ConnectionManager
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+
+BACKFILL_SYMBOL = "BACKFILL"
+# one NSE range request
+BATCH_ROWS = 250
+
+
+def run(db_path: str, dataset, backfill, journal_mode: str, n_readers: int) -> dict:
+    dates = dataset[synthetic.BENCHMARK_SYMBOL][0]['Date']
+    points = [d.date() for d in dates.iloc[5:]]
+    df, df_pe = backfill
+    done = threading.Event()
+    latencies = [[] for _ in range(n_readers)]
+    errors = []
+
+    def read(i):
+        dao = SqliteTickerDaoImpl(db_path=db_path)
+        rng = np.random.default_rng(i)
+        while not done.is_set():
+            d = points[rng.integers(len(points))]
+            start = time.perf_counter()
+            try:
+                dao.read_data_for_date(synthetic.BENCHMARK_SYMBOL, d)
+            except Exception as e:
+                errors.append(str(e))
+            latencies[i].append(time.perf_counter() - start)
+
+    writer = SqliteTickerDaoImpl(db_path=db_path)
+    readers = [threading.Thread(target=read, args=(i,)) for i in range(n_readers)]
+    for t in readers:
+        t.start()
+    start = time.perf_counter()
+    for i in range(0, len(df), BATCH_ROWS):
+        writer.save_frame(BACKFILL_SYMBOL, df.iloc[i:i + BATCH_ROWS])
+        writer.save_pe_frame(BACKFILL_SYMBOL, df_pe.iloc[i:i + BATCH_ROWS])
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in readers:
+        t.join()
+    writer.close()
+
+    reads = np.concatenate([np.asarray(lat) for lat in latencies]) if n_readers else np.empty(0)
+    return {
+        "journal_mode": journal_mode,
+        "readers": n_readers,
+        "elapsed": elapsed,
+        "writer_rows_per_sec": 2 * len(df) / elapsed,
+        "reads": len(reads),
+        "reads_per_sec": len(reads) / elapsed,
+        "read_p50_ms": float(np.percentile(reads, 50) * 1000) if len(reads) else None,
+        "read_p99_ms": float(np.percentile(reads, 99) * 1000) if len(reads) else None,
+        "read_max_ms": float(reads.max() * 1000) if len(reads) else None,
+        "read_errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--modes", nargs="+", default=["WAL", "DELETE"])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    dataset = synthetic.generate(args.years, 1)
+    backfill = synthetic.generate_symbol(args.years, seed=100)
+    work_dir = tempfile.mkdtemp(prefix="stockscanner_contention_")
+    results = []
+    try:
+        for mode in args.modes:
+            for n_readers in args.readers:
+                # a fresh file per run. Every DAO on it shares this manager and so its journal mode
+                db_path = os.path.join(work_dir, f"{mode}_{n_readers}.db")
+                ConnectionManager.get_instance(db_path, journal_mode=mode,
+                                               synchronous="NORMAL" if mode == "WAL" else "FULL")
+                synthetic.write_sqlite(dataset, db_path)
+                result = run(db_path, dataset, backfill, mode, n_readers)
+                ConnectionManager.get_instance(db_path).close()
+                results.append(result)
+                latency = f"p50 {result['read_p50_ms']:7.2f} ms  p99 {result['read_p99_ms']:7.2f} ms" \
+                    if result["reads"] else ""
+                print(f"{mode:<7} {n_readers} readers: writer {result['writer_rows_per_sec']:9.0f} rows/s  "
+                      f"reads {result['reads_per_sec']:8.0f}/s  {latency}  ({result['read_errors']} errors)",
+                      file=sys.stderr)
+    finally:
+        ConnectionManager.close_all()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    out = json.dumps({"meta": {"years": args.years, "batch_rows": BATCH_ROWS}, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == '__main__':
+    main()
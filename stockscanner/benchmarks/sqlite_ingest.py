@@ -0,0 +1,74 @@
+# Compares row-at-a-time ingest against the batched save_many path of SqliteTickerDaoImpl.
+# Run from a directory containing config.json:  python -m stockscanner.benchmarks.sqlite_ingest
+import argparse
+import os
+import tempfile
+import time
+
+import stockscanner
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+
+SAMPLE_FILE = os.path.join(os.path.dirname(stockscanner.__file__), "NIFTY 50.csv")
+
+
+def load_entries(file_name=SAMPLE_FILE):
+    with open(file_name) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    # first line is the header, the rest are in the same format as the csvContentDiv rows
+    return lines[1:]
+
+
+def run_row_by_row(entries, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        dao = SqliteTickerDaoImpl(db_path=os.path.join(tmp, "bench.db"), **kwargs)
+        start = time.perf_counter()
+        for entry in entries:
+            dao.save("BENCH", entry)
+        elapsed = time.perf_counter() - start
+        dao.close()
+    return elapsed
+
+
+def run_batched(entries, batch_size, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        dao = SqliteTickerDaoImpl(db_path=os.path.join(tmp, "bench.db"), **kwargs)
+        start = time.perf_counter()
+        for i in range(0, len(entries), batch_size):
+            dao.save_many("BENCH", entries[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        dao.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=None, help="number of rows to ingest (default: whole sample)")
+    # one NSE range request returns at most a year of trading days
+    parser.add_argument("--batch-size", type=int, default=250)
+    args = parser.parse_args()
+
+    entries = load_entries()
+    if args.rows:
+        entries = entries[:args.rows]
+    n = len(entries)
+
+    # sqlite's own defaults. The connection manager leaves the journal settings alone unless they are given, this
+    # only pins them so the comparison doesn't depend on what a db file was left in
+    defaults = {"journal_mode": "DELETE", "synchronous": "FULL"}
+    scenarios = [
+        ("row by row, default pragmas", lambda: run_row_by_row(entries, **defaults)),
+        ("row by row, WAL + synchronous=NORMAL",
+         lambda: run_row_by_row(entries, journal_mode="WAL", synchronous="NORMAL")),
+        (f"save_many({args.batch_size}), default pragmas",
+         lambda: run_batched(entries, args.batch_size, **defaults)),
+        (f"save_many({args.batch_size}), WAL + synchronous=NORMAL",
+         lambda: run_batched(entries, args.batch_size, journal_mode="WAL", synchronous="NORMAL")),
+    ]
+    print(f"ingesting {n} rows")
+    for name, fn in scenarios:
+        elapsed = fn()
+        print(f"{name:<45} {elapsed:8.3f}s {n / elapsed:12.0f} rows/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+# Timed scenarios over a synthetic dataset: DAO reads for both backends, every strategy's backtest, portfolio
+# valuation and rebalancing. Results are written as JSON so two runs can be compared.
+# Run from a directory containing config.json:
+#   python -m stockscanner.benchmarks.suite [--years 10] [--symbols 3] [--lots 2000] [--output bench.json]
+#   python -m stockscanner.benchmarks.suite --compare before.json after.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.benchmarks import synthetic
+from stockscanner.model.config import Config
+from stockscanner.persistence import joined_view, price_index
+from stockscanner.persistence.dao_manager import DAOManager
+from stockscanner.persistence.fs.fs_impl import TickerFileSystemDB
+from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl
+
+BACKENDS = ["sqlite3", "fs"]
+ENGINES = ["iterative", "vectorized"]
+POINT_READS = 100
+REBALANCES = 100
+
+
+def timed(fn: Callable, repeat: int, setup: Callable = None, warmup: bool = False) -> List[float]:
+    if warmup:
+        if setup:
+            setup()
+        fn()
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def clear_caches():
+    price_index.cache.clear()
+    joined_view.cache.clear()
+    TickerFileSystemDB.data.clear()
+    SqliteTickerDaoImpl.data.clear()
+
+
+def use_backend(backend: str):
+    # every DAO lookup (strategies, portfolio builder, holdings) goes to the synthetic dataset in the cwd
+    clear_caches()
+    DAOManager.manager = DAOManager(backend)
+    return DAOManager.manager.get_dao_for_ticker()
+
+
+def dao_scenarios(backend: str, symbols: List[str], dataset, repeat: int) -> Dict[str, List[float]]:
+    dao = use_backend(backend)
+    dates = dataset[symbols[0]][0]['Date']
+    rng = np.random.default_rng(0)
+    points = [d.date() for d in dates.iloc[rng.integers(5, len(dates), POINT_READS)]]
+
+    def range_read():
+        for symbol in symbols:
+            dao.read_all_data(symbol)
+            dao.read_all_pe_data(symbol)
+
+    def joined_read():
+        for symbol in symbols:
+            dao.read_joined(symbol)
+
+    def point_read():
+        for d in points:
+            dao.read_data_for_date(symbols[0], d)
+
+    return {
+        f"dao.{backend}.range_read": timed(range_read, repeat, setup=clear_caches),
+        f"dao.{backend}.joined_read": timed(joined_read, repeat, setup=clear_caches),
+        f"dao.{backend}.point_read": timed(point_read, repeat, warmup=True),
+    }
+
+
+def backtest_configs(dataset) -> List[dict]:
+    dates = dataset[synthetic.BENCHMARK_SYMBOL][0]['Date']
+    # leave the first half of the data as P/E history for the allocation strategies
+    start = dates.iloc[len(dates) // 2].date()
+    sip_start = start + timedelta(days=20)
+    start_s = start.strftime("%d-%m-%Y")
+    return [
+        {"strategy_name": "BuyAndHold", "backtest_start_date": start_s},
+        {"strategy_name": "MarketMovementBasedAllocation", "backtest_start_date": start_s},
+        {"strategy_name": "PEBasedAllocation", "backtest_start_date": start_s},
+        {"strategy_name": "SIP", "backtest_start_date": start_s, "sip_start_date": sip_start.strftime("%d-%m-%Y"),
+         "sip_amount": 10000, "sip_frequency": "monthly"},
+    ]
+
+
+def backtest_scenarios(dataset, repeat: int) -> Dict[str, List[float]]:
+    from stockscanner.model.strategies.strategy_manager import StrategyManager
+    dao = use_backend("sqlite3")
+    sm = StrategyManager(Config.load_config(), dao)
+    results = {}
+    for strategy_config in backtest_configs(dataset):
+        for engine in ENGINES:
+            config = dict(strategy_config, engine=engine)
+
+            def run():
+                if sm.back_test_strategy(config) is None:
+                    raise Exception(f"Backtest of {config['strategy_name']} failed")
+
+            results[f"backtest.{strategy_config['strategy_name']}.{engine}"] = timed(run, repeat, warmup=True)
+    return results
+
+
+def build_portfolio(lots):
+    from stockscanner.model.portfolio.portfolio import Portfolio
+    from stockscanner.utils import Constants
+    p = Portfolio("benchmark")
+    for d, quantity, price in lots:
+        p.add_stock(symbol=synthetic.BENCHMARK_SYMBOL, date=d, quantity=quantity, price=price)
+    p.add_debt(symbol=Constants.SAVINGS_ACC, date=lots[0][0], quantity=100000, price=1)
+    return p
+
+
+def portfolio_scenarios(dataset, n_lots: int, repeat: int) -> Dict[str, List[float]]:
+    use_backend("sqlite3")
+    dates = dataset[synthetic.BENCHMARK_SYMBOL][0]['Date']
+    lots = synthetic.generate_lots(n_lots, start=dates.iloc[0].date())
+    valuation_dates = list(dates.iloc[len(dates) // 2:])
+    rebalance_dates = [d.date() for d in dates.iloc[-REBALANCES * 2::2]]
+    state = {}
+
+    def build():
+        state["p"] = build_portfolio(lots)
+
+    def valuation():
+        p = state["p"]
+        for d in valuation_dates:
+            p.valuation(d)
+
+    def rebalance():
+        p = state["p"]
+        for i, d in enumerate(rebalance_dates):
+            eq_weight = 0.7 if i % 2 else 0.5
+            p.rebalance_by_weights(curr_date=d, eq_weight=eq_weight, debt_weight=1 - eq_weight, gold_weight=0,
+                                   cash_weight=0)
+
+    return {
+        "portfolio.build": timed(build, repeat),
+        "portfolio.valuation": timed(valuation, repeat, setup=build, warmup=True),
+        "portfolio.rebalance": timed(rebalance, repeat, setup=build, warmup=True),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return ""
+
+
+def summarize(runs: List[float]) -> dict:
+    return {"median": statistics.median(runs), "min": min(runs), "max": max(runs), "runs": runs}
+
+
+def run_suite(years: int, n_symbols: int, n_lots: int, repeat: int, only: List[str] = None) -> dict:
+    config_path = os.path.abspath("config.json")
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="stockscanner_bench_")
+    results = {}
+    try:
+        dataset = synthetic.generate(years, n_symbols)
+        symbols = list(dataset.keys())
+        synthetic.write_sqlite(dataset, os.path.join(work_dir, "data.db"))
+        synthetic.write_fs(dataset, work_dir)
+        shutil.copy(config_path, os.path.join(work_dir, "config.json"))
+        os.chdir(work_dir)
+
+        groups = {
+            "dao": lambda: {k: v for backend in BACKENDS for k, v in
+                            dao_scenarios(backend, symbols, dataset, repeat).items()},
+            "backtest": lambda: backtest_scenarios(dataset, repeat),
+            "portfolio": lambda: portfolio_scenarios(dataset, n_lots, repeat),
+        }
+        for name, group in groups.items():
+            if only and name not in only:
+                continue
+            for scenario, runs in group().items():
+                results[scenario] = summarize(runs)
+                print(f"{scenario:<50} median {results[scenario]['median'] * 1000:10.2f} ms  "
+                      f"min {results[scenario]['min'] * 1000:10.2f} ms", file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        DAOManager.manager = None
+        clear_caches()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "years": years,
+            "symbols": n_symbols,
+            "lots": n_lots,
+            "repeat": repeat,
+            # times config.json was parsed during the run
+            "config_loads": Config.loads,
+        },
+        "results": results,
+    }
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)["results"]
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    for scenario in sorted(set(before) & set(after)):
+        old, new = before[scenario]["median"], after[scenario]["median"]
+        print(f"{scenario:<50} {old * 1000:10.2f} ms -> {new * 1000:10.2f} ms  {old / new:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--symbols", type=int, default=3)
+    parser.add_argument("--lots", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=["dao", "backtest", "portfolio"], default=None)
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    result = run_suite(args.years, args.symbols, args.lots, args.repeat, args.only)
+    out = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Synthetic NSE shaped datasets for the benchmarks: OHLC and PE/PB/Div_Yield frames with the columns and types
+# the DAOs return, written out as a sqlite db and as the csv files the file system DAO reads.
+import os
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.persistence.sqlite.sqlite_impl import OHLC_COLUMNS, PE_COLUMNS, SqliteTickerDaoImpl
+
+# the strategies backtest this symbol, so every dataset has it
+BENCHMARK_SYMBOL = "NIFTY 50"
+# headers of the csv files NSE serves, which the file system DAO reads as is
+FS_OHLC_HEADER = ["Date", "Open", "High", "Low", "Close", "Shares Traded", "Turnover (Rs. Cr)"]
+FS_PE_HEADER = ["Date", "P/E", "P/B", "Div Yield"]
+
+
+def symbols_for(n: int) -> List[str]:
+    return [BENCHMARK_SYMBOL] + [f"SYNTH {i}" for i in range(1, n)]
+
+
+def generate_symbol(years: int, end: date = date(2021, 12, 31), seed: int = 0,
+                    start_price: float = 2000) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=int(years * 252))
+    n = len(dates)
+    # geometric random walk with a bit of drift, close to the index's long run behaviour
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0004, 0.011, n)))
+    open_ = close * (1 + rng.normal(0, 0.004, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, n)))
+    shares = rng.integers(50_000_000, 500_000_000, n).astype(np.float64)
+    turnover = np.round(shares * close / 1e7, 2)
+    df = pd.DataFrame({
+        "Date": dates, "Open": open_.round(2), "High": high.round(2), "Low": low.round(2), "Close": close.round(2),
+        "Shares_Traded": shares, "Turnover": turnover,
+    }, columns=OHLC_COLUMNS)
+
+    # earnings grow slower than the price, so the P/E drifts through a range like the real one does
+    earnings = close[0] / 18 * np.exp(np.cumsum(rng.normal(0.0003, 0.002, n)))
+    book = close[0] / 3.5 * np.exp(np.cumsum(rng.normal(0.0003, 0.001, n)))
+    df_pe = pd.DataFrame({
+        "Date": dates,
+        "P_E": (close / earnings).round(2),
+        "P_B": (close / book).round(2),
+        "Div_Yield": np.clip(1.3 + rng.normal(0, 0.05, n).cumsum() * 0.05, 0.5, 3).round(2),
+    }, columns=PE_COLUMNS)
+    return df, df_pe
+
+
+def generate(years: int = 10, symbols: int = 1, seed: int = 0) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    return {symbol: generate_symbol(years, seed=seed + i) for i, symbol in enumerate(symbols_for(symbols))}
+
+
+def write_sqlite(dataset: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]], db_path: str):
+    dao = SqliteTickerDaoImpl(db_path=db_path)
+    for symbol, (df, df_pe) in dataset.items():
+        dao.save_frame(symbol, df)
+        dao.save_pe_frame(symbol, df_pe)
+    dao.close()
+
+
+def write_fs(dataset: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]], directory: str):
+    for symbol, (df, df_pe) in dataset.items():
+        for frame, header, suffix in ((df, FS_OHLC_HEADER, ""), (df_pe, FS_PE_HEADER, "_pe")):
+            out = frame.copy()
+            out.columns = header
+            out.to_csv(os.path.join(directory, f"{symbol}{suffix}.csv"), index=False, date_format="%d-%b-%Y")
+
+
+def generate_lots(n: int, start: date = date(2012, 1, 2), seed: int = 0) -> List[Tuple[date, float, float]]:
+    # (date, quantity, price) of n buys, a few per trading day
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start=start, periods=max(n // 4, 1))
+    picks = np.sort(rng.integers(0, len(days), n))
+    quantities = rng.uniform(0.5, 5, n)
+    prices = rng.uniform(1000, 20000, n)
+    return [(days[i].date(), q, p) for i, q, p in zip(picks, quantities, prices)]
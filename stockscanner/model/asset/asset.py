@@ -27,6 +27,9 @@ class Asset(ABC):
     def get_value_as_of_date(self, d: date):
         pass
 
+    def get_invested_amount_as_of_date(self, d: date):
+        return self.get_invested_amount()
+
     @abstractmethod
     def add_by_amount(self, amount: float, d: date = date.today()):
         pass
@@ -1,19 +1,21 @@
 from datetime import date
 from typing import List
 
-from stockscanner.model.asset.asset import Asset, Trade
+from stockscanner.model.asset.asset import Asset
 from stockscanner.model.asset.asset_type import AssetType
 from stockscanner.model.asset.holding import Holding, HoldingBuilder
+from stockscanner.model.asset.trade_book import TradeBook
 from stockscanner.persistence.dao_manager import DAOManager
 from stockscanner.utils import Constants
 
 
 class Debt(Asset):
-    def __init__(self) -> None:
+    def __init__(self, trade_book: TradeBook = None) -> None:
         super().__init__()
         self.type = AssetType.DEBT
         self.__debt_instruments: List[Holding] = []
-        self.__trade_book: List[Trade] = list()
+        # usually the portfolio's trade book, shared by all of its assets
+        self.__trade_book: TradeBook = trade_book if trade_book is not None else TradeBook()
 
     def get_invested_amount(self):
         invested_amount = 0
@@ -21,6 +23,18 @@ class Debt(Asset):
             invested_amount += debt.get_invested_amount()
         return invested_amount
 
+    def get_invested_amount_as_of_date(self, d: date):
+        invested_amount = 0
+        for debt in self.__debt_instruments:
+            invested_amount += debt.get_invested_amount_as_of_date(d)
+        return invested_amount
+
+    def get_quantity_as_of_date(self, symbol: str, d: date) -> float:
+        for debt in self.__debt_instruments:
+            if debt.symbol == symbol:
+                return debt.get_quantity_as_of_date(d)
+        return 0
+
     def get_current_value(self):
         curr_value = 0
         for debt in self.__debt_instruments:
@@ -45,7 +59,7 @@ class Debt(Asset):
         for debt in self.__debt_instruments:
             if debt.symbol == symbol:
                 debt.add_entry(d, quantity, price)
-                self.__trade_book.append(Trade("buy", d, price, quantity))
+                self.__trade_book.append("buy", d, price, quantity, symbol, self.type)
                 return
 
         debt = HoldingBuilder(symbol) \
@@ -53,13 +67,18 @@ class Debt(Asset):
             .build()
 
         self.__debt_instruments.append(debt)
-        self.__trade_book.append(Trade("buy", d, price, quantity))
+        self.__trade_book.append("buy", d, price, quantity, symbol, self.type)
 
     def remove(self, **kwargs):
         symbol = kwargs.get("symbol")
         for debt in self.__debt_instruments:
             if debt.symbol == symbol:
                 debt.remove_entries(**kwargs)
+                d = kwargs.get("date")
+                price = kwargs.get("price")
+                if price is None:
+                    price = debt.get_price_as_of_date(d)
+                self.__trade_book.append("sell", d, price, kwargs.get("quantity"), symbol, self.type)
                 break
 
     def add_by_amount(self, amount: float, d: date = date.today()):
@@ -69,8 +88,7 @@ class Debt(Asset):
                 price = 1
             else:
                 dao = DAOManager.get_instance().get_dao_for_ticker()
-                data = dao.read_data_for_date(debt.symbol, d)
-                price = float(data['Close'])
+                price = dao.get_price_index(debt.symbol).price_as_of(d)
                 quantity = (amount / price) / len(self.__debt_instruments)
             self.add(symbol=debt.symbol, quantity=quantity, price=price, date=d)
 
@@ -78,11 +96,12 @@ class Debt(Asset):
         for debt in self.__debt_instruments:
             if debt.symbol == Constants.SAVINGS_ACC:
                 quantity = amount / len(self.__debt_instruments)
+                price = 1
             else:
                 dao = DAOManager.get_instance().get_dao_for_ticker()
-                data = dao.read_data_for_date(debt.symbol, d)
-                quantity = (amount / float(data['Close'])) / len(self.__debt_instruments)
-            self.remove(symbol=debt.symbol, quantity=quantity, date=d)
+                price = dao.get_price_index(debt.symbol).price_as_of(d)
+                quantity = (amount / price) / len(self.__debt_instruments)
+            self.remove(symbol=debt.symbol, quantity=quantity, date=d, price=price)
 
     def get_trade_book(self):
-        return self.__trade_book
+        return self.__trade_book.trades(self.type)
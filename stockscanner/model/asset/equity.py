@@ -1,18 +1,20 @@
 from datetime import date
 from typing import List
 
-from stockscanner.model.asset.asset import Asset, Trade
+from stockscanner.model.asset.asset import Asset
 from stockscanner.model.asset.asset_type import AssetType
 from stockscanner.model.asset.holding import Holding, HoldingBuilder
+from stockscanner.model.asset.trade_book import TradeBook
 from stockscanner.persistence.dao_manager import DAOManager
 
 
 class Equity(Asset):
-    def __init__(self) -> None:
+    def __init__(self, trade_book: TradeBook = None) -> None:
         super().__init__()
         self.type = AssetType.EQUITY
         self.__stocks: List[Holding] = []
-        self.__trade_book: List[Trade] = list()
+        # usually the portfolio's trade book, shared by all of its assets
+        self.__trade_book: TradeBook = trade_book if trade_book is not None else TradeBook()
 
     def add(self, **kwargs):
         symbol: str = kwargs.get("symbol")
@@ -26,35 +28,39 @@ class Equity(Asset):
         for stock in self.__stocks:
             if stock.symbol == symbol:
                 stock.add_entry(d, quantity, price)
-                self.__trade_book.append(Trade("buy", d, price, quantity))
+                self.__trade_book.append("buy", d, price, quantity, symbol, self.type)
                 return
         hld = HoldingBuilder(symbol) \
             .with_entry(d, quantity, price) \
             .build()
         self.__stocks.append(hld)
-        self.__trade_book.append(Trade("buy", d, price, quantity))
+        self.__trade_book.append("buy", d, price, quantity, symbol, self.type)
 
     def remove(self, **kwargs):
         symbol = kwargs.get("symbol")
         for stock in self.__stocks:
             if stock.symbol == symbol:
                 stock.remove_entries(**kwargs)
+                d = kwargs.get("date")
+                price = kwargs.get("price")
+                if price is None:
+                    price = stock.get_price_as_of_date(d)
+                self.__trade_book.append("sell", d, price, kwargs.get("quantity"), symbol, self.type)
                 break
 
     def add_by_amount(self, amount: float, d: date = date.today()):
+        dao = DAOManager.get_instance().get_dao_for_ticker()
         for stock in self.__stocks:
-            dao = DAOManager.get_instance().get_dao_for_ticker()
-            data = dao.read_data_for_date(stock.symbol, d)
-            price = float(data['Close'])
+            price = dao.get_price_index(stock.symbol).price_as_of(d)
             quantity = (amount / price) / len(self.__stocks)
             self.add(symbol=stock.symbol, quantity=quantity, price=price, date=d)
 
     def reduce_by_amount(self, amount: float, d: date = date.today()):
+        dao = DAOManager.get_instance().get_dao_for_ticker()
         for stock in self.__stocks:
-            dao = DAOManager.get_instance().get_dao_for_ticker()
-            data = dao.read_data_for_date(stock.symbol, d)
-            quantity = (amount / float(data['Close'])) / len(self.__stocks)
-            self.remove(symbol=stock.symbol, quantity=quantity, date=d, price=data['Close'])
+            price = dao.get_price_index(stock.symbol).price_as_of(d)
+            quantity = (amount / price) / len(self.__stocks)
+            self.remove(symbol=stock.symbol, quantity=quantity, date=d, price=price)
 
     def get_current_value(self):
         curr_value = 0
@@ -74,5 +80,17 @@ class Equity(Asset):
             invested_amount += stock.get_invested_amount()
         return invested_amount
 
+    def get_invested_amount_as_of_date(self, d: date):
+        invested_amount = 0
+        for stock in self.__stocks:
+            invested_amount += stock.get_invested_amount_as_of_date(d)
+        return invested_amount
+
+    def get_quantity_as_of_date(self, symbol: str, d: date) -> float:
+        for stock in self.__stocks:
+            if stock.symbol == symbol:
+                return stock.get_quantity_as_of_date(d)
+        return 0
+
     def get_trade_book(self):
-        return self.__trade_book
+        return self.__trade_book.trades(self.type)
@@ -1,8 +1,10 @@
-from datetime import date, timedelta, datetime
+from datetime import date
 from typing import List
 
-from pandas import Timestamp
+import numpy as np
 
+from stockscanner.model.asset.ledger import Ledger, as_date
+from stockscanner.model.asset.lots import LotStore
 from stockscanner.model.config import Config
 from stockscanner.persistence.dao_manager import DAOManager
 from stockscanner.utils import Constants
@@ -10,9 +12,7 @@ from stockscanner.utils import Constants
 
 class Entry:
     def __init__(self, d: date, quantity: float, price: float) -> None:
-        if (type(d) is Timestamp) or (type(d) is datetime):
-            d = d.date()
-        self.date = d
+        self.date = as_date(d)
         self.quantity = quantity
         self.price = price
 
@@ -22,90 +22,102 @@ class Holding:
         if len(history) <= 0:
             raise Exception("Cannot add a holding without history")
         self.symbol = symbol
-        self.history: List[Entry] = history
+        # open lots, oldest first. Sells are taken from the front (FIFO).
+        self.lots = LotStore()
+        for entry in history:
+            self.lots.append(entry.date, entry.quantity, entry.price)
+        # every buy and sell, so quantities and costs can be read as of any date
+        self.ledger = Ledger()
+        for entry in sorted(history, key=lambda e: e.date):
+            self.record_entry(entry)
+
+    @property
+    def history(self) -> List[Entry]:
+        return [Entry(d, q, p) for d, q, p in zip(self.lots.open_dates().tolist(), self.lots.open_quantities().tolist(),
+                                                  self.lots.open_prices().tolist())]
+
+    def record_entry(self, entry: Entry):
+        self.ledger.record(entry.date, entry.quantity, entry.quantity * entry.price)
 
     def get_average_buy_price(self) -> float:
-        mcap = 0
-        for entry in self.history:
-            mcap += entry.quantity * entry.price
-        quantity = self.get_quantity()
-        if quantity == 0:
-            raise Exception("Total quantity == 0")
-        return mcap / self.get_quantity()
+        return self.ledger.average_cost_as_of()
 
     def get_quantity(self) -> float:
-        quantity = 0
-        for entry in self.history:
-            quantity += entry.quantity
-        return quantity
+        return self.ledger.quantity_as_of()
+
+    def get_quantity_as_of_date(self, d) -> float:
+        return self.ledger.quantity_as_of(d)
 
     def get_present_value(self) -> float:
         return self.get_quantity() * self.get_current_price()
 
     def get_current_price(self) -> float:
-        dao = DAOManager.get_instance().get_dao_for_ticker()
-        df = dao.read_all_data(self.symbol)
-        mask = (df['Date'] > (date.today() - timedelta(5)).strftime("%d-%b-%Y")) & (
-                df['Date'] <= date.today().strftime("%d-%b-%Y"))
-        return float((df.loc[mask]).iloc[-1]['Close'])
+        return self.get_price_as_of_date(date.today())
 
     def get_price_as_of_date(self, d) -> float:
         dao = DAOManager.get_instance().get_dao_for_ticker()
-        df = dao.read_all_data(self.symbol)
-        mask = (df['Date'] >= (d - timedelta(5)).strftime("%d-%b-%Y")) & (df['Date'] <= d.strftime("%d-%b-%Y"))
-        return float((df.loc[mask]).iloc[-1]['Close'])
+        return dao.get_price_index(self.symbol).price_as_of(d)
 
     def get_value_as_of_date(self, d) -> float:
-        return self.get_quantity() * self.get_price_as_of_date(d)
+        quantity = self.get_quantity_as_of_date(d)
+        if quantity == 0:
+            return 0
+        return quantity * self.get_price_as_of_date(d)
 
     def get_invested_amount(self):
-        for entry in self.history:
-            return entry.price * entry.quantity
+        # cost of the lots still held
+        return self.ledger.cost_as_of()
+
+    def get_invested_amount_as_of_date(self, d):
+        return self.ledger.cost_as_of(d)
 
     def add_entry(self, d, quantity, price):
-        self.history.append(Entry(d, quantity, price))
+        entry = Entry(d, quantity, price)
+        self.lots.append(entry.date, quantity, price)
+        self.record_entry(entry)
 
     def remove_entries(self, **kwargs):
         quantity = kwargs.get("quantity")
         d = kwargs.get("date")
-        price = kwargs.get("price")
         if self.get_quantity() < quantity:
             raise Exception("Cannot remove more than what is present")
-        if quantity > self.history[0].quantity:
-            q_tmp = self.history[0].quantity
-            self.history.pop(0)
-            # self.__trade_book.append(Trade("sell", d, price, q_tmp))
-            self.remove_entries(quantity=quantity - q_tmp, date=d, price=price)
-        elif quantity == self.history[0].quantity:
-            self.history.pop(0)
-            # self.__trade_book.append(Trade("sell", d, price, quantity))
-        else:
-            self.history[0].quantity = (self.history[0].quantity - quantity)
-            # self.__trade_book.append(Trade("sell", d, price, quantity))
+        cost = self.lots.consume(quantity)
+        self.ledger.record(d, -quantity, -cost)
 
 
 class SavingsAccount(Holding):
+    """
+    Interest compounds daily, so every deposit is stored as units worth 1 on the date of the first entry and
+    growing by (1 + daily rate) a day after it. The ledger keeps the units (the discounted principal) and the amounts,
+    and the value on any date is the units held on that date times a single pow.
+    """
 
     def __init__(self, symbol, history: List[Entry]) -> None:
-        super().__init__(symbol, history)
         self.interest_rate = Config.load_config()["interest_rate"] / 100
+        self.daily_rate = self.interest_rate / 365
+        self.base_date = min(entry.date for entry in history)
+        super().__init__(symbol, history)
+
+    def record_entry(self, entry: Entry):
+        amount = entry.quantity * entry.price
+        self.ledger.record(entry.date, amount / self.get_unit_value(entry.date), amount)
+
+    def get_unit_value(self, d) -> float:
+        return float(np.power(1 + self.daily_rate, (as_date(d) - self.base_date).days))
+
+    def get_value_series(self, dates) -> np.ndarray:
+        # value on every date of the array in one pass: units held per date times the growth since the base date
+        days = np.asarray(dates, dtype="datetime64[D]")
+        entry_days = np.asarray(self.ledger.dates, dtype="datetime64[D]")
+        units = np.concatenate(([0.0], self.ledger.quantities))[np.searchsorted(entry_days, days, side="right")]
+        elapsed = (days - np.datetime64(self.base_date, 'D')).astype(np.int64)
+        return units * np.power(1 + self.daily_rate, elapsed)
 
     def get_average_buy_price(self) -> float:
-        sum = 0
-        for entry in self.history:
-            sum += entry.price * entry.quantity
-        return sum
+        return self.ledger.cost_as_of()
 
     def get_present_value(self) -> float:
-        sum = 0
-        d = date.today()
-        for entry in self.history:
-            if entry.date < d:
-                principle = entry.quantity * entry.price
-                daily_rate = self.interest_rate / 365 * 100
-                value = principle * pow((1 + daily_rate), (d - entry.date).days)
-                sum += value
-        return sum
+        return self.get_value_as_of_date(date.today())
 
     def get_current_price(self) -> float:
         return 1
@@ -114,32 +126,29 @@ class SavingsAccount(Holding):
         return 1
 
     def get_value_as_of_date(self, d) -> float:
-        sum = 0
-        for entry in self.history:
-            if entry.date <= d:
-                principle = entry.quantity * entry.price
-                daily_rate = self.interest_rate / 365
-                curr_date = d
-                if (type(d) is Timestamp) or (type(d) is datetime):
-                    curr_date = d.date()
-                value = principle * pow((1 + daily_rate), (curr_date - entry.date).days)
-                sum += value
-        return sum
+        units = self.ledger.quantity_as_of(d)
+        if units == 0:
+            return 0
+        return units * self.get_unit_value(d)
 
     def get_quantity(self) -> float:
-        return super().get_quantity()
+        return self.ledger.cost_as_of()
+
+    def get_quantity_as_of_date(self, d) -> float:
+        return self.ledger.cost_as_of(d)
 
     def get_invested_amount(self):
-        return super().get_invested_amount()
+        return self.ledger.cost_as_of()
 
     def remove_entries(self, **kwargs):
         quantity = kwargs.get("quantity")
-        d = kwargs.get("date")
+        d = as_date(kwargs.get("date"))
         value_to_be_removed = quantity * self.get_current_price()
-        curr_value = self.get_value_as_of_date(d)
-        expected_value = curr_value - value_to_be_removed
-        self.history = []
-        self.history.append(Entry(d=d, quantity=expected_value, price=1))
+        expected_value = self.get_value_as_of_date(d) - value_to_be_removed
+        # the interest earned so far is rolled into a single entry
+        self.ledger.record(d, -value_to_be_removed / self.get_unit_value(d), expected_value - self.ledger.cost_as_of(d))
+        self.lots.clear()
+        self.lots.append(d, expected_value, 1)
 
 
 class HoldingBuilder:
@@ -0,0 +1,65 @@
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import List
+
+import numpy as np
+from pandas import Timestamp
+
+
+def as_date(d) -> date:
+    # Timestamp is a datetime, so this covers both
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, np.datetime64):
+        return Timestamp(d).date()
+    return d
+
+
+class Ledger:
+    """
+    Date sorted quantity and cost changes of a holding, stored as running totals.
+    The quantity, cost and average cost as of any date are a binary search over the dates.
+    """
+
+    def __init__(self) -> None:
+        self.dates: List[date] = []
+        self.quantities: List[float] = []
+        self.costs: List[float] = []
+
+    def record(self, d, quantity: float, cost: float):
+        d = as_date(d)
+        i = bisect_right(self.dates, d)
+        quantity_before = self.quantities[i - 1] if i else 0
+        cost_before = self.costs[i - 1] if i else 0
+        self.dates.insert(i, d)
+        self.quantities.insert(i, quantity_before + quantity)
+        self.costs.insert(i, cost_before + cost)
+        # back dated changes also move the totals of every later date. Changes in date order only append.
+        for j in range(i + 1, len(self.dates)):
+            self.quantities[j] += quantity
+            self.costs[j] += cost
+
+    def __index(self, d) -> int:
+        if d is None:
+            return len(self.dates)
+        return bisect_right(self.dates, as_date(d))
+
+    def quantity_as_of(self, d=None) -> float:
+        i = self.__index(d)
+        return self.quantities[i - 1] if i else 0
+
+    def cost_as_of(self, d=None) -> float:
+        i = self.__index(d)
+        return self.costs[i - 1] if i else 0
+
+    def average_cost_as_of(self, d=None) -> float:
+        i = self.__index(d)
+        if i == 0 or self.quantities[i - 1] == 0:
+            raise Exception("Total quantity == 0")
+        return self.costs[i - 1] / self.quantities[i - 1]
+
+    def first_date(self):
+        return self.dates[0] if self.dates else None
+
+    def __len__(self):
+        return len(self.dates)
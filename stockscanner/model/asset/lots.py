@@ -0,0 +1,90 @@
+from datetime import date
+
+import numpy as np
+
+from stockscanner.model.asset.ledger import as_date
+
+INITIAL_CAPACITY = 16
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+class LotStore:
+    """
+    Open lots of a holding in typed arrays, oldest first. Sells consume lots from the head pointer, so a FIFO sale
+    is O(1) amortized per lot it closes instead of shifting a list. Closed lots are dropped when the arrays grow.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        # days since 1970-01-01, so an append doesn't build a datetime64 scalar
+        self.days = np.empty(capacity, dtype=np.int64)
+        self.quantities = np.empty(capacity, dtype=np.float64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def __grow(self):
+        n = len(self)
+        # only compact when at least half of the arrays are closed lots, otherwise double them
+        capacity = len(self.quantities) if self.head * 2 >= len(self.quantities) else len(self.quantities) * 2
+        for name in ("days", "quantities", "prices"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[self.head:self.tail]
+            setattr(self, name, new)
+        self.head = 0
+        self.tail = n
+
+    def append(self, d: date, quantity: float, price: float):
+        if self.tail == len(self.quantities):
+            self.__grow()
+        self.days[self.tail] = as_date(d).toordinal() - EPOCH
+        self.quantities[self.tail] = quantity
+        self.prices[self.tail] = price
+        self.tail += 1
+
+    def consume(self, quantity: float) -> float:
+        # removes quantity from the oldest lots and returns the cost of what was removed
+        remaining = quantity
+        cost = 0
+        while remaining > 0 and self.head < self.tail:
+            lot_quantity = float(self.quantities[self.head])
+            lot_price = float(self.prices[self.head])
+            if remaining >= lot_quantity:
+                cost += lot_quantity * lot_price
+                remaining -= lot_quantity
+                self.head += 1
+            else:
+                self.quantities[self.head] = lot_quantity - remaining
+                cost += remaining * lot_price
+                remaining = 0
+        return cost
+
+    def clear(self):
+        self.head = 0
+        self.tail = 0
+
+    def open_dates(self) -> np.ndarray:
+        return self.days[self.head:self.tail].astype("datetime64[D]")
+
+    def open_quantities(self) -> np.ndarray:
+        return self.quantities[self.head:self.tail]
+
+    def open_prices(self) -> np.ndarray:
+        return self.prices[self.head:self.tail]
+
+    def quantity(self) -> float:
+        return float(self.open_quantities().sum())
+
+    def cost_basis(self) -> float:
+        return float(np.dot(self.open_quantities(), self.open_prices()))
+
+    def cost_basis_as_of(self, d) -> float:
+        # cost of the open lots bought on or before d
+        held = self.days[self.head:self.tail] <= as_date(d).toordinal() - EPOCH
+        return float(np.dot(self.open_quantities()[held], self.open_prices()[held]))
+
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.quantities.nbytes + self.prices.nbytes
@@ -0,0 +1,156 @@
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.model.asset.asset import Trade
+from stockscanner.model.asset.asset_type import AssetType
+from stockscanner.model.asset.ledger import as_date
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ACTIONS = ["buy", "sell"]
+ASSET_TYPES = list(AssetType)
+INITIAL_CAPACITY = 64
+EPOCH = date(1970, 1, 1).toordinal()
+NS_PER_DAY = 86400 * 10 ** 9
+FLOW_TOLERANCE = 1e-9
+
+
+class TradeBook:
+    """
+    Append only journal of the trades of a portfolio, kept in growable typed columns. Actions, symbols and asset types
+    are stored as codes into small lookup lists, so a trade costs 30 bytes instead of a Trade object.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self.actions = np.empty(capacity, dtype=np.int8)
+        self.assets = np.empty(capacity, dtype=np.int8)
+        # nanoseconds since 1970-01-01, so the column can be viewed as datetime64[ns] without a copy
+        self.dates = np.empty(capacity, dtype=np.int64)
+        self.symbol_ids = np.empty(capacity, dtype=np.int32)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.quantities = np.empty(capacity, dtype=np.float64)
+        self.symbols: List[str] = []
+        self.__symbol_ids: Dict[str, int] = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __grow(self):
+        for name in ("actions", "assets", "dates", "symbol_ids", "prices", "quantities"):
+            old = getattr(self, name)
+            new = np.empty(len(old) * 2, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def __symbol_id(self, symbol: str) -> int:
+        symbol_id = self.__symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self.__symbol_ids[symbol] = symbol_id
+        return symbol_id
+
+    def append(self, action: str, d, price: float, quantity: float, symbol: str = "",
+               asset_type: AssetType = AssetType.EQUITY):
+        if self.size == len(self.prices):
+            self.__grow()
+        i = self.size
+        self.actions[i] = ACTIONS.index(action)
+        self.assets[i] = ASSET_TYPES.index(asset_type)
+        self.dates[i] = (as_date(d).toordinal() - EPOCH) * NS_PER_DAY
+        self.symbol_ids[i] = self.__symbol_id(symbol)
+        self.prices[i] = price
+        self.quantities[i] = quantity
+        self.size += 1
+
+    def __mask(self, asset_type: AssetType = None):
+        if asset_type is None:
+            return slice(0, self.size)
+        return np.flatnonzero(self.assets[:self.size] == ASSET_TYPES.index(asset_type))
+
+    def get_dates(self) -> np.ndarray:
+        return self.dates[:self.size].view("datetime64[ns]")
+
+    def trades(self, asset_type: AssetType = None) -> List[Trade]:
+        rows = self.__mask(asset_type)
+        dates = pd.to_datetime(self.dates[rows]).date
+        return [Trade(ACTIONS[a], d, p, q) for a, d, p, q in
+                zip(self.actions[rows].tolist(), dates, self.prices[rows].tolist(), self.quantities[rows].tolist())]
+
+    def __iter__(self):
+        return iter(self.trades())
+
+    def to_frame(self, asset_type: AssetType = None) -> pd.DataFrame:
+        # the numeric columns are slices of the journal's arrays. pandas may still copy when it consolidates them.
+        rows = self.__mask(asset_type)
+        return pd.DataFrame({
+            "action": pd.Categorical.from_codes(self.actions[rows], ACTIONS),
+            "date": self.dates[rows].view("datetime64[ns]"),
+            "symbol": pd.Categorical.from_codes(self.symbol_ids[rows], self.symbols),
+            "asset": pd.Categorical.from_codes(self.assets[rows], [t.value for t in ASSET_TYPES]),
+            "price": self.prices[rows],
+            "quantity": self.quantities[rows],
+        }, copy=False)
+
+    def to_arrow(self):
+        if pyarrow is None:
+            raise Exception("pyarrow is required to export the trade book to Arrow")
+        n = self.size
+        # dictionary columns wrap the code arrays, numeric columns share the numpy buffers
+        return pyarrow.table({
+            "action": pyarrow.DictionaryArray.from_arrays(self.actions[:n], ACTIONS),
+            "date": pyarrow.array(self.dates[:n].view("datetime64[ns]")),
+            "symbol": pyarrow.DictionaryArray.from_arrays(self.symbol_ids[:n], self.symbols),
+            "asset": pyarrow.DictionaryArray.from_arrays(self.assets[:n], [t.value for t in ASSET_TYPES]),
+            "price": pyarrow.array(self.prices[:n]),
+            "quantity": pyarrow.array(self.quantities[:n]),
+        })
+
+    def to_parquet(self, path: str):
+        # to_arrow raises the missing pyarrow error before pyarrow.parquet is touched
+        table = self.to_arrow()
+        pyarrow.parquet.write_table(table, path)
+
+    def turnover(self, asset_type: AssetType = None) -> float:
+        rows = self.__mask(asset_type)
+        return float(np.dot(self.prices[rows], self.quantities[rows]))
+
+    def __years(self, rows) -> np.ndarray:
+        return self.dates[rows].view("datetime64[ns]").astype("datetime64[Y]").astype(np.int64) + 1970
+
+    def trades_by_year(self, asset_type: AssetType = None) -> pd.Series:
+        rows = self.__mask(asset_type)
+        years, counts = np.unique(self.__years(rows), return_counts=True)
+        return pd.Series(counts, index=pd.Index(years, name="year"), name="trades")
+
+    def turnover_by_year(self, asset_type: AssetType = None) -> pd.Series:
+        rows = self.__mask(asset_type)
+        years, index = np.unique(self.__years(rows), return_inverse=True)
+        totals = np.bincount(index, weights=self.prices[rows] * self.quantities[rows], minlength=len(years))
+        return pd.Series(totals, index=pd.Index(years, name="year"), name="turnover")
+
+    def net_flows(self, until=None):
+        """
+        Money put into (negative) or taken out of (positive) the assets per day, up to and including until.
+        Buys and sells on the same day cancel, so moving money between assets is not a flow.
+        """
+        n = self.size
+        amounts = self.prices[:n] * self.quantities[:n] * np.where(self.actions[:n] == ACTIONS.index("buy"), -1, 1)
+        days = self.dates[:n] // NS_PER_DAY
+        if until is not None:
+            held = days <= as_date(until).toordinal() - EPOCH
+            days, amounts = days[held], amounts[held]
+        days, index = np.unique(days, return_inverse=True)
+        totals = np.bincount(index, weights=amounts, minlength=len(days))
+        # what is left of a rebalance after rounding
+        keep = np.abs(totals) > FLOW_TOLERANCE * np.abs(amounts).max(initial=0)
+        return days[keep].astype("datetime64[D]"), totals[keep]
+
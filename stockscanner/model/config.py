@@ -1,7 +1,149 @@
-from stockscanner.utils import FileUtils
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "config.json"
+MISSING = object()
+
+
+class FrozenDict(dict):
+    """A dict that can't be changed after it is built. Still a dict, so json.dumps, dict(...) and pickle work."""
+
+    def __readonly(self, *args, **kwargs):
+        raise Exception("config is read only, copy it with dict(...) to change it")
+
+    __setitem__ = __delitem__ = __readonly
+    clear = pop = popitem = setdefault = update = __readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
 
 
 class Config:
+    """
+    Process wide, read only view of config.json. The file is parsed once per path and shared by every thread.
+    The path is resolved against the current directory, so changing directory loads the config.json there.
+    With hot reload on, the file's mtime is checked at most every reload_interval seconds and a changed file is
+    loaded again. `loads` counts how often the file was actually parsed.
+    """
+    __lock = threading.Lock()
+    __config = None
+    __cwd = None
+    __mtime = None
+    __checked_at = 0.0
+    hot_reload = False
+    reload_interval = 2.0
+    loads = 0
+
+    @classmethod
+    def load_config(cls) -> FrozenDict:
+        cwd = os.getcwd()
+        config = cls.__config
+        if config is not None and cwd == cls.__cwd:
+            if not cls.hot_reload or time.monotonic() - cls.__checked_at < cls.reload_interval:
+                return config
+        with cls.__lock:
+            path = os.path.join(cwd, CONFIG_FILE)
+            if cls.__config is None or cwd != cls.__cwd or cls.__changed(path):
+                cls.__load(cwd)
+            return cls.__config
+
+    @classmethod
+    def __changed(cls, path) -> bool:
+        if not cls.hot_reload:
+            return False
+        cls.__checked_at = time.monotonic()
+        try:
+            return os.stat(path).st_mtime_ns != cls.__mtime
+        except OSError:
+            # keep the last good config while the file is being replaced
+            return False
+
+    @classmethod
+    def __load(cls, cwd):
+        path = os.path.join(cwd, CONFIG_FILE)
+        mtime = os.stat(path).st_mtime_ns
+        with open(path) as f:
+            config = freeze(json.load(f))
+        if cls.__config is not None:
+            logger.info(f"Loaded {path}")
+        cls.__config = config
+        cls.__cwd = cwd
+        cls.__mtime = mtime
+        cls.__checked_at = time.monotonic()
+        cls.loads += 1
+        reload = config.get("config", {})
+        cls.hot_reload = reload.get("hot_reload", cls.hot_reload)
+        cls.reload_interval = reload.get("reload_interval", cls.reload_interval)
+
+    @classmethod
+    def reload(cls) -> FrozenDict:
+        with cls.__lock:
+            cls.__load(os.getcwd())
+            return cls.__config
+
+    @classmethod
+    def get(cls, key: str, default=MISSING, expected_type: type = None):
+        # dotted keys reach into sections: Config.get("watcher.max_workers", 4)
+        value = cls.load_config()
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                if default is MISSING:
+                    raise Exception(f"{key} is not set in {CONFIG_FILE}")
+                return default
+            value = value[part]
+        if expected_type is not None and not isinstance(value, expected_type):
+            raise Exception(f"{key} in {CONFIG_FILE} should be {expected_type.__name__}, got {value!r}")
+        return value
+
+    @classmethod
+    def get_str(cls, key: str, default=MISSING) -> str:
+        return cls.get(key, default, str)
+
+    @classmethod
+    def get_int(cls, key: str, default=MISSING) -> int:
+        value = cls.get(key, default)
+        if value is default:
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not float(value).is_integer():
+            raise Exception(f"{key} in {CONFIG_FILE} should be int, got {value!r}")
+        return int(value)
+
+    @classmethod
+    def get_float(cls, key: str, default=MISSING) -> float:
+        value = cls.get(key, default)
+        if value is default:
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise Exception(f"{key} in {CONFIG_FILE} should be float, got {value!r}")
+        return float(value)
+
+    @classmethod
+    def get_bool(cls, key: str, default=MISSING) -> bool:
+        return cls.get(key, default, bool)
+
+    @classmethod
+    def get_section(cls, key: str) -> FrozenDict:
+        return cls.get(key, FrozenDict(), dict)
+
     @classmethod
-    def load_config(cls):
-        return FileUtils.read_json_file("config.json")
+    def get_list(cls, key: str, default=MISSING) -> tuple:
+        return cls.get(key, default, tuple)
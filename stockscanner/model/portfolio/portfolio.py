@@ -1,13 +1,20 @@
 from datetime import date
 from typing import List
 
+import numpy as np
+
 from stockscanner.model.asset.asset_type import AssetType
 from stockscanner.model.exceptions.exceptions import AssetNotFoundException
 from stockscanner.model.asset.asset import Asset
 from stockscanner.model.asset.cash import Cash
 from stockscanner.model.asset.debt import Debt
 from stockscanner.model.asset.equity import Equity
+from stockscanner.model.asset.ledger import as_date
+from stockscanner.model.asset.trade_book import TradeBook
+from stockscanner.model.portfolio.valuation import Valuation
+from stockscanner.model.reporting import xirr
 from stockscanner.model.strategies.strategy import Strategy
+from stockscanner.utils.ProfileUtils import profiler
 
 
 class Portfolio:
@@ -17,6 +24,8 @@ class Portfolio:
         self.__assets: List[Asset] = list()
         self.__change_logs = list()
         self.__strategy = None
+        # trades of every asset of the portfolio, in one columnar journal
+        self.__trade_book = TradeBook()
 
     def get_change_logs(self):
         return self.__change_logs
@@ -27,68 +36,71 @@ class Portfolio:
     def set_description(self, description):
         self.description = description
 
-    def get_returns(self):
-        pass
+    def get_cashflows(self, d: date = None):
+        return self.__trade_book.net_flows(d)
+
+    def __terminal_value(self, d: date = None):
+        if d is None:
+            return np.datetime64(date.today(), 'D'), self.get_current_value()
+        return np.datetime64(as_date(d), 'D'), self.valuation(d).total
+
+    def get_returns(self, d: date = None):
+        # absolute return on the money put in
+        dates, amounts = self.get_cashflows(d)
+        invested = -amounts.sum()
+        if invested <= 0:
+            return np.nan
+        return (self.__terminal_value(d)[1] - invested) / invested
 
-    def get_xirr(self):
-        pass
+    def get_xirr(self, d: date = None):
+        dates, amounts = self.get_cashflows(d)
+        end, value = self.__terminal_value(d)
+        return xirr.xirr(np.append(dates, end), np.append(amounts, value))
 
-    def total_invested(self):
+    def total_invested(self, d: date = None):
         total_invested = 0
         for a in self.__assets:
-            total_invested += a.get_invested_amount()
+            total_invested += a.get_invested_amount() if d is None else a.get_invested_amount_as_of_date(d)
         return total_invested
 
     def apply_strategy(self, s: Strategy):
         self.__strategy = s
 
-    def rebalance_by_weights(self, **kwargs):
+    @profiler.timed("rebalance")
+    def rebalance_by_weights(self, **kwargs) -> Valuation:
         curr_date: date = kwargs.get("curr_date")
 
-        curr_eq_weight = self.get_asset_weight(AssetType.EQUITY, curr_date)
-        curr_debt_weight = self.get_asset_weight(AssetType.DEBT, curr_date)
-        curr_gold_weight = self.get_asset_weight(AssetType.GOLD, curr_date)
-        curr_cash_weight = self.get_asset_weight(AssetType.CASH, curr_date)
-
-        val_as_of_today = self.get_value_as_of_date(curr_date)
-        # change in weight
-        amount = (kwargs.get("eq_weight", 0) - curr_eq_weight) * val_as_of_today
-        if amount > 0:
-            self.get_asset(AssetType.EQUITY).add_by_amount(abs(amount), curr_date)
-        elif amount < 0:
-            self.get_asset(AssetType.EQUITY).reduce_by_amount(abs(amount), curr_date)
-
-        amount = (kwargs.get("debt_weight", 0) - curr_debt_weight) * val_as_of_today
-        if amount > 0:
-            self.get_asset(AssetType.DEBT).add_by_amount(abs(amount), curr_date)
-        elif amount < 0:
-            self.get_asset(AssetType.DEBT).reduce_by_amount(abs(amount), curr_date)
-
-        amount = (kwargs.get("gold_weight", 0) - curr_gold_weight) * val_as_of_today
-        if amount > 0:
-            self.get_asset(AssetType.GOLD).add_by_amount(abs(amount), curr_date)
-        elif amount < 0:
-            self.get_asset(AssetType.GOLD).reduce_by_amount(abs(amount), curr_date)
-
-        amount = (kwargs.get("cash_weight", 0) - curr_cash_weight) * val_as_of_today
-        if amount > 0:
-            self.get_asset(AssetType.CASH).add_by_amount(abs(amount), curr_date)
-        elif amount < 0:
-            self.get_asset(AssetType.CASH).reduce_by_amount(abs(amount), curr_date)
-
-        message = f"Total Invested: ${self.total_invested()}, " \
-                  f"Current Value: ${self.get_value_as_of_date(curr_date)} \r\n " \
-                  f"eq: {self.get_asset_weight(AssetType.EQUITY, curr_date)} " \
-                  f"debt: {self.get_asset_weight(AssetType.DEBT, curr_date)} " \
-                  f"gold: {self.get_asset_weight(AssetType.GOLD, curr_date)} " \
-                  f"cash: {self.get_asset_weight(AssetType.CASH, curr_date)}"
-        self.add_rebalance_logs(f"Portfolio rebalanced on {curr_date} \n + ${message}")
+        before = self.valuation(curr_date)
+        for asset_type, weight in [(AssetType.EQUITY, "eq_weight"), (AssetType.DEBT, "debt_weight"),
+                                   (AssetType.GOLD, "gold_weight"), (AssetType.CASH, "cash_weight")]:
+            # change in weight
+            amount = (kwargs.get(weight, 0) - before.get_weight(asset_type)) * before.total
+            if amount > 0:
+                self.get_asset(asset_type).add_by_amount(abs(amount), curr_date)
+            elif amount < 0:
+                self.get_asset(asset_type).reduce_by_amount(abs(amount), curr_date)
+
+        after = self.valuation(curr_date)
+        self.add_rebalance_logs(f"Portfolio rebalanced on {curr_date} \n + ${after.describe()}")
+        return after
+
+    @profiler.timed("valuation")
+    def valuation(self, d: date) -> Valuation:
+        values = {}
+        total = 0
+        invested = 0
+        for a in self.__assets:
+            value = a.get_value_as_of_date(d)
+            values.setdefault(a.type, value)
+            total += value
+            invested += a.get_invested_amount_as_of_date(d)
+        return Valuation(d, values, total, invested)
 
     def get_asset_weight(self, asset: AssetType, curr_date=None):
         for a in self.__assets:
             if a.type == asset:
                 if curr_date:
-                    return a.get_value_as_of_date(curr_date) / self.get_value_as_of_date(curr_date)
+                    return self.valuation(curr_date).get_weight(asset)
                 else:
                     return a.get_current_value() / self.get_current_value()
         return 0
@@ -123,6 +135,9 @@ class Portfolio:
     def get_trade_book(self) -> list:
         return self.get_asset(AssetType.EQUITY).get_trade_book()
 
+    def get_trade_journal(self) -> TradeBook:
+        return self.__trade_book
+
     def get_strategy(self) -> Strategy:
         return self.__strategy
 
@@ -130,7 +145,7 @@ class Portfolio:
         try:
             eq = self.get_asset(AssetType.EQUITY)
         except AssetNotFoundException:
-            eq = Equity()
+            eq = Equity(self.__trade_book)
             self.__assets.append(eq)
         eq.add(**kwargs)
 
@@ -138,7 +153,7 @@ class Portfolio:
         try:
             dt = self.get_asset(AssetType.DEBT)
         except AssetNotFoundException:
-            dt = Debt()
+            dt = Debt(self.__trade_book)
             self.__assets.append(dt)
         dt.add(**kwargs)
 
@@ -152,6 +167,7 @@ class Portfolio:
             cash_asset = Cash(cash_value)
             self.__assets.append(cash_asset)
 
+    @profiler.timed("add_equities")
     def add_equities_by_amount(self, amount: int, d: date):
         eq = self.get_asset(AssetType.EQUITY)
         eq.add_by_amount(amount=amount, d=d)
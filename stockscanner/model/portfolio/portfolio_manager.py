@@ -15,9 +15,8 @@ class PortfolioManager:
 
     @classmethod
     def get_instance(cls):
-        config = Config.load_config()
         if PortfolioManager.manager is None:
-            PortfolioManager.manager = PortfolioManager(config)
+            PortfolioManager.manager = PortfolioManager(Config.load_config())
         return PortfolioManager.manager
 
     def get_portfolio_following_strategy(self, sname: str):
@@ -0,0 +1,41 @@
+from datetime import date
+from typing import Dict
+
+from stockscanner.model.asset.asset_type import AssetType
+
+
+class Valuation:
+    """Value of every asset type of a portfolio on one date, computed in a single pass over the assets."""
+
+    def __init__(self, d: date, values: Dict[AssetType, float], total: float, invested: float) -> None:
+        self.date = d
+        self.values = values
+        self.total = total
+        self.invested = invested
+
+    def get_value(self, asset_type: AssetType) -> float:
+        return self.values.get(asset_type, 0)
+
+    def get_weight(self, asset_type: AssetType) -> float:
+        if asset_type not in self.values:
+            return 0
+        return self.values[asset_type] / self.total
+
+    def get_weights(self) -> dict:
+        return {
+            "eq_weight": self.get_weight(AssetType.EQUITY),
+            "debt_weight": self.get_weight(AssetType.DEBT),
+            "gold_weight": self.get_weight(AssetType.GOLD),
+            "cash_weight": self.get_weight(AssetType.CASH),
+        }
+
+    def describe(self) -> str:
+        return f"Total Invested: ${self.invested}, " \
+               f"Current Value: ${self.total} \r\n " \
+               f"eq: {self.get_weight(AssetType.EQUITY)} " \
+               f"debt: {self.get_weight(AssetType.DEBT)} " \
+               f"gold: {self.get_weight(AssetType.GOLD)} " \
+               f"cash: {self.get_weight(AssetType.CASH)}"
+
+    def __str__(self) -> str:
+        return f"{self.date}: {self.describe()}"
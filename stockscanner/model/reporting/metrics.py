@@ -0,0 +1,89 @@
+import numpy as np
+
+DAYS_PER_YEAR = 365.25
+TRADING_DAYS_PER_YEAR = 252
+
+
+def cagr(dates: np.ndarray, values: np.ndarray) -> float:
+    if len(values) < 2 or values[0] <= 0:
+        return np.nan
+    years = (dates[-1] - dates[0]) / np.timedelta64(1, 'D') / DAYS_PER_YEAR
+    if years <= 0:
+        return np.nan
+    return (values[-1] / values[0]) ** (1 / years) - 1
+
+
+def max_drawdown(values: np.ndarray) -> float:
+    # largest fall from a running peak, as a fraction of the peak (0.3 == 30% down)
+    if len(values) == 0:
+        return np.nan
+    peaks = np.maximum.accumulate(values)
+    return float(np.max(1 - values / peaks))
+
+
+def nav(dates: np.ndarray, values: np.ndarray, flow_dates, flow_amounts) -> np.ndarray:
+    # time weighted value of one unit bought on the first date, so money put in or taken out later isn't return.
+    # Flows are negative when money goes in (portfolio cashflows) and count on the first date on or after them.
+    # Flows up to the first date are in its value already. Without later flows the values come back as they are.
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=np.float64)
+    flow_dates = np.asarray(flow_dates, dtype="datetime64[D]")
+    flow_amounts = np.asarray(flow_amounts, dtype=np.float64)
+    later = (flow_dates > dates[0]) & (flow_dates <= dates[-1]) if len(dates) else np.zeros(len(flow_dates), bool)
+    if not later.any():
+        return values
+    rows = np.searchsorted(dates, flow_dates[later], side="left")
+    inflows = np.bincount(rows, weights=-flow_amounts[later], minlength=len(values))
+    # each day's growth leaves out what was added that day
+    growth = np.ones(len(values))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[1:] = np.where(values[:-1] > 0, (values[1:] - inflows[1:]) / values[:-1], 1)
+    return np.cumprod(growth)
+
+
+def daily_returns(values: np.ndarray) -> np.ndarray:
+    if len(values) < 2:
+        return np.empty(0)
+    return values[1:] / values[:-1] - 1
+
+
+def volatility(values: np.ndarray, periods_per_year: int = TRADING_DAYS_PER_YEAR) -> float:
+    # annualized standard deviation of the per row returns
+    returns = daily_returns(values)
+    if len(returns) < 2:
+        return np.nan
+    return float(np.std(returns, ddof=1) * np.sqrt(periods_per_year))
+
+
+def sharpe(values: np.ndarray, risk_free_rate: float = 0, periods_per_year: int = TRADING_DAYS_PER_YEAR) -> float:
+    returns = daily_returns(values)
+    if len(returns) < 2:
+        return np.nan
+    excess = returns - risk_free_rate / periods_per_year
+    std = np.std(excess, ddof=1)
+    if std == 0:
+        return np.nan
+    return float(np.mean(excess) / std * np.sqrt(periods_per_year))
+
+
+def drawdown_duration(dates: np.ndarray, values: np.ndarray) -> int:
+    # longest time, in days, spent below a previous peak (up to the last date if it never recovered)
+    if len(values) == 0:
+        return 0
+    peaks = np.maximum.accumulate(values)
+    positions = np.arange(len(values))
+    last_peak = np.maximum.accumulate(np.where(values >= peaks, positions, 0))
+    return int(np.max((dates - dates[last_peak]) / np.timedelta64(1, 'D')))
+
+
+def rolling_returns(dates: np.ndarray, values: np.ndarray, window_days: int = 365) -> np.ndarray:
+    # return over the trailing window ending on every date, NaN until a full window is available
+    result = np.full(len(values), np.nan)
+    if len(values) == 0:
+        return result
+    starts = dates - np.timedelta64(window_days, 'D')
+    full = starts >= dates[0]
+    # value on the last row on or before the start of each window
+    start_rows = np.searchsorted(dates, starts[full], side="right") - 1
+    result[full] = values[full] / values[start_rows] - 1
+    return result
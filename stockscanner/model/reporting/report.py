@@ -1,7 +1,32 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.model.reporting import metrics, xirr
+
+
 class Report:
-    def __init__(self, p=None) -> None:
+    """
+    Daily value of a backtested portfolio in preallocated datetime64 / float64 arrays.
+    Metrics are computed on first use over the arrays and cached until another value is tracked. Return metrics use
+    the value of one unit (get_nav), which leaves out the money added to or taken from the portfolio on the way.
+    """
+
+    def __init__(self, p=None, capacity: int = 0) -> None:
         self.p = p
-        self.performance = []
+        self.dates = np.empty(capacity, dtype="datetime64[ns]")
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.__metrics = {}
+
+    @classmethod
+    def from_arrays(cls, dates, values, p=None):
+        report = cls(p)
+        report.dates = np.asarray(dates, dtype="datetime64[ns]")
+        report.values = np.asarray(values, dtype=np.float64)
+        report.size = len(report.values)
+        return report
 
     def __str__(self) -> str:
         res = f"{self.p}"
@@ -10,5 +35,107 @@ class Report:
     def add_portfolio(self, p):
         self.p = p
 
+    def __grow(self):
+        capacity = max(len(self.values) * 2, 16)
+        dates = np.empty(capacity, dtype="datetime64[ns]")
+        values = np.empty(capacity, dtype=np.float64)
+        dates[:self.size] = self.dates[:self.size]
+        values[:self.size] = self.values[:self.size]
+        self.dates = dates
+        self.values = values
+
     def track(self, entry):
-        self.performance.append(entry)
+        d, value = entry
+        if self.size == len(self.values):
+            self.__grow()
+        self.dates[self.size] = np.datetime64(d, "ns")
+        self.values[self.size] = value
+        self.size += 1
+        self.__metrics.clear()
+
+    def track_valuation(self, valuation):
+        self.track((valuation.date, valuation.total))
+
+    def get_dates(self) -> np.ndarray:
+        return self.dates[:self.size]
+
+    def get_values(self) -> np.ndarray:
+        return self.values[:self.size]
+
+    @property
+    def performance(self) -> list:
+        # (date, value) pairs, as the report used to store them
+        return list(zip(pd.to_datetime(self.get_dates()), self.get_values().tolist()))
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.get_values(), index=pd.DatetimeIndex(self.get_dates(), name="Date"), name="value")
+
+    def __metric(self, key, compute):
+        if key not in self.__metrics:
+            self.__metrics[key] = compute()
+        return self.__metrics[key]
+
+    def get_nav(self) -> np.ndarray:
+        # the return metrics are taken on this, so contributions (a SIP) don't show up as performance
+        def compute():
+            if self.p is None or self.size == 0:
+                return self.get_values()
+            flow_dates, flow_amounts = self.p.get_cashflows(self.dates[self.size - 1])
+            return metrics.nav(self.get_dates(), self.get_values(), flow_dates, flow_amounts)
+        return self.__metric("nav", compute)
+
+    def cagr(self) -> float:
+        return self.__metric("cagr", lambda: metrics.cagr(self.get_dates(), self.get_nav()))
+
+    def volatility(self) -> float:
+        return self.__metric("volatility", lambda: metrics.volatility(self.get_nav()))
+
+    def max_drawdown(self) -> float:
+        return self.__metric("max_drawdown", lambda: metrics.max_drawdown(self.get_nav()))
+
+    def drawdown_duration(self) -> int:
+        return self.__metric("drawdown_duration",
+                             lambda: metrics.drawdown_duration(self.get_dates(), self.get_nav()))
+
+    def sharpe(self, risk_free_rate: float = 0) -> float:
+        return self.__metric(("sharpe", risk_free_rate), lambda: metrics.sharpe(self.get_nav(), risk_free_rate))
+
+    def rolling_returns(self, window_days: int = 365) -> np.ndarray:
+        return self.__metric(("rolling_returns", window_days),
+                             lambda: metrics.rolling_returns(self.get_dates(), self.get_nav(), window_days))
+
+    def xirr(self) -> float:
+        # the portfolio's cashflows up to the last date, and its tracked value on that date
+        def compute():
+            if self.p is None or self.size == 0:
+                return np.nan
+            end = self.dates[self.size - 1]
+            flow_dates, flow_amounts = self.p.get_cashflows(end)
+            return xirr.xirr(np.append(flow_dates, end.astype("datetime64[D]")),
+                             np.append(flow_amounts, self.values[self.size - 1]))
+        return self.__metric("xirr", compute)
+
+    def xirr_series(self) -> np.ndarray:
+        # rate of return as of every tracked date, solved for all dates in batches
+        def compute():
+            if self.p is None:
+                return np.full(self.size, np.nan)
+            flow_dates, flow_amounts = self.p.get_cashflows()
+            return xirr.xirr_series(flow_dates, flow_amounts, self.get_dates(), self.get_values())
+        return self.__metric("xirr_series", compute)
+
+    def summary(self, risk_free_rate: float = 0) -> dict:
+        return {
+            "final_value": self.values[self.size - 1] if self.size else np.nan,
+            "cagr": self.cagr(),
+            "volatility": self.volatility(),
+            "max_drawdown": self.max_drawdown(),
+            "drawdown_days": self.drawdown_duration(),
+            "sharpe": self.sharpe(risk_free_rate),
+            "xirr": self.xirr(),
+        }
+
+
+def compare(reports: Dict[str, Report], risk_free_rate: float = 0) -> pd.DataFrame:
+    return pd.DataFrame.from_dict({name: report.summary(risk_free_rate) for name, report in reports.items()},
+                                  orient="index")
@@ -0,0 +1,125 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# XIRR discounts by actual days over 365, like the spreadsheet function
+DAYS_IN_YEAR = 365.0
+TOLERANCE = 1e-10
+MAX_NEWTON_ITERATIONS = 50
+MAX_BISECT_ITERATIONS = 200
+LOWEST_RATE = -0.999999
+DEFAULT_CHUNK_SIZE = 512
+
+
+def _npv(rates: np.ndarray, years: np.ndarray, amounts: np.ndarray):
+    # npv of every row at its own rate and its derivative with respect to the rate
+    growth = 1 + rates[:, None]
+    discounted = amounts * np.power(growth, -years)
+    return discounted.sum(axis=1), (-years * discounted / growth).sum(axis=1)
+
+
+def _bisect(years: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    lo = np.full(len(amounts), LOWEST_RATE)
+    hi = np.ones(len(amounts))
+    f_lo = _npv(lo, years, amounts)[0]
+    f_hi = _npv(hi, years, amounts)[0]
+    # widen the bracket until the npv changes sign. Rows where it never does have no rate of return.
+    for _ in range(10):
+        widen = np.sign(f_lo) == np.sign(f_hi)
+        if not widen.any():
+            break
+        hi[widen] *= 10
+        f_hi[widen] = _npv(hi[widen], years[widen], amounts[widen])[0]
+    bracketed = (np.sign(f_lo) != np.sign(f_hi)) & np.isfinite(f_lo) & np.isfinite(f_hi)
+    for _ in range(MAX_BISECT_ITERATIONS):
+        mid = (lo + hi) / 2
+        f_mid = _npv(mid, years, amounts)[0]
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo = np.where(left, mid, lo)
+        f_lo = np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+        if np.all((hi - lo)[bracketed] <= TOLERANCE * np.maximum(1, np.abs(lo[bracketed]))):
+            break
+    return np.where(bracketed, (lo + hi) / 2, np.nan)
+
+
+def solve(years, amounts, guess: float = 0.1) -> np.ndarray:
+    """
+    Annual rate of return of every row of cashflows. years[i, j] is the time of amounts[i, j] in years from any common
+    start, money put in is negative and money taken out (or the final value) positive. Rows are padded with 0 amounts.
+    All rows are solved together with Newton's method. Rows it doesn't converge on are bisected.
+    """
+    years = np.atleast_2d(np.asarray(years, dtype=np.float64))
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=np.float64))
+    years = np.broadcast_to(years, amounts.shape)
+    rates = np.full(len(amounts), guess, dtype=np.float64)
+    active = np.ones(len(amounts), dtype=bool)
+    failed = np.zeros(len(amounts), dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(MAX_NEWTON_ITERATIONS):
+            rows = np.flatnonzero(active)
+            if len(rows) == 0:
+                break
+            f, df = _npv(rates[rows], years[rows], amounts[rows])
+            step = f / df
+            new_rates = rates[rows] - step
+            invalid = ~np.isfinite(new_rates) | (new_rates <= -1)
+            rates[rows] = new_rates
+            failed[rows[invalid]] = True
+            converged = np.abs(step) <= TOLERANCE * np.maximum(1, np.abs(new_rates))
+            active[rows[invalid | converged]] = False
+        failed |= active
+        if failed.any():
+            rates[failed] = _bisect(years[failed], amounts[failed])
+    return rates
+
+
+def _years(dates, start) -> np.ndarray:
+    return (np.asarray(dates, dtype="datetime64[D]") - start) / np.timedelta64(1, 'D') / DAYS_IN_YEAR
+
+
+def xirr(dates, amounts, guess: float = 0.1) -> float:
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if len(dates) < 2:
+        return np.nan
+    return float(solve(_years(dates, dates.min()), amounts, guess)[0])
+
+
+def xirr_many(cashflows: List[Tuple[np.ndarray, np.ndarray]], guess: float = 0.1) -> np.ndarray:
+    # one rate per (dates, amounts) pair. The cashflows are padded into one matrix and solved in a single batch.
+    if len(cashflows) == 0:
+        return np.empty(0)
+    width = max(len(amounts) for _, amounts in cashflows)
+    years = np.zeros((len(cashflows), width))
+    padded = np.zeros((len(cashflows), width))
+    for i, (dates, amounts) in enumerate(cashflows):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if len(dates):
+            years[i, :len(dates)] = _years(dates, dates.min())
+            padded[i, :len(dates)] = amounts
+    return solve(years, padded, guess)
+
+
+def xirr_series(flow_dates, flow_amounts, dates, values, guess: float = 0.1,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Rate of return as of every date: the flows up to that date plus the value on it taken out.
+    Solved chunk_size dates at a time so the cashflow matrix stays small.
+    """
+    flow_dates = np.asarray(flow_dates, dtype="datetime64[D]")
+    flow_amounts = np.asarray(flow_amounts, dtype=np.float64)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(dates), np.nan)
+    if len(flow_dates) == 0 or len(dates) == 0:
+        return result
+    start = min(flow_dates.min(), dates.min())
+    flow_years = _years(flow_dates, start)
+    for i in range(0, len(dates), chunk_size):
+        chunk = slice(i, min(i + chunk_size, len(dates)))
+        amounts = np.where(flow_dates[None, :] <= dates[chunk, None], flow_amounts[None, :], 0)
+        years = np.broadcast_to(flow_years, amounts.shape)
+        amounts = np.column_stack((amounts, values[chunk]))
+        years = np.column_stack((years, _years(dates[chunk], start)))
+        result[chunk] = solve(years, amounts, guess)
+    return result
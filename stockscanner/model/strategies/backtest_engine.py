@@ -0,0 +1,181 @@
+import logging
+from datetime import date
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.model.asset.asset import Trade
+from stockscanner.model.asset.asset_type import AssetType
+from stockscanner.model.config import Config
+from stockscanner.model.portfolio.portfolio import Portfolio
+from stockscanner.model.reporting.report import Report
+from stockscanner.persistence.price_index import PriceIndex
+from stockscanner.utils import Constants
+from stockscanner.utils.ProfileUtils import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationResult:
+    def __init__(self, dates, values, equity_units, debt_values, cash_values, trades, debt_flows,
+                 rebalance_dates, rebalance_values, flow_dates, flow_amounts) -> None:
+        self.dates: np.ndarray = dates
+        self.values: np.ndarray = values
+        self.equity_units: np.ndarray = equity_units
+        self.debt_values: np.ndarray = debt_values
+        self.cash_values: np.ndarray = cash_values
+        # equity trades and (date, amount) deposits into / withdrawals from the savings account
+        self.trades: List[Trade] = trades
+        self.debt_flows: list = debt_flows
+        self.rebalance_dates: pd.DatetimeIndex = rebalance_dates
+        self.rebalance_values: np.ndarray = rebalance_values
+        # money put into the portfolio (negative amounts), for the rate of return
+        self.flow_dates: np.ndarray = np.asarray(flow_dates, dtype="datetime64[D]")
+        self.flow_amounts: np.ndarray = np.asarray(flow_amounts, dtype=np.float64)
+
+    def get_cashflows(self):
+        # flows plus the final value taken out on the last date
+        return np.append(self.flow_dates, self.dates[-1]), np.append(self.flow_amounts, self.values[-1])
+
+
+class BacktestEngine:
+    """
+    Simulates a portfolio of one equity symbol, a savings account and cash over the merged price frame.
+    Holdings only change on rebalance / cashflow days, so the daily value path is computed per segment
+    with numpy instead of revaluing the portfolio every day.
+    """
+
+    def __init__(self, df: pd.DataFrame, symbol: str = "NIFTY 50", interest_rate: float = None) -> None:
+        if interest_rate is None:
+            interest_rate = Config.load_config()["interest_rate"]
+        self.symbol = symbol
+        self.daily_rate = interest_rate / 100 / 365
+        self.prices = PriceIndex.from_frame(df)
+        self.dates: np.ndarray = self.prices.dates
+        self.closes: np.ndarray = self.prices.closes
+
+    def __growth(self, creation_date: np.datetime64, dates: np.ndarray) -> np.ndarray:
+        # savings account value of 1 deposited on the creation date
+        days = (dates - creation_date).astype(np.int64)
+        return np.power(1 + self.daily_rate, days)
+
+    def __report_range(self, start_date: date) -> slice:
+        start = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side="left")
+        return slice(start, len(self.dates))
+
+    @profiler.timed("simulate")
+    def simulate_target_weights(self, start_date: date, creation_date: date, initial_capital: float,
+                                initial_weights: dict, rebalance_dates, rebalance_weights: List[dict]) \
+            -> SimulationResult:
+        creation = np.datetime64(creation_date, 'D')
+        creation_price = self.prices.price_as_of(creation_date)
+        rebalance_idx = np.searchsorted(self.dates, np.asarray(rebalance_dates, dtype="datetime64[D]"))
+        rebalance_on = pd.to_datetime(self.dates[rebalance_idx])
+        k = len(rebalance_idx)
+
+        # state s applies after the s-th rebalance. Savings are kept as principal discounted to the creation date.
+        units = np.empty(k + 1)
+        discounted = np.empty(k + 1)
+        cash = np.empty(k + 1)
+        totals = np.empty(k)
+        units[0] = initial_weights.get("eq_weight", 0) * initial_capital / creation_price
+        discounted[0] = initial_weights.get("debt_weight", 0) * initial_capital
+        cash[0] = initial_weights.get("cash_weight", 0) * initial_capital
+
+        trades = [Trade("buy", creation_date, creation_price, units[0])]
+        debt_flows = [(creation_date, discounted[0])]
+        price = self.closes[rebalance_idx]
+        growth = self.__growth(creation, self.dates[rebalance_idx])
+        for s in range(k):
+            totals[s] = units[s] * price[s] + discounted[s] * growth[s] + cash[s]
+            weights = rebalance_weights[s]
+            units[s + 1] = weights.get("eq_weight", 0) * totals[s] / price[s]
+            discounted[s + 1] = weights.get("debt_weight", 0) * totals[s] / growth[s]
+            cash[s + 1] = weights.get("cash_weight", 0) * totals[s]
+            delta = units[s + 1] - units[s]
+            if delta != 0:
+                trades.append(Trade("buy" if delta > 0 else "sell", rebalance_on[s], price[s], abs(delta)))
+            debt_flows.append((rebalance_on[s], (discounted[s + 1] - discounted[s]) * growth[s]))
+
+        window = self.__report_range(start_date)
+        dates = self.dates[window]
+        state = np.searchsorted(rebalance_idx, np.arange(window.start, len(self.dates)), side="right")
+        equity_units = units[state]
+        debt_values = discounted[state] * self.__growth(creation, dates)
+        cash_values = cash[state]
+        values = equity_units * self.closes[window] + debt_values + cash_values
+        return SimulationResult(dates, values, equity_units, debt_values, cash_values, trades, debt_flows,
+                                rebalance_on, totals, [creation], [-initial_capital])
+
+    @profiler.timed("simulate")
+    def simulate_cashflows(self, start_date: date, creation_date: date, initial_capital: float,
+                           cashflow_dates, cashflow_amounts) -> SimulationResult:
+        creation_price = self.prices.price_as_of(creation_date)
+        cashflow_idx = np.searchsorted(self.dates, np.asarray(cashflow_dates, dtype="datetime64[D]"))
+        cashflow_on = pd.to_datetime(self.dates[cashflow_idx])
+        price = self.closes[cashflow_idx]
+        bought = np.asarray(cashflow_amounts, dtype=np.float64) / price
+        units = np.concatenate(([initial_capital / creation_price], bought)).cumsum()
+
+        trades = [Trade("buy", creation_date, creation_price, units[0])]
+        trades.extend(Trade("buy", d, p, q) for d, p, q in zip(cashflow_on, price, bought))
+
+        window = self.__report_range(start_date)
+        dates = self.dates[window]
+        state = np.searchsorted(cashflow_idx, np.arange(window.start, len(self.dates)), side="right")
+        equity_units = units[state]
+        values = equity_units * self.closes[window]
+        zeros = np.zeros(len(dates))
+        flow_dates = np.append(np.datetime64(creation_date, 'D'), self.dates[cashflow_idx])
+        flow_amounts = -np.append(initial_capital, np.asarray(cashflow_amounts, dtype=np.float64))
+        return SimulationResult(dates, values, equity_units, zeros, zeros, trades, [], cashflow_on,
+                                units[1:] * price, flow_dates, flow_amounts)
+
+    def run_target_weights(self, start_date: date, creation_date: date, initial_capital: float,
+                           initial_weights: dict, rebalance_dates, rebalance_weights: List[dict]) -> Report:
+        result = self.simulate_target_weights(start_date, creation_date, initial_capital, initial_weights,
+                                              rebalance_dates, rebalance_weights)
+        return self.to_report(result)
+
+    def run_cashflows(self, start_date: date, creation_date: date, initial_capital: float,
+                      cashflow_dates, cashflow_amounts) -> Report:
+        result = self.simulate_cashflows(start_date, creation_date, initial_capital, cashflow_dates,
+                                         cashflow_amounts)
+        return self.to_report(result)
+
+    @profiler.timed("to_report")
+    def to_report(self, result: SimulationResult) -> Report:
+        return Report.from_arrays(result.dates, result.values, self.replay(result))
+
+    def replay(self, result: SimulationResult) -> Portfolio:
+        # builds the final portfolio from the trades so that reports keep their holdings, trade book and logs
+        p = Portfolio("test_portfolio")
+        for trade in result.trades:
+            if trade.action == "buy":
+                p.add_stock(symbol=self.symbol, date=trade.date, quantity=trade.quantity, price=trade.price)
+            else:
+                p.get_asset(AssetType.EQUITY).remove(symbol=self.symbol, quantity=trade.quantity, date=trade.date,
+                                                     price=trade.price)
+        for d, amount in result.debt_flows:
+            if amount > 0:
+                p.add_debt(symbol=Constants.SAVINGS_ACC, date=d, quantity=amount, price=1)
+            elif amount < 0:
+                p.get_asset(AssetType.DEBT).remove(symbol=Constants.SAVINGS_ACC, quantity=-amount, date=d)
+        if len(result.cash_values):
+            p.add_cash(result.cash_values[-1])
+        for d, value in zip(result.rebalance_dates, result.rebalance_values):
+            p.add_rebalance_logs(f"Portfolio rebalanced on {d} \n + $Current Value: ${value}")
+        return p
+
+
+def threshold_crossings(values: np.ndarray, start: int, threshold: float) -> List[int]:
+    # positions (from start) where the value moved by more than threshold relative to the last pivot.
+    # The pivot resets on every crossing, so this is a scalar scan, but it never touches the portfolio.
+    result = []
+    pivot = values[start]
+    for i in range(start, len(values)):
+        if abs((values[i] - pivot) / pivot) >= threshold:
+            result.append(i)
+            pivot = values[i]
+    return result
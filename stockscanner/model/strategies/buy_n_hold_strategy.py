@@ -7,9 +7,11 @@ from stockscanner.model.exceptions.exceptions import PortfolioCreationException
 from stockscanner.model.portfolio.portfolio import Portfolio
 from stockscanner.model.portfolio.portfolio_builder import PortfolioBuilder
 from stockscanner.model.reporting.report import Report
+from stockscanner.model.strategies.backtest_engine import BacktestEngine, SimulationResult
 from stockscanner.model.strategies.strategy import Strategy
 from stockscanner.persistence.dao import TickerDAO
 from stockscanner.utils.DateUtils import get_df_between_dates
+from stockscanner.utils.ProfileUtils import profiler
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,8 @@ class BuyAndHold(Strategy):
                                cash_weight=weights["cash_weight"])
 
     def backtest(self, ticker_dao: TickerDAO, **kwargs) -> Report:
+        if kwargs.get("engine") == "vectorized":
+            return self.backtest_vectorized(ticker_dao, **kwargs)
         try:
             back_test_start_date = kwargs.get('back_test_start_date')
 
@@ -48,21 +52,20 @@ class BuyAndHold(Strategy):
                 .on_date(back_test_start_date) \
                 .build()
 
-            df_nifty = ticker_dao.read_all_data("NIFTY 50")
-            df_nifty_pe = ticker_dao.read_all_pe_data("NIFTY 50")
-            df_nifty = df_nifty.merge(df_nifty_pe, how="left", on="Date")
+            df_nifty = ticker_dao.read_joined("NIFTY 50")
             df_nifty_init = get_df_between_dates(df_nifty, back_test_start_date,
                                                  back_test_start_date + timedelta(5))
             back_test_start_date = df_nifty_init.iloc[0]['Date']
 
             p.apply_strategy(self)
             # iterate over each historical day from the date mentioned in kwargs
-            report: Report = Report()
+            report: Report = Report(capacity=int((df_nifty['Date'] >= back_test_start_date).sum()))
             for index, row in df_nifty.iterrows():
                 curr_date = row['Date']
                 logger.debug(curr_date)
+                profiler.count("rows")
                 if curr_date >= back_test_start_date:
-                    report.track((curr_date, p.get_value_as_of_date(curr_date)))
+                    report.track_valuation(p.valuation(curr_date))
             report.add_portfolio(p)
             return report
         except PortfolioCreationException:
@@ -70,6 +73,23 @@ class BuyAndHold(Strategy):
         except Exception as e:
             logger.error(f"Backtest failed: {e}")
 
+    def backtest_vectorized(self, ticker_dao: TickerDAO, **kwargs) -> Report:
+        try:
+            df_nifty = ticker_dao.read_joined("NIFTY 50")
+
+            engine = BacktestEngine(df_nifty, "NIFTY 50")
+            report = engine.to_report(self.simulate(engine, df_nifty, kwargs.get('back_test_start_date')))
+            report.p.apply_strategy(self)
+            return report
+        except Exception as e:
+            logger.error(f"Backtest failed: {e}")
+
+    def simulate(self, engine: BacktestEngine, df_nifty, back_test_start_date, signals: dict = None) \
+            -> SimulationResult:
+        return engine.simulate_target_weights(start_date=back_test_start_date, creation_date=back_test_start_date,
+                                              initial_capital=100000, initial_weights=self.get_asset_weights(),
+                                              rebalance_dates=[], rebalance_weights=[])
+
     @staticmethod
     def get_asset_weights():
         return {
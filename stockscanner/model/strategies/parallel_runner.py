@@ -0,0 +1,72 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict
+
+from stockscanner.model.config import Config
+from stockscanner.model.reporting.report import Report
+from stockscanner.persistence import dao_factory
+from stockscanner.persistence.dao import TickerDAO
+from stockscanner.persistence.dao_manager import DAOManager
+from stockscanner.persistence.mmap.mmap_impl import export_dataset
+
+logger = logging.getLogger(__name__)
+
+# per worker process state, set up once by the pool initializer
+_strategy_manager = None
+
+
+def _init_worker(dataset_dir):
+    global _strategy_manager
+    from stockscanner.model.strategies.strategy_manager import StrategyManager
+    # every DAO lookup in the worker (portfolio builder, holdings) goes to the shared read-only dataset
+    DAOManager.manager = DAOManager("mmap", directory=dataset_dir)
+    _strategy_manager = StrategyManager(Config.load_config(), DAOManager.manager.get_dao_for_ticker())
+
+
+def _run_job(strategy_config):
+    start = time.perf_counter()
+    report = _strategy_manager.back_test_strategy(strategy_config)
+    return report, time.perf_counter() - start
+
+
+class ParallelBacktestRunner:
+    def __init__(self, config=None, ticker_dao: TickerDAO = None, symbols: List[str] = None,
+                 max_workers: int = None) -> None:
+        if config is None:
+            config = Config.load_config()
+        if ticker_dao is None:
+            ticker_dao = dao_factory.get_ticker_dao(config["db"])
+        self.ticker_dao = ticker_dao
+        self.symbols = symbols if symbols else ["NIFTY 50"]
+        self.max_workers = max_workers if max_workers else os.cpu_count()
+        self.timings: Dict[str, float] = OrderedDict()
+
+    def run(self, strategy_configs: List[dict]) -> Dict[str, Report]:
+        dataset_dir = tempfile.mkdtemp(prefix="stockscanner_")
+        try:
+            start = time.perf_counter()
+            export_dataset(self.ticker_dao, self.symbols, dataset_dir)
+            logger.info(f"Dataset exported to {dataset_dir} in {time.perf_counter() - start:.3f}s")
+
+            workers = max(1, min(self.max_workers, len(strategy_configs)))
+            reports: Dict[str, Report] = OrderedDict()
+            self.timings.clear()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(dataset_dir,)) as executor:
+                # map keeps the results in the order of the configs, whichever worker finishes first
+                results = executor.map(_run_job, strategy_configs)
+                for strategy_config, (report, elapsed) in zip(strategy_configs, results):
+                    test_name = strategy_config["test_name"]
+                    reports[test_name] = report
+                    self.timings[test_name] = elapsed
+                    logger.info(f"{test_name} finished in {elapsed:.3f}s")
+            logger.info(f"{len(strategy_configs)} backtests on {workers} workers took "
+                        f"{time.perf_counter() - start:.3f}s")
+            return reports
+        finally:
+            shutil.rmtree(dataset_dir, ignore_errors=True)
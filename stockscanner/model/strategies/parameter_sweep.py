@@ -0,0 +1,117 @@
+import copy
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.model.reporting import metrics, xirr
+from stockscanner.model.strategies.backtest_engine import BacktestEngine
+from stockscanner.model.strategies.strategy import Strategy
+from stockscanner.persistence.dao import TickerDAO
+from stockscanner.persistence.mmap.mmap_impl import export_dataset, MemoryMappedTickerDaoImpl
+
+logger = logging.getLogger(__name__)
+
+METRICS = ["cagr", "xirr", "max_drawdown", "final_value", "rebalances"]
+# every metric is "higher is better" except the drawdown
+ASCENDING = {"max_drawdown": True}
+
+# per process state: the loaded frame, the engine built on it and the precomputed signals
+_state = {}
+
+
+def _load(ticker_dao: TickerDAO, strategy: Strategy, signals: dict):
+    df_nifty = ticker_dao.read_joined("NIFTY 50")
+    _state["df"] = df_nifty
+    _state["engine"] = BacktestEngine(df_nifty, "NIFTY 50")
+    _state["strategy"] = strategy
+    _state["signals"] = signals
+
+
+def _init_worker(dataset_dir, strategy: Strategy, signals: dict):
+    _load(MemoryMappedTickerDaoImpl(directory=dataset_dir), strategy, signals)
+
+
+def _evaluate(params: dict) -> dict:
+    row = dict(params)
+    try:
+        s: Strategy = copy.copy(_state["strategy"])
+        s.init(params)
+        back_test_start_date = datetime.strptime(params["backtest_start_date"], '%d-%m-%Y').date()
+        result = s.simulate(_state["engine"], _state["df"], back_test_start_date, _state["signals"])
+        # on the unit value, so a combination that puts in more money doesn't rank higher for it
+        nav = metrics.nav(result.dates, result.values, result.flow_dates, result.flow_amounts)
+        row["cagr"] = metrics.cagr(result.dates, nav)
+        row["max_drawdown"] = metrics.max_drawdown(nav)
+        row["final_value"] = float(result.values[-1])
+        row["rebalances"] = len(result.rebalance_dates)
+        # the rates of return of all combinations are solved together once they are back
+        row["cashflows"] = result.get_cashflows()
+        row["error"] = None
+    except Exception as e:
+        for metric in METRICS:
+            row[metric] = np.nan
+        row["error"] = str(e)
+    return row
+
+
+class ParameterSweep:
+    def __init__(self, strategy: Strategy, ticker_dao: TickerDAO, max_workers: int = None) -> None:
+        self.strategy = strategy
+        self.ticker_dao = ticker_dao
+        self.max_workers = max_workers if max_workers else os.cpu_count()
+
+    @staticmethod
+    def expand_grid(base_config: dict, grid: Dict[str, list]) -> List[dict]:
+        keys = list(grid.keys())
+        combinations = []
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = dict(base_config)
+            params.update(zip(keys, values))
+            combinations.append(params)
+        return combinations
+
+    def run(self, base_config: dict, grid: Dict[str, list], sort_by: str = "cagr") -> pd.DataFrame:
+        if sort_by not in METRICS:
+            raise Exception(f"Cannot sort by {sort_by}. Choose one of {METRICS}")
+        combinations = self.expand_grid(base_config, grid)
+        start = time.perf_counter()
+
+        _load(self.ticker_dao, self.strategy, {})
+        signals = self.strategy.precompute_signals(_state["df"])
+        _state["signals"] = signals
+        logger.info(f"Signals for {self.strategy.name} precomputed in {time.perf_counter() - start:.3f}s")
+
+        workers = max(1, min(self.max_workers, len(combinations)))
+        if workers == 1:
+            rows = [_evaluate(params) for params in combinations]
+        else:
+            dataset_dir = tempfile.mkdtemp(prefix="stockscanner_")
+            try:
+                export_dataset(self.ticker_dao, ["NIFTY 50"], dataset_dir)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(dataset_dir, self.strategy, signals)) as executor:
+                    chunk_size = max(1, len(combinations) // (workers * 4))
+                    rows = list(executor.map(_evaluate, combinations, chunksize=chunk_size))
+            finally:
+                shutil.rmtree(dataset_dir, ignore_errors=True)
+        logger.info(f"{len(combinations)} combinations of {self.strategy.name} evaluated on {workers} workers in "
+                    f"{time.perf_counter() - start:.3f}s")
+
+        solved = [i for i, row in enumerate(rows) if row.get("cashflows") is not None]
+        rates = xirr.xirr_many([rows[i]["cashflows"] for i in solved])
+        for i, rate in zip(solved, rates):
+            rows[i]["xirr"] = rate
+
+        columns = list(grid.keys()) + METRICS + ["error"]
+        results = pd.DataFrame(rows)[columns]
+        return results.sort_values(sort_by, ascending=ASCENDING.get(sort_by, False), na_position="last",
+                                   kind="stable", ignore_index=True)
@@ -0,0 +1,198 @@
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.utils.ProfileUtils import profiler
+
+DEFAULT_WINDOW_DAYS = 365 * 5
+
+
+def _round_frac(x, precision: int):
+    # same rounding pd.cut applies to the interval labels
+    if not np.isfinite(x) or x == 0:
+        return x
+    frac, whole = np.modf(x)
+    if whole == 0:
+        digits = -int(np.floor(np.log10(abs(frac)))) - 1 + precision
+    else:
+        digits = precision
+    return np.around(x, digits)
+
+
+def _label_edges(bins: np.ndarray, precision: int = 2) -> np.ndarray:
+    for p in range(precision, 20):
+        levels = np.array([_round_frac(b, p) for b in bins])
+        if np.unique(levels).size == bins.size:
+            return levels
+    return np.array([_round_frac(b, precision) for b in bins])
+
+
+def weights_for_equity(eq_weight: float) -> dict:
+    result = {"eq_weight": eq_weight}
+    # TODO: get debt weight
+    result["debt_weight"] = (1 - result["eq_weight"])
+    # TODO: get gold weight
+    result["gold_weight"] = 0
+    # get cash weight
+    result["cash_weight"] = 1 - result["eq_weight"] - result["gold_weight"] - result["debt_weight"]
+    return result
+
+
+class _FenwickTree:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.top = 1 << max(size.bit_length() - 1, 0)
+
+    def add(self, rank: int, delta: int):
+        i = rank + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, n: int) -> int:
+        # number of observations with rank < n
+        total = 0
+        while n > 0:
+            total += self.tree[n]
+            n -= n & -n
+        return total
+
+    def kth(self, k: int) -> int:
+        # rank of the k-th smallest observation (1 based)
+        pos = 0
+        step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class _Window:
+    def __init__(self, days: int, size: int) -> None:
+        self.days = days
+        self.counts = _FenwickTree(size)
+        self.n = 0
+        # first row that is still inside the window
+        self.tail = 0
+
+
+class RollingPEDistribution:
+    """
+    Distribution of P/E over trailing windows (5 years by default) that slides forward one trading day at a time.
+    Gives the same equity weights as bucketing the window with pd.cut and reading the cumulative probability of
+    the bucket holding the current P/E, without re-slicing and re-sorting the frame on every rebalance.
+    """
+
+    def __init__(self, dates, values, window_days: Iterable[int] = (DEFAULT_WINDOW_DAYS,)) -> None:
+        self.dates: np.ndarray = np.asarray(dates, dtype="datetime64[D]")
+        self.values: np.ndarray = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(self.values)
+        self.levels: np.ndarray = np.unique(self.values[valid])
+        self.ranks: np.ndarray = np.where(valid, np.searchsorted(self.levels, np.where(valid, self.values, 0)), -1)
+        self.window_days = tuple(window_days)
+        self.reset()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, window_days: Iterable[int] = (DEFAULT_WINDOW_DAYS,)):
+        return cls(df['Date'].values, df['P_E'].values, window_days)
+
+    def reset(self):
+        self.windows: Dict[int, _Window] = {days: _Window(days, len(self.levels)) for days in self.window_days}
+        # next row to be added
+        self.head = 0
+        self.curr_date = None
+
+    def advance_to(self, d: date):
+        day = np.datetime64(d, 'D')
+        if self.curr_date is not None and day < self.curr_date:
+            self.reset()
+        self.curr_date = day
+        end = int(np.searchsorted(self.dates, day, side="right"))
+        for i in range(self.head, end):
+            rank = self.ranks[i]
+            if rank >= 0:
+                for window in self.windows.values():
+                    window.counts.add(rank, 1)
+                    window.n += 1
+        self.head = max(self.head, end)
+        for window in self.windows.values():
+            start = int(np.searchsorted(self.dates, day - np.timedelta64(window.days, 'D'), side="left"))
+            for i in range(window.tail, min(start, self.head)):
+                rank = self.ranks[i]
+                if rank >= 0:
+                    window.counts.add(rank, -1)
+                    window.n -= 1
+            window.tail = max(window.tail, start)
+        return self
+
+    def current_value(self) -> float:
+        if self.head == 0:
+            return np.nan
+        return self.values[self.head - 1]
+
+    def count_le(self, x: float, window_days: int = DEFAULT_WINDOW_DAYS) -> int:
+        window = self.windows[window_days]
+        return window.counts.prefix(bisect_right(self.levels, x))
+
+    def equity_weight(self, window_days: int = DEFAULT_WINDOW_DAYS, max_weight: float = 80,
+                      min_weight: float = 50) -> float:
+        window = self.windows[window_days]
+        cur_pe = self.current_value()
+        if window.n == 0:
+            raise Exception("Could not determine equity weight")
+        mn = self.levels[window.counts.kth(1)]
+        mx = self.levels[window.counts.kth(window.n)]
+        n_bins = int(mx) - int(mn + 1)
+        if n_bins < 1:
+            raise ValueError("`bins` should be a positive integer.")
+        bins = np.linspace(mn, mx, n_bins + 1, endpoint=True)
+        bins[0] -= (mx - mn) * 0.001
+        # the bucket is looked up with the rounded label edges, the counts use the exact edges
+        edges = _label_edges(bins)
+        j = int(np.searchsorted(edges, cur_pe, side="left")) - 1
+        if np.isnan(cur_pe) or j < 0 or j >= n_bins:
+            raise Exception("Could not determine equity weight")
+        # share of the window at or below the upper edge of the current bucket
+        cumulative_probability = self.count_le(bins[j + 1], window_days) / window.n
+        return np.round(max_weight - (max_weight - min_weight) * cumulative_probability, 2) / 100
+
+    def get_asset_weights(self, curr_date, window_days: int = DEFAULT_WINDOW_DAYS) -> dict:
+        self.advance_to(curr_date)
+        return weights_for_equity(self.equity_weight(window_days))
+
+    def equity_weight_series(self, window_days: int = DEFAULT_WINDOW_DAYS) -> np.ndarray:
+        # equity weight for every row, NaN where it cannot be determined
+        self.reset()
+        result = np.full(len(self.dates), np.nan)
+        for i, d in enumerate(self.dates):
+            self.advance_to(d)
+            try:
+                result[i] = self.equity_weight(window_days)
+            except Exception:
+                pass
+        return result
+
+
+@profiler.timed("weights")
+def get_weights_for_rows(df_nifty: pd.DataFrame, rows: List[int], signals: dict = None) -> List[dict]:
+    if signals and "eq_weight" in signals:
+        eq_weights = signals["eq_weight"][rows]
+        if np.isnan(eq_weights).any():
+            raise Exception("Could not determine equity weight")
+        return [weights_for_equity(w) for w in eq_weights]
+    distribution = RollingPEDistribution.from_frame(df_nifty)
+    return [distribution.get_asset_weights(d) for d in df_nifty['Date'].iloc[rows]]
+
+
+@profiler.timed("weights")
+def get_asset_weights(df_nifty: pd.DataFrame, curr_date, distribution: RollingPEDistribution = None) -> dict:
+    if distribution is None:
+        distribution = RollingPEDistribution.from_frame(df_nifty)
+    return distribution.get_asset_weights(curr_date)
@@ -1,14 +1,17 @@
 import logging
 from datetime import timedelta, date, datetime
 
-from stockscanner.model.asset.asset_type import AssetType
+import pandas as pd
+
 from stockscanner.model.exceptions.exceptions import PortfolioCreationException
 from stockscanner.model.portfolio.portfolio import Portfolio
 from stockscanner.model.portfolio.portfolio_builder import PortfolioBuilder
 from stockscanner.model.reporting.report import Report
+from stockscanner.model.strategies.backtest_engine import BacktestEngine, SimulationResult
 from stockscanner.model.strategies.strategy import Strategy
 from stockscanner.persistence.dao import TickerDAO
 from stockscanner.utils.DateUtils import get_df_between_dates
+from stockscanner.utils.ProfileUtils import profiler
 
 logger = logging.getLogger(__name__)
 
@@ -71,12 +74,12 @@ class SIP(Strategy):
         p.add_equities_by_amount(self.sip_amount, curr_date)
 
     def backtest(self, ticker_dao: TickerDAO, **kwargs) -> Report:
+        if kwargs.get("engine") == "vectorized":
+            return self.backtest_vectorized(ticker_dao, **kwargs)
         try:
             back_test_start_date = kwargs.get('back_test_start_date')
 
-            df_nifty = ticker_dao.read_all_data("NIFTY 50")
-            df_nifty_pe = ticker_dao.read_all_pe_data("NIFTY 50")
-            df_nifty = df_nifty.merge(df_nifty_pe, how="left", on="Date")
+            df_nifty = ticker_dao.read_joined("NIFTY 50")
             df_nifty_init = get_df_between_dates(df_nifty, back_test_start_date, back_test_start_date + timedelta(5))
             back_test_start_date = df_nifty_init.iloc[0]['Date']
 
@@ -92,12 +95,13 @@ class SIP(Strategy):
                 .build()
             p.apply_strategy(self)
 
-            report: Report = Report()
+            report: Report = Report(capacity=int((df_nifty['Date'] >= back_test_start_date).sum()))
 
             # iterate over each historical day from the date mentioned in kwargs
             for index, row in df_nifty.iterrows():
                 curr_date = row['Date']
-                print(curr_date)
+                logger.debug(curr_date)
+                profiler.count("rows")
                 if curr_date >= back_test_start_date:
                     if curr_date < self.sip_start_date:
                         # report.track((curr_date, 0))
@@ -107,15 +111,13 @@ class SIP(Strategy):
                         if self.check_if_constraints_are_matched(date=curr_date):
                             # // weights will be recalculated based on parameters.
                             p.add_equities_by_amount(self.sip_amount, curr_date)
-                            message = f"Total Invested: ${p.total_invested()}, " \
-                                      f"Current Value: ${p.get_value_as_of_date(curr_date)} \r\n " \
-                                      f"eq: {p.get_asset_weight(AssetType.EQUITY, curr_date)} " \
-                                      f"debt: {p.get_asset_weight(AssetType.DEBT, curr_date)} " \
-                                      f"gold: {p.get_asset_weight(AssetType.GOLD, curr_date)} " \
-                                      f"cash: {p.get_asset_weight(AssetType.CASH, curr_date)}"
+                            valuation = p.valuation(curr_date)
+                            message = valuation.describe()
                             current_pe = (df_nifty.loc[df_nifty['Date'] == curr_date])['P_E'].iloc[0]
                             p.add_rebalance_logs(f"Portfolio rebalanced on {curr_date} pe:{current_pe} \n + ${message}")
-                        report.track((curr_date, p.get_value_as_of_date(curr_date)))
+                            report.track_valuation(valuation)
+                        else:
+                            report.track_valuation(p.valuation(curr_date))
             report.add_portfolio(p)
             return report
         except PortfolioCreationException:
@@ -123,6 +125,38 @@ class SIP(Strategy):
         except Exception as e:
             logger.error(f"Backtest failed: {e}")
 
+    def backtest_vectorized(self, ticker_dao: TickerDAO, **kwargs) -> Report:
+        try:
+            df_nifty = ticker_dao.read_joined("NIFTY 50")
+
+            engine = BacktestEngine(df_nifty, "NIFTY 50")
+            report = engine.to_report(self.simulate(engine, df_nifty, kwargs.get('back_test_start_date')))
+            report.p.apply_strategy(self)
+            return report
+        except Exception as e:
+            logger.error(f"Backtest failed: {e}")
+
+    def simulate(self, engine: BacktestEngine, df_nifty, back_test_start_date, signals: dict = None) \
+            -> SimulationResult:
+        df_nifty_init = get_df_between_dates(df_nifty, back_test_start_date, back_test_start_date + timedelta(5))
+        back_test_start_date = df_nifty_init.iloc[0]['Date']
+
+        sip_dates = self.get_sip_dates(df_nifty['Date'])
+        sip_dates = sip_dates[sip_dates >= back_test_start_date]
+        return engine.simulate_cashflows(start_date=max(back_test_start_date.date(), self.sip_start_date),
+                                         creation_date=self.sip_start_date, initial_capital=1,
+                                         cashflow_dates=sip_dates.values,
+                                         cashflow_amounts=[self.sip_amount] * len(sip_dates))
+
+    def get_sip_dates(self, dates):
+        # vectorized form of check_if_constraints_are_matched
+        mask = dates >= pd.Timestamp(self.sip_start_date)
+        if self.sip_frequency == SipFrequency.WEEKLY:
+            mask &= dates.dt.weekday == self.sip_start_date.weekday()
+        elif self.sip_frequency == SipFrequency.MONTHLY:
+            mask &= dates.dt.day == self.sip_start_date.day
+        return dates[mask]
+
     @staticmethod
     def get_asset_weights():
         result = {"eq_weight": 1}
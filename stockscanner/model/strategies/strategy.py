@@ -23,3 +23,11 @@ class Strategy(ABC):
 
     def init(self, strategy_config: dict):
         pass
+
+    def precompute_signals(self, df) -> dict:
+        # per day inputs that don't depend on the strategy parameters, shared across a parameter sweep
+        return {}
+
+    @abstractmethod
+    def simulate(self, engine, df, back_test_start_date, signals: dict = None):
+        pass
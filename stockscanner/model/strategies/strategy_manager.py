@@ -1,16 +1,21 @@
+import copy
 import logging
-from typing import List
+from typing import List, Dict
+
+import pandas as pd
 
 from stockscanner.model.config import Config
 from stockscanner.model.exceptions.exceptions import StrategyNotFoundException
 from stockscanner.model.reporting.report import Report
 from stockscanner.model.strategies.buy_n_hold_strategy import BuyAndHold
+from stockscanner.model.strategies.parameter_sweep import ParameterSweep
 from stockscanner.model.strategies.pe_based_allocations import PEBasedAllocation
 from stockscanner.model.strategies.sip import SIP
 from stockscanner.model.strategies.strategy import Strategy
 from stockscanner.model.strategies.market_movement_based_allocation import MarketMovementBasedAllocation
 from stockscanner.persistence import dao_factory
 from stockscanner.persistence.dao import TickerDAO
+from stockscanner.utils.ProfileUtils import ProfileResult, profiler
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,27 +24,51 @@ logger = logging.getLogger(__name__)
 class StrategyManager:
     manager = None
 
-    def __init__(self, config) -> None:
+    def __init__(self, config, ticker_dao: TickerDAO = None, profile: bool = False) -> None:
         self.strategies: List[Strategy] = [
             MarketMovementBasedAllocation(config["strategies"]["MarketMovementBasedAllocation"]["change_threshold"]),
             BuyAndHold(),
             SIP(),
             PEBasedAllocation(config["strategies"]["MarketMovementBasedAllocation"]["change_threshold"])
         ]
-        self.ticker_dao: TickerDAO = dao_factory.get_ticker_dao(config["db"])
+        if ticker_dao is None:
+            ticker_dao = dao_factory.get_ticker_dao(config["db"])
+        self.ticker_dao: TickerDAO = ticker_dao
+        # with profile on, every backtest records its stage breakdown here, keyed by test name
+        self.profile = profile
+        self.profiles: Dict[str, ProfileResult] = {}
+
+    def back_test_strategy(self, strategy_config, cprofile_output: str = None) -> Report:
+        if not self.profile and cprofile_output is None:
+            return self.__back_test_strategy(strategy_config, self.ticker_dao)
+        name = strategy_config.get("test_name", strategy_config["strategy_name"])
+        with profiler.profile(name, memory=self.profile, cprofile_output=cprofile_output) as result:
+            config_loads = Config.loads
+            report = self.__back_test_strategy(strategy_config, profiler.instrument(self.ticker_dao, "dao"))
+            profiler.count("config_loads", Config.loads - config_loads)
+        self.profiles[name] = result
+        logger.info(f"Profile of {result}")
+        return report
 
-    def back_test_strategy(self, strategy_config) -> Report:
+    def __back_test_strategy(self, strategy_config, ticker_dao) -> Report:
         strategy_name = strategy_config["strategy_name"]
         try:
-            s: Strategy = self.get_by_name(strategy_name)
+            # work on a copy so that one backtest's parameters and state don't leak into the next one
+            s: Strategy = copy.copy(self.get_by_name(strategy_name))
             s.init(strategy_config)
             date_time_obj = datetime.strptime(strategy_config["backtest_start_date"], '%d-%m-%Y').date()
-            return s.backtest(self.ticker_dao, back_test_start_date=date_time_obj)
+            return s.backtest(ticker_dao, back_test_start_date=date_time_obj,
+                              engine=strategy_config.get("engine", "iterative"))
         except StrategyNotFoundException:
             logger.error(f"Strategy {strategy_name} not found")
         except Exception as e:
             logger.error(f"backtesting the strategy {strategy_name} failed: {e}")
 
+    def sweep(self, strategy_name, base_config: dict, grid: Dict[str, list], sort_by: str = "cagr",
+              max_workers: int = None) -> pd.DataFrame:
+        return ParameterSweep(self.get_by_name(strategy_name), self.ticker_dao, max_workers) \
+            .run(base_config, grid, sort_by)
+
     def get_by_name(self, sname) -> Strategy:
         for s in self.strategies:
             if s.name == sname:
@@ -51,7 +80,6 @@ class StrategyManager:
 
     @classmethod
     def get_instance(cls):
-        config = Config.load_config()
         if StrategyManager.manager is None:
-            StrategyManager.manager = StrategyManager(config)
+            StrategyManager.manager = StrategyManager(Config.load_config())
         return StrategyManager.manager
@@ -19,9 +19,7 @@ class ChangeWatcher(Thread):
         from stockscanner.model.strategies.strategy_manager import StrategyManager
 
         dao = DAOManager.get_instance().get_dao_for_ticker()
-        df_nifty = dao.read_all_data("NIFTY 50")
-        df_nifty_pe = dao.read_all_pe_data("NIFTY 50")
-        df_nifty = df_nifty.merge(df_nifty_pe, how="left", on="Date")
+        df_nifty = dao.read_joined("NIFTY 50")
 
         sm = StrategyManager.get_instance()
         strategies: List[Strategy] = sm.get_all_strategies()
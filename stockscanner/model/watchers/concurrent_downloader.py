@@ -0,0 +1,103 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Callable, Dict, List
+
+from stockscanner.utils.RateLimitUtils import TokenBucket, retry
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadJob:
+    def __init__(self, kind: str, start_date: date, end_date: date) -> None:
+        self.kind = kind
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __repr__(self) -> str:
+        return f"{self.kind} {self.start_date}-{self.end_date}"
+
+
+class ConcurrentDownloader:
+    """
+    Fetches date ranges on a bounded thread pool within a shared requests/sec budget.
+    `fetchers[kind](start_date, end_date)` returns the rows of a range and `writers[kind](rows)` stores them.
+    Writes happen on the calling thread, in the order the jobs of a kind were given, as soon as every earlier
+    range of that kind has arrived.
+    Downloaders given the same `limiter` share its requests/sec budget.
+    """
+
+    def __init__(self, fetchers: Dict[str, Callable[[date, date], list]], writers: Dict[str, Callable[[list], None]],
+                 requests_per_sec: float = 2, burst: float = None, workers: int = 4, retries: int = 3,
+                 backoff: float = 1, max_backoff: float = 30, limiter: TokenBucket = None) -> None:
+        self.fetchers = fetchers
+        self.writers = writers
+        self.limiter = limiter if limiter else TokenBucket(requests_per_sec, burst)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    @staticmethod
+    def limiter_from_config(config: dict) -> TokenBucket:
+        return TokenBucket(config.get("requests_per_sec", 2), config.get("burst"))
+
+    @classmethod
+    def from_config(cls, config: dict, fetchers, writers, limiter: TokenBucket = None):
+        return cls(fetchers, writers,
+                   workers=config.get("workers", 4),
+                   retries=config.get("retries", 3),
+                   backoff=config.get("backoff", 1),
+                   max_backoff=config.get("max_backoff", 30),
+                   limiter=limiter if limiter else cls.limiter_from_config(config))
+
+    def call(self, fn: Callable[[], object]):
+        # one request outside the jobs, retried and rate limited like them
+        return retry(fn, retries=self.retries, base_delay=self.backoff, max_delay=self.max_backoff,
+                     limiter=self.limiter)
+
+    def __fetch(self, job: DownloadJob) -> list:
+        return self.call(lambda: self.fetchers[job.kind](job.start_date, job.end_date))
+
+    def run(self, jobs: List[DownloadJob]) -> dict:
+        start = time.perf_counter()
+        # position of every job among the jobs of its kind and the next position that may be written
+        positions = []
+        counts = {}
+        for job in jobs:
+            positions.append(counts.get(job.kind, 0))
+            counts[job.kind] = positions[-1] + 1
+        next_write = {kind: 0 for kind in counts}
+        pending = {kind: {} for kind in counts}
+        stats = {"jobs": len(jobs), "failed": 0, "failed_jobs": [], "rows": 0}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.__fetch, job): i for i, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                job = jobs[futures[future]]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.error(f"Unable to get data for {job}: {e}")
+                    stats["failed"] += 1
+                    stats["failed_jobs"].append(job)
+                    rows = []
+                pending[job.kind][positions[futures[future]]] = rows
+                self.__flush(job.kind, next_write, pending, stats)
+                elapsed = time.perf_counter() - start
+                logger.info(f"{done}/{len(jobs)} ranges fetched ({job})... "
+                            f"{done / elapsed:.2f} ranges/s, {stats['rows'] / elapsed:.0f} rows/s")
+
+        stats["elapsed"] = time.perf_counter() - start
+        logger.info(f"Downloaded {stats['rows']} rows in {len(jobs)} requests ({stats['failed']} failed) "
+                    f"in {stats['elapsed']:.1f}s")
+        return stats
+
+    def __flush(self, kind, next_write, pending, stats):
+        while next_write[kind] in pending[kind]:
+            rows = pending[kind].pop(next_write[kind])
+            if rows:
+                self.writers[kind](rows)
+                stats["rows"] += len(rows)
+            next_write[kind] += 1
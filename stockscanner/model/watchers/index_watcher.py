@@ -1,35 +1,57 @@
 import logging
 import threading
-import time
-import bs4
 
 from datetime import date, timedelta
 from threading import Thread
 
+import numpy as np
+
+from stockscanner.model.config import Config
+from stockscanner.model.watchers import nse_parser
+from stockscanner.model.watchers.concurrent_downloader import ConcurrentDownloader, DownloadJob
+from stockscanner.model.watchers.nse_parser import CsvBatch
+from stockscanner.model.watchers.sync_planner import SyncPlanner
 from stockscanner.persistence import dao_factory
 from stockscanner.persistence.dao import TickerDAO
-from stockscanner.utils import HttpUtils, Constants
+from stockscanner.utils import HttpUtils, Constants, DateUtils
+from stockscanner.utils.RateLimitUtils import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+COVERAGE_LAG_DAYS = 2
+
 
 class IndexWatcher(Thread):
-    def __init__(self, ticker, watch_freq, db, hist_start_year):
+    def __init__(self, ticker, watch_freq, db, hist_start_year, limiter: TokenBucket = None):
         super().__init__()
         self.hist_start_year = hist_start_year
         self.watch_freq = watch_freq * 60
         self.ticker = ticker
-        self.ticker_dao: TickerDAO = dao_factory.get_ticker_dao(db, check_same_thread=False)
+        self.ticker_dao: TickerDAO = dao_factory.get_ticker_dao(db)
+        self.stopped = threading.Event()
+        # points at a local stand-in in the benchmarks
+        self.base_url = Config.load_config().get("nse", {}).get("base_url", Constants.BASE_URL_NSE1)
+        # the requests/sec budget of every sync of this watcher. The WatchScheduler hands all its watchers one
+        self.limiter = limiter if limiter else ConcurrentDownloader.limiter_from_config(
+            Config.load_config().get("downloader", {}))
 
     def run(self) -> None:
-        # 1. pull hist data
-        self.download_historical_ohlc_data()
-        self.download_historical_pe_data()
-        # 2. Pull the data from the NSE Website for yesterday. Save to DB.
-        self.download_today_ohlc_data()
-        self.download_today_pe_data()
-        # 3. Sleep for configured time.
-        # time.sleep(self.watch_freq)
+        while not self.stopped.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(e)
+            # 3. Sleep for configured time.
+            self.stopped.wait(self.watch_freq)
+
+    def stop(self):
+        self.stopped.set()
+
+    def sync(self):
+        # one refresh of the ticker: everything missing up to yesterday, gaps from downtime included
+        stats = self.download_historical_data()
+        if stats and stats["failed"]:
+            raise Exception(f"Sync of {self.ticker} failed: {stats['failed']} of {stats['jobs']} ranges failed")
 
     def download_today_ohlc_data(self):
         try:
@@ -41,50 +63,99 @@ class IndexWatcher(Thread):
             logger.error(e)
 
     def download_historical_ohlc_data(self):
-        historical_data_exists = self.ticker_dao.ohlc_schema_exists(self.ticker)
-        if not historical_data_exists:
-            logger.info(f"{threading.current_thread()} Starting to download historical data...")
-            try:
-                self.write_headers()
-                time.sleep(1)
-                for i in range(self.hist_start_year, date.today().year + 1):
-                    if i % 4 == 0:
-                        # leap year. Cannot download data for more than 365 days. So split req into two parts
-                        self.download_ohlc_data_between_dates(self.ticker, start_date=date(i, 1, 1),
-                                                              end_date=date(i, 12, 30))
-                        self.download_ohlc_data_between_dates(self.ticker, start_date=date(i, 12, 31),
-                                                              end_date=date(i, 12, 31))
-                    else:
-                        self.download_ohlc_data_between_dates(self.ticker, start_date=date(i, 1, 1),
-                                                              end_date=date(i, 12, 31))
-                    logger.info(str(i) + "... done")
-                    logger.info("Sleep for 2 seconds...")
-                    time.sleep(2)  # sleep for 10 seconds
-            except Exception as e:
-                logger.error(e)
+        self.download_historical_data(ohlc=True, pe=False)
+
+    def download_historical_data(self, ohlc=True, pe=True):
+        # fetches only the trading days that are neither stored nor inside a range synced before.
+        # OHLC and PE windows are fetched concurrently and written to the dao in date order
+        stored = {}
+        downloader = ConcurrentDownloader.from_config(
+            Config.load_config().get("downloader", {}),
+            fetchers={"ohlc": self.fetch_ohlc_data_between_dates, "pe": self.fetch_pe_data_between_dates},
+            writers={"ohlc": lambda batch: self.__save(batch, stored["ohlc"], self.ticker_dao.save_frame),
+                     "pe": lambda batch: self.__save(batch, stored["pe"], self.ticker_dao.save_pe_frame)},
+            limiter=self.limiter)
+        kinds = []
+        try:
+            if ohlc:
+                if not self.ticker_dao.ohlc_schema_exists(self.ticker):
+                    downloader.call(self.write_headers)
+                kinds.append("ohlc")
+        except Exception as e:
+            logger.error(e)
+        try:
+            if pe:
+                if not self.ticker_dao.pe_schema_exists(self.ticker):
+                    downloader.call(self.write_pe_headers)
+                kinds.append("pe")
+        except Exception as e:
+            logger.error(e)
+
+        start_date = date(self.hist_start_year, 1, 1)
+        end_date = date.today() - timedelta(1)
+        planner = SyncPlanner()
+        jobs = []
+        for kind in kinds:
+            stored[kind] = self.ticker_dao.get_stored_dates(self.ticker, kind)
+            windows = planner.plan(start_date, end_date, stored[kind], self.ticker_dao.get_coverage(self.ticker, kind))
+            jobs.extend(DownloadJob(kind, window_start, window_end) for window_start, window_end in windows)
+        if len(jobs) == 0:
+            return None
+        logger.info(f"{threading.current_thread()} {self.ticker}: {len(jobs)} ranges to download "
+                    f"({', '.join(str(job) for job in jobs[:5])}{'...' if len(jobs) > 5 else ''})")
+        stats = downloader.run(jobs)
+        # the last couple of days stay uncovered: their data may simply not be published yet
+        covered_until = date.today() - timedelta(COVERAGE_LAG_DAYS)
+        for job in jobs:
+            if job not in stats["failed_jobs"] and job.start_date <= covered_until:
+                self.ticker_dao.add_coverage(self.ticker, job.kind, job.start_date, min(job.end_date, covered_until))
+        logger.info(f"HTTP session stats: {HttpUtils.SessionManager.get_instance().get_stats()}")
+        return stats
+
+    def __save(self, batch: CsvBatch, stored_dates, save):
+        # a window can span days that are stored already. Those rows are dropped instead of being written again
+        if len(stored_dates):
+            batch = batch.filter(~np.isin(batch.frame['Date'].values.astype("datetime64[D]"), stored_dates))
+        save(self.ticker, batch.frame, batch.entries)
+
+    def fetch_ohlc_data_between_dates(self, start_date, end_date, ticker=None) -> CsvBatch:
+        params = {
+            "indexType": ticker if ticker else self.ticker,
+            "fromDate": start_date.strftime("%d-%m-%Y"),
+            "toDate": end_date.strftime("%d-%m-%Y")
+        }
+        url = self.base_url + Constants.HISTORICAL_INDICES
+        return self.__fetch_csv_rows(url, params, nse_parser.OHLC_COLUMNS)
+
+    def fetch_pe_data_between_dates(self, start_date, end_date, ticker=None) -> CsvBatch:
+        params = {
+            "indexName": ticker if ticker else self.ticker,
+            "yield1": "undefined",
+            "yield2": "undefined",
+            "yield3": "undefined",
+            "yield4": "all",
+            "fromDate": start_date.strftime("%d-%m-%Y"),
+            "toDate": end_date.strftime("%d-%m-%Y")
+        }
+        url = self.base_url + Constants.HISTORICAL_PE_PB
+        return self.__fetch_csv_rows(url, params, nse_parser.PE_COLUMNS)
+
+    @staticmethod
+    def __fetch_csv_rows(url, params, columns) -> CsvBatch:
+        response = HttpUtils.do_get(url=url, query_parameters=params)
+        if response is None:
+            raise Exception(f"Request failed for range {params['fromDate']}-{params['toDate']}")
+        batch = nse_parser.parse_page(response, columns)
+        if batch is None:
+            logger.warning("Unable to get data for range " + str(params["fromDate"]) + "-" + str(params["toDate"]))
+            return nse_parser.CsvBatch([], nse_parser.parse_entries([], columns))
+        return batch
 
     def download_ohlc_data_between_dates(self, ticker, start_date, end_date):
         try:
-            params = {
-                "indexType": ticker,
-                "fromDate": start_date.strftime("%d-%m-%Y"),
-                "toDate": end_date.strftime("%d-%m-%Y")
-            }
-            url = Constants.BASE_URL_NSE1 + "/products/dynaContent/equities/indices/historicalindices.jsp"
-            response = HttpUtils.do_get(url=url, query_parameters=params)
-            soup = bs4.BeautifulSoup(response, "lxml")
-            # extract from soup now
-            OHLC_table_div = soup.find("div", {"id": "csvContentDiv"})
-            if OHLC_table_div:
-                lst = OHLC_table_div.text.split(":")
-                headers = lst[0]
-                # remove header and last entry(which is empty)
-                lst.pop(0)
-                lst.pop()
-                for entry in lst:
-                    self.ticker_dao.save(self.ticker, entry)
-            else:
-                logger.warning("Unable to get data for range " + str(start_date) + "-" + str(end_date))
+            batch = self.fetch_ohlc_data_between_dates(start_date, end_date, ticker)
+            if batch:
+                self.ticker_dao.save_frame(self.ticker, batch.frame, batch.entries)
         except Exception as e:
             logger.error(e)
 
@@ -97,37 +168,15 @@ class IndexWatcher(Thread):
             "fromDate": start_date.strftime("%d-%m-%Y"),
             "toDate": end_date.strftime("%d-%m-%Y")
         }
-        url = Constants.BASE_URL_NSE1 + "/products/dynaContent/equities/indices/historicalindices.jsp"
+        url = self.base_url + Constants.HISTORICAL_INDICES
         response = HttpUtils.do_get(url=url, query_parameters=params)
-        soup = bs4.BeautifulSoup(response, "lxml")
-        # extract from soup now
-        OHLC_table_div = soup.find("div", {"id": "csvContentDiv"})
-        lst = OHLC_table_div.text.split(":")
-        headers = lst[0]
+        if response is None:
+            raise Exception(f"Request for the headers of {self.ticker} failed")
+        headers = nse_parser.parse_headers(response)
         self.ticker_dao.save_headers(self.ticker, headers)
 
     def download_historical_pe_data(self):
-        historical_data_exists = self.ticker_dao.pe_schema_exists(self.ticker)
-        if not historical_data_exists:
-            logger.info(f"Starting to download historical pe data...")
-            try:
-                self.write_pe_headers()
-                time.sleep(1)
-                for i in range(self.hist_start_year, date.today().year + 1):
-                    if i % 4 == 0:
-                        # leap year. Cannot download data for more than 365 days. So split req into two parts
-                        self.download_pe_data_between_dates(self.ticker, start_date=date(i, 1, 1),
-                                                            end_date=date(i, 12, 30))
-                        self.download_pe_data_between_dates(self.ticker, start_date=date(i, 12, 31),
-                                                            end_date=date(i, 12, 31))
-                    else:
-                        self.download_pe_data_between_dates(self.ticker, start_date=date(i, 1, 1),
-                                                            end_date=date(i, 12, 31))
-                    logger.info(str(i) + "... done")
-                    logger.info("Sleep for 2 seconds...")
-                    time.sleep(2)  # sleep for 10 seconds
-            except Exception as e:
-                logger.error(e)
+        self.download_historical_data(ohlc=False, pe=True)
 
     def download_today_pe_data(self):
         try:
@@ -140,31 +189,9 @@ class IndexWatcher(Thread):
 
     def download_pe_data_between_dates(self, ticker, start_date, end_date):
         try:
-            params = {
-                "indexName": ticker,
-                "yield1": "undefined",
-                "yield2": "undefined",
-                "yield3": "undefined",
-                "yield4": "all",
-                "fromDate": start_date.strftime("%d-%m-%Y"),
-                "toDate": end_date.strftime("%d-%m-%Y")
-            }
-            url = Constants.BASE_URL_NSE1 + "/products/dynaContent/equities/indices/historical_pepb.jsp"
-            response = HttpUtils.do_get(url=url, query_parameters=params)
-            soup = bs4.BeautifulSoup(response, "lxml")
-            # extract from soup now
-            OHLC_table_div = soup.find("div", {"id": "csvContentDiv"})
-            if OHLC_table_div:
-                lst = OHLC_table_div.text.split(":")
-                headers = lst[0]
-                # remove header and last entry(which is empty)
-                lst.pop(0)
-                lst.pop()
-                for entry in lst:
-                    self.ticker_dao.save_pe_data(self.ticker, entry)
-            else:
-                logger.warning(
-                    "Unable to get data for range " + str(params["fromDate"]) + "-" + str(params["toDate"]))
+            batch = self.fetch_pe_data_between_dates(start_date, end_date, ticker)
+            if batch:
+                self.ticker_dao.save_pe_frame(self.ticker, batch.frame, batch.entries)
         except Exception as e:
             logger.error(e)
 
@@ -181,13 +208,11 @@ class IndexWatcher(Thread):
             "fromDate": start_date.strftime("%d-%m-%Y"),
             "toDate": end_date.strftime("%d-%m-%Y")
         }
-        url = Constants.BASE_URL_NSE1 + "/products/dynaContent/equities/indices/historical_pepb.jsp"
+        url = self.base_url + Constants.HISTORICAL_PE_PB
         response = HttpUtils.do_get(url=url, query_parameters=params)
-        soup = bs4.BeautifulSoup(response, "lxml")
-        # extract from soup now
-        OHLC_table_div = soup.find("div", {"id": "csvContentDiv"})
-        lst = OHLC_table_div.text.split(":")
-        headers = lst[0]
+        if response is None:
+            raise Exception(f"Request for the headers of {self.ticker} failed")
+        headers = nse_parser.parse_headers(response)
         self.ticker_dao.save_pe_headers(self.ticker, headers)
 
 
@@ -0,0 +1,70 @@
+import html
+import io
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# same column names the sqlite tables use
+OHLC_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Shares_Traded", "Turnover"]
+PE_COLUMNS = ["Date", "P_E", "P_B", "Div_Yield"]
+
+CSV_DIV = re.compile(r"<div[^>]*\bid\s*=\s*[\"']?csvContentDiv\b[^>]*>", re.IGNORECASE)
+DIV_END = re.compile(r"</div\s*>", re.IGNORECASE)
+
+
+class CsvBatch:
+    """Rows of one csvContentDiv: the raw entries (what the text based stores append) and the typed frame."""
+
+    def __init__(self, entries: List[str], frame: pd.DataFrame) -> None:
+        self.entries = entries
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.entries)
+
+    def filter(self, mask: np.ndarray):
+        return CsvBatch([e for e, keep in zip(self.entries, mask) if keep], self.frame[mask].reset_index(drop=True))
+
+
+def extract_csv_content(page: str) -> Optional[str]:
+    # the payload is plain text inside the div, so a scan for the tag is enough. No DOM is built.
+    start = CSV_DIV.search(page)
+    if start is None:
+        return None
+    end = DIV_END.search(page, start.end())
+    content = page[start.end():end.start() if end else len(page)]
+    return html.unescape(content)
+
+
+def split_payload(content: str) -> Tuple[str, List[str]]:
+    lst = content.split(":")
+    headers = lst[0]
+    # remove header and last entry(which is empty)
+    return headers, [row for row in lst[1:] if row.strip()]
+
+
+def parse_entries(entries: List[str], columns: List[str]) -> pd.DataFrame:
+    # one pass of the C csv reader over all rows. "-" marks a missing value
+    if len(entries) == 0:
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[ns]" if c == "Date" else np.float64) for c in columns})
+    df = pd.read_csv(io.StringIO("\n".join(entries)), header=None, names=columns, skipinitialspace=True,
+                     na_values=["-", ""], dtype={c: np.float64 for c in columns[1:]})
+    df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%Y')
+    return df
+
+
+def parse_page(page: str, columns: List[str]) -> Optional[CsvBatch]:
+    content = extract_csv_content(page)
+    if content is None:
+        return None
+    headers, entries = split_payload(content)
+    return CsvBatch(entries, parse_entries(entries, columns))
+
+
+def parse_headers(page: str) -> Optional[str]:
+    content = extract_csv_content(page)
+    if content is None:
+        return None
+    return split_payload(content)[0]
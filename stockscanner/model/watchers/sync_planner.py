@@ -0,0 +1,47 @@
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+
+# NSE answers at most 365 days per request
+MAX_WINDOW_DAYS = 365
+
+
+class SyncPlanner:
+    """
+    Works out which trading days between two dates are neither stored nor known to have no data
+    (holidays inside a range that was already synced), and covers them with the fewest request windows.
+    """
+
+    def __init__(self, max_window_days: int = MAX_WINDOW_DAYS) -> None:
+        self.max_window_days = max_window_days
+
+    @staticmethod
+    def missing_days(start_date: date, end_date: date, stored_dates, coverage: List[Tuple[date, date]]) \
+            -> np.ndarray:
+        if end_date < start_date:
+            return np.array([], dtype="datetime64[D]")
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        # weekends never have data. Exchange holidays are learnt from the coverage of earlier syncs.
+        missing = days[np.is_busday(days)]
+        stored = np.unique(np.asarray(stored_dates, dtype="datetime64[D]"))
+        missing = missing[~np.isin(missing, stored)]
+        for covered_start, covered_end in coverage:
+            missing = missing[(missing < np.datetime64(covered_start, 'D')) | (missing > np.datetime64(covered_end, 'D'))]
+        return missing
+
+    def windows(self, missing: np.ndarray) -> List[Tuple[date, date]]:
+        # greedy: open a window at the first missing day and let it swallow every missing day it can reach.
+        # Stored days inside a window are downloaded again, which costs nothing extra in requests.
+        result = []
+        i = 0
+        while i < len(missing):
+            limit = missing[i] + np.timedelta64(self.max_window_days - 1, 'D')
+            j = int(np.searchsorted(missing, limit, side="right")) - 1
+            result.append((missing[i].astype(date), missing[j].astype(date)))
+            i = j + 1
+        return result
+
+    def plan(self, start_date: date, end_date: date, stored_dates, coverage: List[Tuple[date, date]]) \
+            -> List[Tuple[date, date]]:
+        return self.windows(self.missing_days(start_date, end_date, stored_dates, coverage))
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from stockscanner.model.config import Config
+from stockscanner.model.watchers.concurrent_downloader import ConcurrentDownloader
+from stockscanner.model.watchers.index_watcher import IndexWatcher
+from stockscanner.utils.RateLimitUtils import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class TickerStats:
+    def __init__(self, ticker) -> None:
+        self.ticker = ticker
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_latency = None
+        self.last_run = None
+        self.last_success = None
+        self.last_error = None
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class WatchScheduler(threading.Thread):
+    """
+    Refreshes every configured ticker each `watch_freq` minutes on a bounded pool of workers.
+    First runs are staggered `stagger_seconds` apart so that the tickers don't all hit NSE at once,
+    and a failing ticker is retried with backoff without holding up the others.
+    All watchers share one rate limiter, so the downloader's requests_per_sec is the budget of the whole
+    scheduler, however many tickers refresh at once.
+    """
+
+    def __init__(self, tickers: List[str], watch_freq, db, hist_start_year, max_workers=4, stagger_seconds=5,
+                 retry_seconds=30, max_backoff_minutes=None, limiter: TokenBucket = None) -> None:
+        super().__init__()
+        self.watch_freq = watch_freq * 60
+        self.max_workers = max_workers
+        self.stagger_seconds = stagger_seconds
+        self.retry_seconds = retry_seconds
+        self.max_backoff = max_backoff_minutes * 60 if max_backoff_minutes else self.watch_freq
+        self.limiter = limiter if limiter else ConcurrentDownloader.limiter_from_config(
+            Config.load_config().get("downloader", {}))
+        self.watchers: Dict[str, IndexWatcher] = {
+            ticker: IndexWatcher(ticker=ticker, watch_freq=watch_freq, db=db, hist_start_year=hist_start_year,
+                                 limiter=self.limiter)
+            for ticker in tickers}
+        self.stats: Dict[str, TickerStats] = {ticker: TickerStats(ticker) for ticker in tickers}
+        now = time.monotonic()
+        self.next_run: Dict[str, float] = {ticker: now + i * stagger_seconds for i, ticker in enumerate(tickers)}
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        watcher_config = config.get("watcher", {})
+        return cls(tickers=config.get("tickers", ["NIFTY 50"]), watch_freq=config["watch_freq"], db=config["db"],
+                   hist_start_year=config["hist_start_year"],
+                   max_workers=watcher_config.get("max_workers", 4),
+                   stagger_seconds=watcher_config.get("stagger_seconds", 5),
+                   retry_seconds=watcher_config.get("retry_seconds", 30),
+                   max_backoff_minutes=watcher_config.get("max_backoff_minutes"),
+                   limiter=ConcurrentDownloader.limiter_from_config(config.get("downloader", {})))
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="index-watcher") as executor:
+            while not self.stopped.is_set():
+                now = time.monotonic()
+                with self.lock:
+                    due = [t for t, at in self.next_run.items() if at <= now and t not in self.running]
+                    self.running.update(due)
+                for ticker in due:
+                    executor.submit(self.__refresh, ticker)
+                self.stopped.wait(1)
+
+    def __refresh(self, ticker):
+        stats = self.stats[ticker]
+        start = time.monotonic()
+        try:
+            self.watchers[ticker].sync()
+            stats.last_success = datetime.now()
+            stats.consecutive_failures = 0
+            stats.last_error = None
+            delay = self.watch_freq
+        except Exception as e:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_error = str(e)
+            # retry sooner than the regular refresh, backing off while the ticker keeps failing
+            delay = min(self.max_backoff, self.retry_seconds * 2 ** (stats.consecutive_failures - 1))
+            logger.error(f"Refresh of {ticker} failed ({stats.consecutive_failures} in a row): {e}")
+        finally:
+            stats.runs += 1
+            stats.last_run = datetime.now()
+            stats.last_latency = time.monotonic() - start
+        logger.info(f"{ticker} refreshed in {stats.last_latency:.2f}s. Next refresh in {delay:.0f}s")
+        with self.lock:
+            self.next_run[ticker] = time.monotonic() + delay
+            self.running.discard(ticker)
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {ticker: stats.to_dict() for ticker, stats in self.stats.items()}
+
+    def stop(self):
+        self.stopped.set()
@@ -1,14 +1,27 @@
+import os
 from abc import ABC, abstractmethod
 from datetime import date
+from typing import List, Tuple
+
+import numpy as np
 
 import pandas as pd
 
+from stockscanner.persistence import price_index, joined_view
+from stockscanner.persistence.price_index import PriceIndex
+from stockscanner.utils import DateUtils
+
 
 class DAO(ABC):
     pass
 
 
 class TickerDAO(DAO):
+    def __init__(self) -> None:
+        self.coverage = {}
+        # what the data is read from. DAOs with the same key share the price index and joined frame caches
+        self.store_key = (type(self).__name__, os.getcwd())
+
     @abstractmethod
     def is_valid_ticker(self, symbol):
         pass
@@ -41,12 +54,81 @@ class TickerDAO(DAO):
     def read_data_for_date(self, ticker, d: date):
         pass
 
+    def save_many(self, symbol, entries):
+        for entry in entries:
+            self.save(symbol, entry)
+
+    def save_pe_many(self, ticker, entries):
+        for entry in entries:
+            self.save_pe_data(ticker, entry)
+
+    def save_frame(self, symbol, df: pd.DataFrame, entries):
+        # typed rows parsed from a download, along with the raw entries they were parsed from.
+        # Stores that keep the data as text just append the entries.
+        self.save_many(symbol, entries)
+
+    def save_pe_frame(self, ticker, df: pd.DataFrame, entries):
+        self.save_pe_many(ticker, entries)
+
+    def get_price_index(self, symbol) -> PriceIndex:
+        return price_index.cache.get(self.store_key, symbol,
+                                     lambda: PriceIndex.from_frame(self.read_all_data(symbol)))
+
+    def invalidate_price_index(self, symbol):
+        price_index.cache.invalidate(self.store_key, symbol)
+
+    def read_joined(self, symbol) -> pd.DataFrame:
+        # OHLC left joined with PE on Date. Cached, and kept up to date by the saves of every dao instance
+        return joined_view.cache.get(self.store_key, symbol,
+                                     lambda: (self.read_all_data(symbol), self.read_all_pe_data(symbol)))
+
+    def append_joined(self, symbol, rows: pd.DataFrame = None, pe_rows: pd.DataFrame = None):
+        if rows is not None:
+            joined_view.cache.append_ohlc(self.store_key, symbol, rows)
+        if pe_rows is not None:
+            joined_view.cache.append_pe(self.store_key, symbol, pe_rows)
+
+    def invalidate_joined(self, symbol):
+        joined_view.cache.invalidate(self.store_key, symbol)
+
+    def get_stored_dates(self, symbol, kind) -> np.ndarray:
+        # dates that have a row, kind is "ohlc" or "pe"
+        if not (self.ohlc_schema_exists(symbol) if kind == "ohlc" else self.pe_schema_exists(symbol)):
+            return np.array([], dtype="datetime64[D]")
+        df = self.read_all_data(symbol) if kind == "ohlc" else self.read_all_pe_data(symbol)
+        return df['Date'].values.astype("datetime64[D]")
+
+    def get_coverage(self, symbol, kind) -> List[Tuple[date, date]]:
+        # date ranges that were synced already, including the days in them that had no data.
+        # Only kept in memory here, the backends persist it.
+        return self.coverage.get((symbol, kind), [])
+
+    def add_coverage(self, symbol, kind, start_date: date, end_date: date):
+        ranges = self.get_coverage(symbol, kind) + [(start_date, end_date)]
+        self.coverage[(symbol, kind)] = DateUtils.merge_date_ranges(ranges)
+
+    def get_fingerprint(self, symbol) -> dict:
+        # cheap summary of what is stored for symbol. Changes whenever rows are added
+        df = self.read_all_data(symbol)
+        df_pe = self.read_all_pe_data(symbol)
+        return {
+            "ohlc": [len(df), str(df['Date'].max())],
+            "pe": [len(df_pe), str(df_pe['Date'].max())],
+        }
+
+    def preload(self, symbol, df: pd.DataFrame, df_pe: pd.DataFrame):
+        # serve read_all_data / read_all_pe_data from the given frames until the next save
+        pass
+
     def save_headers(self, ticker, headers):
         pass
 
     def save_pe_headers(self, ticker, headers):
         pass
 
+    def close(self):
+        pass
+
 
 class PortfolioDAO(DAO):
     pass
@@ -1,5 +1,7 @@
+from stockscanner.model.config import Config
 from stockscanner.persistence.dao import TickerDAO, PortfolioDAO, StrategyDAO
 from stockscanner.persistence.fs.fs_impl import TickerFileSystemDB, FSPortfolioDaoImpl, FSStrategyDaoImpl
+from stockscanner.persistence.mmap.mmap_impl import MemoryMappedTickerDaoImpl
 from stockscanner.persistence.sqlite.sqlite_impl import SqliteTickerDaoImpl, SqliteStrategyDaoImpl, \
     SqlitePortfolioDaoImpl
 
@@ -8,7 +10,11 @@ def get_ticker_dao(db, **kwargs) -> TickerDAO:
     if db == "fs":
         return TickerFileSystemDB()
     if db == "sqlite3":
-        return SqliteTickerDaoImpl(**kwargs)
+        options = dict(Config.load_config().get("sqlite", {}))
+        options.update(kwargs)
+        return SqliteTickerDaoImpl(**options)
+    if db == "mmap":
+        return MemoryMappedTickerDaoImpl(**kwargs)
 
 
 def get_portfolio_dao(db, **kwargs) -> PortfolioDAO:
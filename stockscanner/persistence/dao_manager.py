@@ -5,17 +5,20 @@ from stockscanner.persistence.dao import TickerDAO
 class DAOManager:
     manager = None
 
-    def __init__(self, db) -> None:
+    def __init__(self, db, **kwargs) -> None:
         self.dao = {}
         from stockscanner.persistence import dao_factory
-        self.dao["ticker_dao"] = (dao_factory.get_ticker_dao(db, check_same_thread=False))
+        self.dao["ticker_dao"] = (dao_factory.get_ticker_dao(db, **kwargs))
 
     def get_dao_for_ticker(self) -> TickerDAO:
         return self.dao["ticker_dao"]
 
     @classmethod
     def get_instance(cls):
-        config = Config.load_config()
         if DAOManager.manager is None:
+            config = Config.load_config()
             DAOManager.manager = DAOManager(config["db"])
+            if config.get("snapshot", {}).get("warm", False):
+                from stockscanner.persistence.snapshot import warm_from_snapshot
+                warm_from_snapshot(DAOManager.manager.get_dao_for_ticker())
         return DAOManager.manager
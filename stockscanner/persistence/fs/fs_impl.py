@@ -1,9 +1,13 @@
-from datetime import date, timedelta
+import io
+import json
+import os
+from datetime import date, timedelta, datetime
+from typing import List, Tuple
 
 import pandas as pd
 
 from stockscanner.persistence.dao import TickerDAO, PortfolioDAO, StrategyDAO
-from stockscanner.utils import FileUtils
+from stockscanner.utils import FileUtils, DateUtils
 
 
 class TickerFileSystemDB(TickerDAO):
@@ -12,6 +16,9 @@ class TickerFileSystemDB(TickerDAO):
     def __init__(self) -> None:
         super().__init__()
 
+    def is_valid_ticker(self, symbol):
+        return self.ohlc_schema_exists(symbol)
+
     def pe_schema_exists(self, symbol):
         return FileUtils.file_exists(f"{symbol}_pe.csv")
 
@@ -41,6 +48,33 @@ class TickerFileSystemDB(TickerDAO):
         mask = (df['Date'] > (d - timedelta(5)).strftime("%d-%b-%Y")) & (df['Date'] <= d.strftime("%d-%b-%Y"))
         return (df.loc[mask]).iloc[-1]
 
+    def get_coverage(self, symbol, kind) -> List[Tuple[date, date]]:
+        if not FileUtils.file_exists(f"{symbol}_coverage.json"):
+            return []
+        ranges = FileUtils.read_json_file(f"{symbol}_coverage.json").get(kind, [])
+        return [(datetime.strptime(start, "%Y-%m-%d").date(), datetime.strptime(end, "%Y-%m-%d").date())
+                for start, end in ranges]
+
+    def add_coverage(self, symbol, kind, start_date: date, end_date: date):
+        coverage = FileUtils.read_json_file(f"{symbol}_coverage.json") \
+            if FileUtils.file_exists(f"{symbol}_coverage.json") else {}
+        ranges = DateUtils.merge_date_ranges(self.get_coverage(symbol, kind) + [(start_date, end_date)])
+        coverage[kind] = [[str(start), str(end)] for start, end in ranges]
+        with open(f"{symbol}_coverage.json", "w") as f:
+            json.dump(coverage, f)
+
+    def get_fingerprint(self, symbol) -> dict:
+        result = {}
+        for kind, file_name in (("ohlc", f"{symbol}.csv"), ("pe", f"{symbol}_pe.csv")):
+            stat = os.stat(file_name)
+            result[kind] = [stat.st_size, stat.st_mtime_ns]
+        return result
+
+    def preload(self, symbol, df: pd.DataFrame, df_pe: pd.DataFrame):
+        TickerFileSystemDB.data[symbol] = df
+        TickerFileSystemDB.data[f"{symbol}_pe"] = df_pe
+        self.invalidate_joined(symbol)
+
     def save_headers(self, ticker, headers):
         self.save(ticker, headers)
 
@@ -51,11 +85,40 @@ class TickerFileSystemDB(TickerDAO):
         # TODO: I should check if the data already exist. If yes, the don't add. Otherwise need to update the satic
         #  variable data and also the csv file.
         FileUtils.append_to_file(f"{symbol}.csv", "\n" + entry)
+        TickerFileSystemDB.data.pop(symbol, None)
+        self.invalidate_price_index(symbol)
+        self.invalidate_joined(symbol)
 
     def save_pe_data(self, symbol, entry):
         # TODO: I should check if the data already exist. If yes, the don't add. Otherwise need to update the satic
         #  variable data and also the csv file.
         FileUtils.append_to_file(f"{symbol}_pe.csv", "\n" + entry)
+        TickerFileSystemDB.data.pop(f"{symbol}_pe", None)
+        self.invalidate_joined(symbol)
+
+    def save_many(self, symbol, entries):
+        if len(entries) == 0:
+            return
+        FileUtils.append_to_file(f"{symbol}.csv", "\n" + "\n".join(entries))
+        TickerFileSystemDB.data.pop(symbol, None)
+        self.invalidate_price_index(symbol)
+        self.append_joined(symbol, rows=self.__parse_entries(f"{symbol}.csv", entries))
+
+    def save_pe_many(self, symbol, entries):
+        if len(entries) == 0:
+            return
+        FileUtils.append_to_file(f"{symbol}_pe.csv", "\n" + "\n".join(entries))
+        TickerFileSystemDB.data.pop(f"{symbol}_pe", None)
+        self.append_joined(symbol, pe_rows=self.__parse_entries(f"{symbol}_pe.csv", entries))
+
+    @staticmethod
+    def __parse_entries(file_name, entries) -> pd.DataFrame:
+        # values are kept as text. The cached frame converts them to the types it inferred from the whole file.
+        columns = list(pd.read_csv(file_name, nrows=0).columns)
+        df = pd.read_csv(io.StringIO("\n".join(entries)), header=None, names=columns, dtype=str)
+        df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%Y')
+        df.rename(columns={'P/E': 'P_E', 'P/B': 'P_B', 'Div Yield': 'Div_Yield'}, inplace=True)
+        return df
 
 
 class FSPortfolioDaoImpl(PortfolioDAO):
@@ -0,0 +1,153 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 256
+
+
+def _size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _like(rows: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    # rows with the column types of the cached frame, so that appending doesn't change them
+    return rows.astype({c: df[c].dtype for c in rows.columns if c in df.columns}, errors="ignore")
+
+
+class _Entry:
+    def __init__(self, joined: pd.DataFrame, df_pe: pd.DataFrame) -> None:
+        # OHLC rows left joined with PE on Date, sorted by date
+        self.joined = joined
+        self.pe_columns = [c for c in df_pe.columns if c != "Date"]
+        # PE rows saved before the OHLC row of their date. Moved into joined once that row arrives.
+        self.orphan_pe = df_pe.iloc[0:0].copy()
+        self.size = _size(joined)
+
+
+class JoinedFrameCache:
+    """
+    LRU cache of the OHLC + PE frame of every symbol, kept under a memory budget. Frames are keyed by
+    (store, symbol), so DAOs on different db files don't share them.
+    Saved rows are merged into a cached frame instead of dropping it, so a read after a save doesn't redo the join.
+    """
+
+    def __init__(self, max_bytes: int = None) -> None:
+        self.max_bytes = max_bytes
+        self.__entries = OrderedDict()
+        self.__total = 0
+        self.__lock = threading.RLock()
+
+    def __budget(self) -> int:
+        if self.max_bytes is None:
+            from stockscanner.model.config import Config
+            try:
+                max_mb = Config.load_config().get("joined_cache", {}).get("max_mb", DEFAULT_MAX_MB)
+            except Exception:
+                max_mb = DEFAULT_MAX_MB
+            self.max_bytes = int(max_mb * 1024 * 1024)
+        return self.max_bytes
+
+    def get(self, store, symbol, loader) -> pd.DataFrame:
+        key = (store, symbol)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                df, df_pe = loader()
+                joined = df.merge(df_pe, how="left", on="Date")
+                entry = _Entry(joined, df_pe)
+                self.__put(key, entry)
+            else:
+                self.__entries.move_to_end(key)
+            # a shallow copy so that callers adding columns don't change the cached frame
+            return entry.joined.copy(deep=False)
+
+    def __put(self, key, entry: _Entry):
+        self.__entries[key] = entry
+        self.__total += entry.size
+        self.__evict()
+
+    def __evict(self):
+        # the most recently used symbol is always kept, even if it alone is over the budget
+        while self.__total > self.__budget() and len(self.__entries) > 1:
+            (store, symbol), entry = self.__entries.popitem(last=False)
+            self.__total -= entry.size
+            logger.debug(f"Evicted joined frame of {symbol} in {store} ({entry.size} bytes)")
+
+    def __resize(self, entry: _Entry):
+        self.__total -= entry.size
+        entry.size = _size(entry.joined) + _size(entry.orphan_pe)
+        self.__total += entry.size
+        self.__evict()
+
+    def append_ohlc(self, store, symbol, rows: pd.DataFrame):
+        with self.__lock:
+            entry = self.__entries.get((store, symbol))
+            if entry is None or len(rows) == 0:
+                return
+            joined = entry.joined
+            rows = _like(rows.drop_duplicates("Date", keep="last"), joined)
+            # re-downloaded dates replace the OHLC columns of the existing row
+            existing = joined['Date'].isin(rows['Date'])
+            if existing.any():
+                updated = rows.set_index("Date")
+                ohlc_columns = [c for c in rows.columns if c != "Date"]
+                joined = joined.copy()
+                joined.loc[existing, ohlc_columns] = updated.loc[joined.loc[existing, 'Date'], ohlc_columns].values
+                rows = rows[~rows['Date'].isin(joined['Date'])]
+            if len(rows):
+                new_rows = rows.merge(entry.orphan_pe, how="left", on="Date")
+                entry.orphan_pe = entry.orphan_pe[~entry.orphan_pe['Date'].isin(rows['Date'])]
+                in_order = len(joined) == 0 or new_rows['Date'].min() > joined['Date'].iloc[-1]
+                new_rows = _like(new_rows[joined.columns], joined)
+                joined = pd.concat([joined, new_rows], ignore_index=True)
+                if not in_order:
+                    joined = joined.sort_values("Date", kind="stable", ignore_index=True)
+            entry.joined = joined
+            self.__resize(entry)
+
+    def append_pe(self, store, symbol, rows: pd.DataFrame):
+        with self.__lock:
+            entry = self.__entries.get((store, symbol))
+            if entry is None or len(rows) == 0:
+                return
+            joined = entry.joined
+            rows = _like(rows.drop_duplicates("Date", keep="last"), entry.orphan_pe)
+            matched = joined['Date'].isin(rows['Date'])
+            if matched.any():
+                updated = rows.set_index("Date")
+                joined = joined.copy()
+                joined.loc[matched, entry.pe_columns] = \
+                    updated.loc[joined.loc[matched, 'Date'], entry.pe_columns].values
+                entry.joined = joined
+            orphans = rows[~rows['Date'].isin(joined['Date'])]
+            if len(orphans):
+                orphan_pe = entry.orphan_pe[~entry.orphan_pe['Date'].isin(orphans['Date'])]
+                orphans = orphans[orphan_pe.columns]
+                entry.orphan_pe = pd.concat([orphan_pe, orphans], ignore_index=True)
+            self.__resize(entry)
+
+    def invalidate(self, store, symbol):
+        with self.__lock:
+            entry = self.__entries.pop((store, symbol), None)
+            if entry is not None:
+                self.__total -= entry.size
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__total = 0
+
+    def memory_usage(self) -> int:
+        return self.__total
+
+    def __contains__(self, key) -> bool:
+        # key is (store, symbol)
+        return key in self.__entries
+
+
+# shared by every DAO instance, like the price index cache, and scoped by store the same way
+cache = JoinedFrameCache()
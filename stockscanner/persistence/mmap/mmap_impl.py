@@ -0,0 +1,86 @@
+import json
+import os
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.persistence.dao import TickerDAO
+
+MANIFEST = "manifest.json"
+
+
+def export_frame(df: pd.DataFrame, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column].values
+        if values.dtype == object:
+            raise Exception(f"Column {column} is not numeric and cannot be memory mapped")
+        np.save(os.path.join(directory, f"{i}.npy"), values, allow_pickle=False)
+        columns.append(column)
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump({"columns": columns, "rows": len(df)}, f)
+
+
+def load_frame(directory: str) -> pd.DataFrame:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    data = {}
+    for i, column in enumerate(manifest["columns"]):
+        data[column] = np.load(os.path.join(directory, f"{i}.npy"), mmap_mode="r")
+    return pd.DataFrame(data, copy=False)
+
+
+def export_dataset(dao: TickerDAO, symbols: List[str], directory: str):
+    # snapshot of what the backtests read, written once and memory mapped read-only by every worker process
+    for symbol in symbols:
+        export_frame(dao.read_all_data(symbol), os.path.join(directory, symbol, "ohlc"))
+        export_frame(dao.read_all_pe_data(symbol), os.path.join(directory, symbol, "pe"))
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump({"symbols": symbols}, f)
+
+
+class MemoryMappedTickerDaoImpl(TickerDAO):
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+        self.directory = kwargs.get("directory")
+        self.store_key = os.path.abspath(self.directory)
+        with open(os.path.join(self.directory, MANIFEST)) as f:
+            self.symbols = json.load(f)["symbols"]
+        self.data = {}
+
+    def __read(self, symbol, kind) -> pd.DataFrame:
+        if symbol not in self.symbols:
+            raise Exception("Table does not exist")
+        key = f"{symbol}_{kind}"
+        if key not in self.data:
+            self.data[key] = load_frame(os.path.join(self.directory, symbol, kind))
+        return self.data[key]
+
+    def read_all_data(self, symbol) -> pd.DataFrame:
+        return self.__read(symbol, "ohlc").copy(deep=False)
+
+    def read_all_pe_data(self, symbol) -> pd.DataFrame:
+        return self.__read(symbol, "pe").copy(deep=False)
+
+    def read_data_for_date(self, ticker, d: date):
+        df = self.__read(ticker, "ohlc")
+        mask = (df['Date'] > (d - timedelta(5)).strftime("%d-%b-%Y")) & (df['Date'] <= d.strftime("%d-%b-%Y"))
+        return (df.loc[mask]).iloc[-1]
+
+    def is_valid_ticker(self, symbol):
+        return symbol in self.symbols
+
+    def pe_schema_exists(self, ticker):
+        return ticker in self.symbols
+
+    def ohlc_schema_exists(self, ticker):
+        return ticker in self.symbols
+
+    def save(self, symbol, entry):
+        raise Exception("Memory mapped dataset is read only")
+
+    def save_pe_data(self, ticker, entry):
+        raise Exception("Memory mapped dataset is read only")
@@ -0,0 +1,64 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.utils.ProfileUtils import profiler
+
+
+class PriceIndex:
+    """Sorted closing prices of one symbol, answering "last close on or before d" with a binary search."""
+
+    def __init__(self, dates: np.ndarray, closes: np.ndarray) -> None:
+        order = np.argsort(dates, kind="stable")
+        self.dates: np.ndarray = dates.astype("datetime64[D]")[order]
+        self.closes: np.ndarray = closes.astype(np.float64)[order]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        return cls(df['Date'].values, df['Close'].values)
+
+    # the assets look prices up through the DAOManager's dao rather than the profiled one, so they are timed here
+    @profiler.timed("dao.price_as_of")
+    def price_as_of(self, d: date, max_lookback_days: int = 5) -> float:
+        day = np.datetime64(d, 'D')
+        i = np.searchsorted(self.dates, day, side="right") - 1
+        # same tolerance as the old 5 day window: a holiday / weekend falls back to the previous close
+        if i < 0 or self.dates[i] < day - np.timedelta64(max_lookback_days, 'D'):
+            raise Exception(f"No price available between {day - np.timedelta64(max_lookback_days, 'D')} and {day}")
+        return float(self.closes[i])
+
+    def __len__(self):
+        return len(self.dates)
+
+
+class PriceIndexCache:
+    # indices are keyed by (store, symbol): DAOs on different db files don't see each other's prices
+    def __init__(self) -> None:
+        self.__indices = {}
+        self.__lock = threading.Lock()
+
+    def get(self, store, symbol, loader) -> PriceIndex:
+        key = (store, symbol)
+        index = self.__indices.get(key)
+        if index is None:
+            with self.__lock:
+                index = self.__indices.get(key)
+                if index is None:
+                    index = loader()
+                    self.__indices[key] = index
+        return index
+
+    def invalidate(self, store, symbol):
+        with self.__lock:
+            self.__indices.pop((store, symbol), None)
+
+    def clear(self):
+        with self.__lock:
+            self.__indices.clear()
+
+
+# shared by every DAO instance so that rows saved by the IndexWatcher invalidate what the backtests read
+# from the same store
+cache = PriceIndexCache()
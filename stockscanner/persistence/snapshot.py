@@ -0,0 +1,207 @@
+# Single file, columnar copy of every ticker's OHLC and PE frames, used to warm a DAO without re-parsing the source.
+#   python -m stockscanner.persistence.snapshot export [--path data.snapshot]
+#   python -m stockscanner.persistence.snapshot check [--path data.snapshot]
+import argparse
+import json
+import logging
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stockscanner.model.config import Config
+from stockscanner.persistence.dao import TickerDAO
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+META_KEY = "stockscanner"
+ARROW_MAGIC = b"ARROW1"
+DEFAULT_PATH = "data.snapshot"
+NPY_META = "meta.json"
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    # dates stay datetime64, everything else is stored as float64 ("-" and blanks in the csv become NaN)
+    df = df.copy()
+    for column in df.columns:
+        if column != "Date" and df[column].dtype != np.float64:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+    return df
+
+
+class Snapshot:
+    def __init__(self, frames: Dict[Tuple[str, str], pd.DataFrame], meta: dict) -> None:
+        # frames are keyed by (symbol, "ohlc" | "pe")
+        self.frames = frames
+        self.meta = meta
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.meta["symbols"]
+
+    @classmethod
+    def from_dao(cls, dao: TickerDAO, symbols: List[str]):
+        frames = {}
+        for symbol in symbols:
+            frames[(symbol, "ohlc")] = _typed(dao.read_all_data(symbol))
+            frames[(symbol, "pe")] = _typed(dao.read_all_pe_data(symbol))
+        meta = {
+            "backend": type(dao).__name__,
+            "symbols": symbols,
+            "fingerprints": {symbol: dao.get_fingerprint(symbol) for symbol in symbols},
+        }
+        return cls(frames, meta)
+
+    def is_stale(self, dao: TickerDAO) -> bool:
+        if self.meta["backend"] != type(dao).__name__:
+            return True
+        for symbol in self.symbols:
+            if self.meta["fingerprints"].get(symbol) != json.loads(json.dumps(dao.get_fingerprint(symbol))):
+                return True
+        return False
+
+    def warm(self, dao: TickerDAO, check_staleness: bool = True) -> bool:
+        if check_staleness and self.is_stale(dao):
+            logger.warning(f"Snapshot does not match the {type(dao).__name__} store. Not using it")
+            return False
+        for symbol in self.symbols:
+            dao.preload(symbol, self.frames[(symbol, "ohlc")], self.frames[(symbol, "pe")])
+        logger.info(f"Warmed {type(dao).__name__} with {len(self.symbols)} symbols from the snapshot")
+        return True
+
+    def save(self, path: str, compression: str = "zstd"):
+        if pyarrow is not None:
+            self.__save_arrow(path, compression)
+        else:
+            logger.warning(f"pyarrow is not installed, writing {path} as uncompressed numpy arrays instead of Arrow")
+            self.__save_npy(path)
+
+    @classmethod
+    def load(cls, path: str):
+        if os.path.isdir(path):
+            return cls.__load_npy(path)
+        with open(path, "rb") as f:
+            magic = f.read(len(ARROW_MAGIC))
+        if magic != ARROW_MAGIC:
+            raise Exception(f"{path} is not a snapshot")
+        return cls.__load_arrow(path)
+
+    def __layout(self) -> List[dict]:
+        return [{"symbol": symbol, "kind": kind, "columns": list(df.columns)}
+                for (symbol, kind), df in self.frames.items()]
+
+    def __save_arrow(self, path: str, compression: str):
+        # one record batch per frame over the union of all columns. Columns a frame doesn't have are all null
+        # and cost next to nothing once compressed.
+        layout = self.__layout()
+        columns = []
+        for entry in layout:
+            columns.extend(c for c in entry["columns"] if c not in columns)
+        fields = [pyarrow.field(c, pyarrow.timestamp("ns") if c == "Date" else pyarrow.float64()) for c in columns]
+        meta = dict(self.meta, layout=layout)
+        schema = pyarrow.schema(fields, metadata={META_KEY: json.dumps(meta)})
+        options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+        with pyarrow.OSFile(path, "wb") as sink, pyarrow.ipc.new_file(sink, schema, options=options) as writer:
+            for entry in layout:
+                df = self.frames[(entry["symbol"], entry["kind"])]
+                arrays = [pyarrow.array(df[f.name].values, type=f.type) if f.name in df.columns
+                          else pyarrow.nulls(len(df), type=f.type) for f in fields]
+                writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+    @classmethod
+    def __load_arrow(cls, path: str):
+        if pyarrow is None:
+            raise Exception("pyarrow is required to read an Arrow snapshot")
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(path, "r"))
+        meta = json.loads(reader.schema.metadata[META_KEY.encode()])
+        frames = {}
+        for i, entry in enumerate(meta.pop("layout")):
+            batch = reader.get_batch(i)
+            frames[(entry["symbol"], entry["kind"])] = pyarrow.Table.from_batches([batch]) \
+                .select(entry["columns"]).to_pandas()
+        return cls(frames, meta)
+
+    def __save_npy(self, path: str):
+        # without pyarrow: a directory with one uncompressed .npy file per column, so loading maps them instead of
+        # reading and decompressing them. meta.json goes in last, a half written directory doesn't load.
+        if os.path.isfile(path):
+            os.remove(path)
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, NPY_META)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        layout = self.__layout()
+        for i, entry in enumerate(layout):
+            df = self.frames[(entry["symbol"], entry["kind"])]
+            for j, column in enumerate(entry["columns"]):
+                np.save(os.path.join(path, f"{i}_{j}.npy"), df[column].values, allow_pickle=False)
+        with open(meta_path, "w") as f:
+            json.dump(dict(self.meta, layout=layout), f)
+
+    @classmethod
+    def __load_npy(cls, path: str):
+        meta_path = os.path.join(path, NPY_META)
+        if not os.path.exists(meta_path):
+            raise Exception(f"{path} is not a snapshot")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        frames = {}
+        for i, entry in enumerate(meta.pop("layout")):
+            data = {column: np.load(os.path.join(path, f"{i}_{j}.npy"), mmap_mode="r", allow_pickle=False)
+                    for j, column in enumerate(entry["columns"])}
+            frames[(entry["symbol"], entry["kind"])] = pd.DataFrame(data, copy=False)
+        return cls(frames, meta)
+
+
+def get_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def get_snapshot_config() -> dict:
+    return Config.load_config().get("snapshot", {})
+
+
+def warm_from_snapshot(dao: TickerDAO, path: str = None) -> bool:
+    path = path if path else get_snapshot_config().get("path", DEFAULT_PATH)
+    if not os.path.exists(path):
+        return False
+    try:
+        return Snapshot.load(path).warm(dao)
+    except Exception as e:
+        logger.error(f"Unable to warm from snapshot {path}: {e}")
+        return False
+
+
+def main():
+    from stockscanner.persistence import dao_factory
+    parser = argparse.ArgumentParser()
+    parser.add_argument("action", choices=["export", "check"])
+    parser.add_argument("--path", default=None)
+    parser.add_argument("--symbols", nargs="+", default=None)
+    args = parser.parse_args()
+
+    config = Config.load_config()
+    snapshot_config = get_snapshot_config()
+    path = args.path if args.path else snapshot_config.get("path", DEFAULT_PATH)
+    dao = dao_factory.get_ticker_dao(config["db"])
+    if args.action == "export":
+        symbols = args.symbols if args.symbols else snapshot_config.get("symbols", ["NIFTY 50"])
+        Snapshot.from_dao(dao, symbols).save(path, snapshot_config.get("compression", "zstd"))
+        print(f"Snapshot of {symbols} written to {path} ({get_size(path)} bytes)")
+    else:
+        snapshot = Snapshot.load(path)
+        print(f"{path}: {snapshot.symbols} from {snapshot.meta['backend']}, "
+              f"{'stale' if snapshot.is_stale(dao) else 'up to date'}")
+
+
+if __name__ == '__main__':
+    main()
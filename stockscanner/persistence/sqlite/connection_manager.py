@@ -0,0 +1,131 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "data.db"
+
+
+class ConnectionManager:
+    """
+    The connections to one sqlite file: a single writer connection that writes take turns on, and a read connection
+    per thread. In WAL mode readers see the last committed state and never wait for the writer.
+    WAL is opt-in (journal_mode in the "sqlite" section of config.json), otherwise the file keeps sqlite's
+    rollback journal. close_all puts a WAL file back into rollback mode, so the db doesn't stay converted.
+    One manager per file is shared by every DAO in the process. close() shuts the connections down, the next
+    read or write opens them again.
+    """
+    managers: Dict[str, "ConnectionManager"] = {}
+    __instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance(db_path: str = DEFAULT_DB_PATH, **options) -> "ConnectionManager":
+        # options only apply to the first DAO that opens the file
+        path = os.path.abspath(db_path)
+        manager = ConnectionManager.managers.get(path)
+        if manager is None:
+            with ConnectionManager.__instance_lock:
+                manager = ConnectionManager.managers.get(path)
+                if manager is None:
+                    manager = ConnectionManager(path, **options)
+                    ConnectionManager.managers[path] = manager
+        return manager
+
+    def __init__(self, db_path: str, journal_mode: str = None, synchronous: str = None,
+                 busy_timeout: float = 30, **kwargs) -> None:
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.write_lock = threading.RLock()
+        self.lock = threading.Lock()
+        self.write_con = None
+        # thread id -> (thread, connection) of every open read connection
+        self.readers = {}
+        self.local = threading.local()
+        # bumped by close(), so threads notice their read connection is gone
+        self.generation = 0
+        self.connected = False
+
+    def __connect(self) -> sqlite3.Connection:
+        # check_same_thread is off so close() can close a connection from the thread shutting down
+        con = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        self.connected = True
+        if self.journal_mode:
+            con.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            con.execute(f"PRAGMA synchronous={self.synchronous}")
+        return con
+
+    @contextmanager
+    def writer(self):
+        # one transaction on the writer connection. Committed on success, rolled back on an exception
+        with self.write_lock:
+            if self.write_con is None:
+                self.write_con = self.__connect()
+            with self.write_con:
+                yield self.write_con
+
+    def reader(self) -> sqlite3.Connection:
+        local = self.local
+        if getattr(local, "generation", None) == self.generation and local.con is not None:
+            return local.con
+        con = self.__connect()
+        with self.lock:
+            # connections of threads that have finished are closed here rather than piling up
+            for ident, (thread, old) in list(self.readers.items()):
+                if not thread.is_alive():
+                    old.close()
+                    del self.readers[ident]
+            self.readers[threading.get_ident()] = (threading.current_thread(), con)
+        local.con = con
+        local.generation = self.generation
+        return con
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"readers": len(self.readers), "writer": self.write_con is not None}
+
+    def close(self):
+        # waits for a running write, then closes the writer and every reader
+        with self.write_lock:
+            if self.write_con is not None:
+                self.write_con.close()
+                self.write_con = None
+            with self.lock:
+                self.generation += 1
+                for thread, con in self.readers.values():
+                    con.close()
+                self.readers.clear()
+
+    def restore_journal_mode(self):
+        # journal_mode=WAL is stored in the file itself. Switching back needs every connection closed, and it
+        # checkpoints the WAL and removes the -wal and -shm files
+        if not self.connected or not self.journal_mode or self.journal_mode.upper() == "DELETE":
+            return
+        with self.write_lock:
+            if self.write_con is not None or not os.path.exists(self.db_path):
+                return
+            # another process still using the file keeps it in WAL. Fail right away rather than wait for it
+            con = sqlite3.connect(self.db_path, timeout=0)
+            try:
+                con.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                con.close()
+
+    @staticmethod
+    def close_all():
+        for manager in list(ConnectionManager.managers.values()):
+            try:
+                manager.close()
+                manager.restore_journal_mode()
+            except Exception as e:
+                logger.error(f"Closing {manager.db_path} failed: {e}")
+
+
+atexit.register(ConnectionManager.close_all)
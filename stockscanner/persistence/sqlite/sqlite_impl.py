@@ -1,68 +1,143 @@
 from datetime import date, timedelta
+from typing import List, Tuple
+
+import numpy as np
 import pandas as pd
-import sqlite3
 
 from stockscanner.persistence.dao import TickerDAO, PortfolioDAO, StrategyDAO
+from stockscanner.persistence.sqlite.connection_manager import ConnectionManager, DEFAULT_DB_PATH
+from stockscanner.utils import DateUtils
 from datetime import datetime
 
 
+COVERAGE_TABLE = "SYNC_COVERAGE"
+OHLC_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Shares_Traded", "Turnover"]
+PE_COLUMNS = ["Date", "P_E", "P_B", "Div_Yield"]
+
+
+def _to_frame(rows, columns) -> pd.DataFrame:
+    # same types read_all_data / read_all_pe_data give back for these rows
+    df = pd.DataFrame(rows, columns=columns)
+    df['Date'] = pd.to_datetime(df['Date'])
+    for column in columns[1:]:
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
 class SqliteTickerDaoImpl(TickerDAO):
+    # frames preloaded from a snapshot, keyed by (store_key, table_name). Dropped as soon as the table is written to.
+    data: dict = {}
+
     def __init__(self, **kwargs) -> None:
         super().__init__()
-        self.con = sqlite3.connect("data.db", check_same_thread=kwargs.get("check_same_thread", True))
+        self.db_path = kwargs.get("db_path", DEFAULT_DB_PATH)
+        # writes go through the file's single writer connection, reads through a connection of the calling thread
+        self.connections = ConnectionManager.get_instance(
+            self.db_path, **{k: kwargs[k] for k in ("journal_mode", "synchronous", "busy_timeout") if k in kwargs})
+        # the manager's absolute path, so "data.db" and "./data.db" are the same store
+        self.store_key = self.connections.db_path
+        # tables are never dropped, so once we have seen a table we don't need to ask sqlite_master again
+        self.__known_tables = set()
 
-    def save(self, symbol, entry):
-        list = entry.split(",")
-        d = (datetime.strptime(list[0].replace("\"", "").strip(), "%d-%b-%Y")).date()
-        open = list[1].replace("\"", "").strip()
-        high = list[2].replace("\"", "").strip()
-        low = list[3].replace("\"", "").strip()
-        close = list[4].replace("\"", "").strip()
+    @staticmethod
+    def parse_ohlc_entry(entry):
+        values = [v.replace("\"", "").strip() for v in entry.split(",")]
+        d = (datetime.strptime(values[0], "%d-%b-%Y")).date()
         shares_traded = None
         try:
-            shares_traded = float(list[5].replace("\"", "").strip())
+            shares_traded = float(values[5])
         except Exception as e:
             pass
         turnover = None
         try:
-            turnover = float(list[6].replace("\"", "").strip())
+            turnover = float(values[6])
         except Exception as e:
             pass
+        return [d, values[1], values[2], values[3], values[4], shares_traded, turnover]
 
+    @staticmethod
+    def parse_pe_entry(entry):
+        values = [v.replace("\"", "").strip() for v in entry.split(",")]
+        d = (datetime.strptime(values[0], "%d-%b-%Y")).date()
+        return [d, values[1], values[2], values[3]]
+
+    def save(self, symbol, entry):
+        self.save_many(symbol, [entry])
+
+    def save_pe_data(self, ticker, entry):
+        self.save_pe_many(ticker, [entry])
+
+    def save_many(self, symbol, entries):
+        rows = [self.parse_ohlc_entry(entry) for entry in entries]
+        if len(rows) == 0:
+            return
         self.create_ohlc_table_if_not_exist(symbol)
-        cur = self.con.cursor()
         table_name = symbol.strip().replace(" ", "_") + "_OHLC"
-        cur.execute(f"INSERT INTO {table_name} VALUES (?,?,?,?,?,?,?)",
-                    [d, open, high, low, close, shares_traded, turnover])
-        self.con.commit()
-        cur.close()
+        # one transaction for the whole range. Re-downloaded dates replace the existing row.
+        with self.connections.writer() as con:
+            con.executemany(f"INSERT OR REPLACE INTO {table_name} VALUES (?,?,?,?,?,?,?)", rows)
+        SqliteTickerDaoImpl.data.pop((self.store_key, table_name), None)
+        self.invalidate_price_index(symbol)
+        self.append_joined(symbol, rows=_to_frame(rows, OHLC_COLUMNS))
 
-    def save_pe_data(self, ticker, entry):
-        list = entry.split(",")
-        d = (datetime.strptime(list[0].replace("\"", "").strip(), "%d-%b-%Y")).date()
-        p_e = list[1].replace("\"", "").strip()
-        p_b = list[2].replace("\"", "").strip()
-        div_yield = list[3].replace("\"", "").strip()
+    def save_pe_many(self, ticker, entries):
+        rows = [self.parse_pe_entry(entry) for entry in entries]
+        if len(rows) == 0:
+            return
         self.create_pe_table_if_not_exist(ticker)
-        cur = self.con.cursor()
         table_name = ticker.strip().replace(" ", "_") + "_PE"
-        cur.execute(f"INSERT INTO {table_name} VALUES (?,?,?,?)", [d, p_e, p_b, div_yield])
-        self.con.commit()
-        cur.close()
+        with self.connections.writer() as con:
+            con.executemany(f"INSERT OR REPLACE INTO {table_name} VALUES (?,?,?,?)", rows)
+        SqliteTickerDaoImpl.data.pop((self.store_key, table_name), None)
+        self.append_joined(ticker, pe_rows=_to_frame(rows, PE_COLUMNS))
+
+    @staticmethod
+    def __frame_rows(df: pd.DataFrame, columns) -> list:
+        values = [df['Date'].dt.strftime("%Y-%m-%d")]
+        # NaN goes in as NULL
+        values.extend(df[c].astype(object).where(df[c].notna(), None) for c in columns[1:])
+        return list(zip(*values))
+
+    def save_frame(self, symbol, df: pd.DataFrame, entries=None):
+        if len(df) == 0:
+            return
+        self.create_ohlc_table_if_not_exist(symbol)
+        table_name = symbol.strip().replace(" ", "_") + "_OHLC"
+        rows = self.__frame_rows(df, OHLC_COLUMNS)
+        with self.connections.writer() as con:
+            con.executemany(f"INSERT OR REPLACE INTO {table_name} VALUES (?,?,?,?,?,?,?)", rows)
+        SqliteTickerDaoImpl.data.pop((self.store_key, table_name), None)
+        self.invalidate_price_index(symbol)
+        self.append_joined(symbol, rows=df[OHLC_COLUMNS])
+
+    def save_pe_frame(self, ticker, df: pd.DataFrame, entries=None):
+        if len(df) == 0:
+            return
+        self.create_pe_table_if_not_exist(ticker)
+        table_name = ticker.strip().replace(" ", "_") + "_PE"
+        rows = self.__frame_rows(df, PE_COLUMNS)
+        with self.connections.writer() as con:
+            con.executemany(f"INSERT OR REPLACE INTO {table_name} VALUES (?,?,?,?)", rows)
+        SqliteTickerDaoImpl.data.pop((self.store_key, table_name), None)
+        self.append_joined(ticker, pe_rows=df[PE_COLUMNS])
 
     def read_all_data(self, symbol) -> pd.DataFrame:
         table_name = symbol.strip().replace(" ", "_") + "_OHLC"
+        if (self.store_key, table_name) in SqliteTickerDaoImpl.data:
+            return SqliteTickerDaoImpl.data[(self.store_key, table_name)].copy()
         if not self.table_exist(table_name):
             raise Exception("Table does not exist")
-        df = pd.read_sql_query(f"SELECT * from {table_name} ORDER BY date(Date)", self.con)
+        df = pd.read_sql_query(f"SELECT * from {table_name} ORDER BY date(Date)", self.connections.reader())
         df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
         return df
 
     def read_all_pe_data(self, symbol) -> pd.DataFrame:
         table_name = symbol.strip().replace(" ", "_") + "_PE"
+        if (self.store_key, table_name) in SqliteTickerDaoImpl.data:
+            return SqliteTickerDaoImpl.data[(self.store_key, table_name)].copy()
         if not self.table_exist(table_name):
             raise Exception("Table does not exist")
-        df = pd.read_sql_query(f"SELECT * from {table_name} ORDER BY date(DATE)", self.con)
+        df = pd.read_sql_query(f"SELECT * from {table_name} ORDER BY date(DATE)", self.connections.reader())
         df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
         return df
 
@@ -81,11 +156,61 @@ class SqliteTickerDaoImpl(TickerDAO):
         df = pd.read_sql_query(
             f"select * from {table_name} where date(DATE) between "
             f"date('{start_date}') and date('{end_date}') order by date(DATE)",
-            self.con)
+            self.connections.reader())
         return df.iloc[-1]
 
-    def __del__(self):
-        self.con.close()
+    def get_stored_dates(self, symbol, kind) -> np.ndarray:
+        table_name = symbol.strip().replace(" ", "_") + ("_OHLC" if kind == "ohlc" else "_PE")
+        if not self.table_exist(table_name):
+            return np.array([], dtype="datetime64[D]")
+        rows = self.connections.reader().execute(f"SELECT date(Date) FROM {table_name}").fetchall()
+        return np.array([r[0] for r in rows], dtype="datetime64[D]")
+
+    def get_coverage(self, symbol, kind) -> List[Tuple[date, date]]:
+        if not self.table_exist(COVERAGE_TABLE):
+            return []
+        return self.__read_coverage(self.connections.reader(), symbol, kind)
+
+    @staticmethod
+    def __read_coverage(con, symbol, kind) -> List[Tuple[date, date]]:
+        rows = con.execute(f"SELECT Start, End FROM {COVERAGE_TABLE} WHERE Symbol = ? AND Kind = ? "
+                           f"ORDER BY Start", (symbol, kind)).fetchall()
+        return [(datetime.strptime(start, "%Y-%m-%d").date(), datetime.strptime(end, "%Y-%m-%d").date())
+                for start, end in rows]
+
+    def add_coverage(self, symbol, kind, start_date: date, end_date: date):
+        # read, merge and write back in one transaction, so two syncs of a ticker can't lose each other's ranges.
+        # Kept merged, so a ticker has a handful of rows no matter how many syncs recorded coverage
+        with self.connections.writer() as con:
+            con.execute(f"CREATE TABLE IF NOT EXISTS {COVERAGE_TABLE} (Symbol text, Kind text, Start date, End date)")
+            ranges = DateUtils.merge_date_ranges(self.__read_coverage(con, symbol, kind) + [(start_date, end_date)])
+            con.execute(f"DELETE FROM {COVERAGE_TABLE} WHERE Symbol = ? AND Kind = ?", (symbol, kind))
+            con.executemany(f"INSERT INTO {COVERAGE_TABLE} VALUES (?,?,?,?)",
+                            [(symbol, kind, str(start), str(end)) for start, end in ranges])
+        self.__known_tables.add(COVERAGE_TABLE)
+
+    def get_fingerprint(self, symbol) -> dict:
+        # row count, last date and the sum of every column, so a re-downloaded row with a revised value also
+        # changes it. Rounded because a replaced row moves in the scan order, which changes the float sums slightly
+        result = {}
+        for kind, suffix, columns in (("ohlc", "_OHLC", OHLC_COLUMNS), ("pe", "_PE", PE_COLUMNS)):
+            table_name = symbol.strip().replace(" ", "_") + suffix
+            if not self.table_exist(table_name):
+                raise Exception("Table does not exist")
+            totals = ", ".join(f"round(total({c}), 4)" for c in columns[1:])
+            result[kind] = list(self.connections.reader().execute(
+                f"SELECT count(*), max(date(Date)), {totals} FROM {table_name}").fetchone())
+        return result
+
+    def preload(self, symbol, df: pd.DataFrame, df_pe: pd.DataFrame):
+        table_name = symbol.strip().replace(" ", "_")
+        SqliteTickerDaoImpl.data[(self.store_key, table_name + "_OHLC")] = df
+        SqliteTickerDaoImpl.data[(self.store_key, table_name + "_PE")] = df_pe
+        self.invalidate_joined(symbol)
+
+    def close(self):
+        # closes the connections of the db file, which every DAO on it shares
+        self.connections.close()
 
     def is_valid_ticker(self, symbol):
         table_name = symbol.strip().replace(" ", "_") + "_OHLC"
@@ -93,30 +218,33 @@ class SqliteTickerDaoImpl(TickerDAO):
 
     def table_exist(self, table_name):
         table_name = table_name.strip().replace(" ", "_")
-        cursor = self.con.cursor()
+        if table_name in self.__known_tables:
+            return True
+        cursor = self.connections.reader().cursor()
         cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
         exist = len(cursor.fetchall()) > 0
         cursor.close()
+        if exist:
+            self.__known_tables.add(table_name)
         return exist
 
     def create_ohlc_table_if_not_exist(self, symbol):
         table_name = symbol.strip().replace(" ", "_") + "_OHLC"
         if not self.table_exist(table_name):
-            cursor = self.con.cursor()
-            cursor.execute(
-                f"CREATE TABLE {table_name} "
-                f"(Date date primary key, Open real, High real, Low real, Close real, Shares_Traded real, Turnover real)")
-            self.con.commit()
-            cursor.close()
+            with self.connections.writer() as con:
+                con.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table_name} "
+                    f"(Date date primary key, Open real, High real, Low real, Close real, Shares_Traded real, "
+                    f"Turnover real)")
+            self.__known_tables.add(table_name)
 
     def create_pe_table_if_not_exist(self, symbol):
         table_name = symbol.strip().replace(" ", "_") + "_PE"
         if not self.table_exist(table_name):
-            cursor = self.con.cursor()
-            cursor.execute(
-                f"CREATE TABLE {table_name} (Date date primary key, P_E real, P_B real, Div_Yield real)")
-            self.con.commit()
-            cursor.close()
+            with self.connections.writer() as con:
+                con.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table_name} (Date date primary key, P_E real, P_B real, Div_Yield real)")
+            self.__known_tables.add(table_name)
 
 
 class SqlitePortfolioDaoImpl(PortfolioDAO):
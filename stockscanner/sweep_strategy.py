@@ -0,0 +1,66 @@
+# Run this module to evaluate a strategy over a grid of parameters, e.g.
+#   python -m stockscanner.sweep_strategy --strategy PEBasedAllocation \
+#       --param change_threshold=2,3,5,8 --param backtest_start_date=01-01-2010,01-01-2015 --workers 8
+#   python -m stockscanner.sweep_strategy --strategy SIP --param sip_amount=5000,10000 --param sip_frequency=monthly,weekly
+# Parameters left out of the grid come from the strategy's entry in the "backtest" section of config.json.
+import argparse
+
+from stockscanner.model.config import Config
+from stockscanner.model.strategies.parameter_sweep import METRICS
+from stockscanner.model.strategies.strategy_manager import StrategyManager
+
+
+def parse_value(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_grid(params):
+    grid = {}
+    for param in params:
+        name, values = param.split("=", 1)
+        grid[name] = [parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def get_base_config(config, strategy_name: str) -> dict:
+    # the strategy's "strategies" settings under its first "backtest" entry, so a SIP sweep gets its sip_start_date
+    base_config = dict(config.get("strategies", {}).get(strategy_name, {}))
+    for entry in config.get("backtest", []):
+        if entry["strategy_name"] == strategy_name:
+            base_config.update(entry)
+            break
+    base_config.pop("test_name", None)
+    base_config["strategy_name"] = strategy_name
+    return base_config
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strategy", required=True)
+    parser.add_argument("--param", action="append", default=[],
+                        help="name=v1,v2,... values to sweep. Can be repeated, the grid is their cross product")
+    parser.add_argument("--backtest-start-date", default=None,
+                        help="used unless backtest_start_date is part of the grid. Defaults to the one in config.json, "
+                             "or 01-01-2010")
+    parser.add_argument("--sort-by", default="cagr", choices=METRICS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    base_config = get_base_config(Config.load_config(), args.strategy)
+    if args.backtest_start_date:
+        base_config["backtest_start_date"] = args.backtest_start_date
+    base_config.setdefault("backtest_start_date", "01-01-2010")
+    sm: StrategyManager = StrategyManager.get_instance()
+    results = sm.sweep(args.strategy, base_config, parse_grid(args.param), args.sort_by, args.workers)
+    results.to_csv(args.output, index=False)
+    print(results.head(20).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 BASE_URL = "https://www.nseindia.com"
 BASE_URL_ARCHIVES = "https://archives.nseindia.com"
 BASE_URL_NSE1 = "https://www1.nseindia.com"
+HISTORICAL_INDICES = "/products/dynaContent/equities/indices/historicalindices.jsp"
+HISTORICAL_PE_PB = "/products/dynaContent/equities/indices/historical_pepb.jsp"
 API_CONTEXT = "/api"
 JSON_CONTEXT = "/json"
 CONTENT_CONTEXT = "/content"
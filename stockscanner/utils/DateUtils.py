@@ -1,3 +1,20 @@
+from datetime import timedelta
+
+from stockscanner.utils.ProfileUtils import profiler
+
+
+@profiler.timed("date_filter")
 def get_df_between_dates(df, start_date, end_date):
     mask = (df['Date'] >= start_date.strftime("%d-%b-%Y")) & (df['Date'] < (end_date).strftime("%d-%b-%Y"))
-    return df.loc[mask]
\ No newline at end of file
+    return df.loc[mask]
+
+
+def merge_date_ranges(ranges):
+    # overlapping or adjacent (start, end) ranges become one
+    result = []
+    for start, end in sorted(ranges):
+        if result and start <= result[-1][1] + timedelta(1):
+            result[-1] = (result[-1][0], max(result[-1][1], end))
+        else:
+            result.append((start, end))
+    return result
@@ -1,6 +1,13 @@
+import threading
+import time
+
 import requests
 import logging
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from stockscanner.model.config import Config
 from stockscanner.utils import Constants
 
 logger = logging.getLogger(__name__)
@@ -12,25 +19,122 @@ headers = {
     'accept-encoding': 'gzip, deflate, br',
 }
 
-cookies = {}
+
+class SessionManager:
+    """
+    One keep-alive requests.Session shared by every thread. Connections are pooled per host (at most
+    `max_connections_per_host` open at a time), connections that fail to open are retried with backoff and the
+    NSE cookies are refreshed when they expire or the server answers 401/403. Error responses are not retried
+    here: the downloader retries them through its rate limiter.
+    """
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance():
+        if SessionManager.__instance is None:
+            with SessionManager.__instance_lock:
+                if SessionManager.__instance is None:
+                    config = Config.load_config()
+                    options = dict(config.get("http", {}))
+                    # cookies come from the same host the data is fetched from
+                    options.setdefault("cookie_url", config.get("nse", {}).get("base_url", Constants.BASE_URL_NSE1))
+                    SessionManager.__instance = SessionManager(**options)
+        return SessionManager.__instance
+
+    @staticmethod
+    def reset():
+        # closes the shared session. The next get_instance builds a new one from the current config
+        with SessionManager.__instance_lock:
+            if SessionManager.__instance is not None:
+                SessionManager.__instance.close()
+                SessionManager.__instance = None
+
+    def __init__(self, max_hosts=10, max_connections_per_host=4, retries=3, backoff=0.5, cookie_ttl=600,
+                 timeout=30, cookie_url=Constants.BASE_URL_NSE1) -> None:
+        self.timeout = timeout
+        self.cookie_ttl = cookie_ttl
+        self.cookie_url = cookie_url
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        # only requests that never reached the server are retried here, so these retries don't spend the
+        # downloader's requests_per_sec budget or multiply with its own retries
+        retry = Retry(total=retries, connect=retries, read=0, status=0, status_forcelist=[],
+                      backoff_factor=backoff, allowed_methods=["GET"], raise_on_status=False)
+        # pool_block makes callers wait for a free connection instead of opening more than the per host limit
+        self.adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_connections_per_host,
+                                   pool_block=True, max_retries=retry)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.cookies_fetched_at = None
+        self.cookie_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.cookie_refreshes = 0
+
+    def refresh_cookies(self, force=False):
+        with self.cookie_lock:
+            fresh = self.cookies_fetched_at is not None and time.monotonic() - self.cookies_fetched_at < self.cookie_ttl
+            if fresh and not force:
+                return
+            # the cookies set by the landing page end up in the session's cookie jar
+            self.session.get(self.cookie_url, timeout=self.timeout).close()
+            self.cookies_fetched_at = time.monotonic()
+            self.cookie_refreshes += 1
+            logger.info("Cookies are fetched")
+
+    def get(self, url, params=None, **kwargs) -> requests.Response:
+        self.refresh_cookies()
+        response = self.__get(url, params, **kwargs)
+        if response.status_code in (401, 403):
+            response.close()
+            logger.info(f"Got {response.status_code} from {url}. Refreshing cookies")
+            self.refresh_cookies(force=True)
+            response = self.__get(url, params, **kwargs)
+        return response
+
+    def __get(self, url, params, **kwargs) -> requests.Response:
+        with self.stats_lock:
+            self.requests += 1
+        return self.session.get(url, params=params, timeout=self.timeout, **kwargs)
+
+    def get_cookies(self) -> dict:
+        self.refresh_cookies()
+        return self.session.cookies.get_dict()
+
+    def get_stats(self) -> dict:
+        # urllib3 counts the connections each host pool opened and the requests it sent over them
+        connections = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+        return {
+            "requests": self.requests,
+            "cookie_refreshes": self.cookie_refreshes,
+            "connections_opened": connections,
+            "pool_requests": pool_requests,
+            "reused_connections": max(pool_requests - connections, 0),
+        }
+
+    def close(self):
+        self.session.close()
 
 
 def get_Cookies():
-    global cookies
-    if len(cookies) == 0:
-        session = requests.Session()
-        dummy_response_to_get_cookies = session.get(Constants.BASE_URL_NSE1, headers=headers, timeout=30)
-        logger.info("Cookies are fetched")
-        cookies = dict(dummy_response_to_get_cookies.cookies)
-    return cookies
+    return SessionManager.get_instance().get_cookies()
 
 
 def do_get(url, query_parameters={}):
-    response = requests.get(url, params=query_parameters, headers=headers, timeout=30, cookies=get_Cookies())
+    response = SessionManager.get_instance().get(url, params=query_parameters)
     if 200 <= response.status_code < 300:
         content = response.text
         response.close()
         return content
+    response.close()
 
 
 def do_post():
@@ -38,6 +142,7 @@ def do_post():
 
 
 def download_file(url, query_param={}):
-    with requests.Session() as s:
-        response = s.get(url, params=query_param, headers=headers, cookies=get_Cookies(), timeout=30)
-    return response.content
+    response = SessionManager.get_instance().get(url, params=query_param)
+    content = response.content
+    response.close()
+    return content
@@ -0,0 +1,178 @@
+import cProfile
+import functools
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+NULL_STAGE = nullcontext()
+
+
+class ProfileResult:
+    """
+    What one profiled run measured: calls and seconds per stage, counters, wall time and peak traced memory.
+    Stage times are inclusive, a rebalance includes the valuations it does.
+    """
+
+    def __init__(self, name: str, stages: Dict[str, list], counters: Dict[str, int], elapsed: float,
+                 peak_memory: int = None, cprofile_output: str = None) -> None:
+        self.name = name
+        self.stages = stages
+        self.counters = counters
+        self.elapsed = elapsed
+        self.peak_memory = peak_memory
+        self.cprofile_output = cprofile_output
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "elapsed": self.elapsed,
+            "peak_memory": self.peak_memory,
+            "stages": {stage: {"calls": calls, "seconds": seconds} for stage, (calls, seconds) in self.stages.items()},
+            "counters": dict(self.counters),
+            "cprofile_output": self.cprofile_output,
+        }
+
+    def format(self) -> str:
+        lines = [f"{self.name}: {self.elapsed * 1000:.1f} ms"
+                 + (f", peak memory {self.peak_memory / 2 ** 20:.1f} MiB" if self.peak_memory is not None else "")]
+        for stage, (calls, seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            share = seconds / self.elapsed * 100 if self.elapsed else 0
+            lines.append(f"  {stage:<28} {calls:8d} calls {seconds * 1000:10.1f} ms {share:6.1f}%  "
+                         f"{seconds / calls * 1e6:9.1f} us/call")
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"  {counter:<28} {value:8d}")
+        if self.cprofile_output:
+            lines.append(f"  cProfile stats written to {self.cprofile_output}")
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+
+class Timer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Stage timers and counters for the backtests. Off by default: a disabled stage is a shared no-op context and
+    a disabled counter returns right away, so the instrumented code pays next to nothing outside profiling.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.stages: Dict[str, list] = {}
+        self.counters: Dict[str, int] = {}
+
+    def stage(self, name: str):
+        return Timer(self, name) if self.enabled else NULL_STAGE
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [1, seconds]
+            else:
+                stage[0] += 1
+                stage[1] += seconds
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed(self, name: str):
+        # decorator for a function that is a stage on its own
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with Timer(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument(self, obj, prefix: str):
+        # times every method called on obj as "<prefix>.<method>". Used for the DAO the backtests read from
+        return InstrumentedProxy(self, obj, prefix)
+
+    @contextmanager
+    def profile(self, name: str, memory: bool = True, cprofile_output: str = None):
+        """
+        Profiles the block. The ProfileResult it yields is filled in when the block exits.
+        With cprofile_output the block also runs under cProfile and the stats are dumped to that file, which
+        snakeviz, flameprof or gprof2dot read.
+        """
+        result = ProfileResult(name, {}, {}, 0)
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if memory:
+            tracemalloc.reset_peak()
+        cprofile = cProfile.Profile() if cprofile_output else None
+        self.enabled = True
+        start = time.perf_counter()
+        if cprofile:
+            cprofile.enable()
+        try:
+            yield result
+        finally:
+            if cprofile:
+                cprofile.disable()
+            result.elapsed = time.perf_counter() - start
+            self.enabled = False
+            if memory:
+                result.peak_memory = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            if cprofile:
+                cprofile.dump_stats(cprofile_output)
+                result.cprofile_output = cprofile_output
+            with self.lock:
+                result.stages = self.stages
+                result.counters = self.counters
+                self.stages = {}
+                self.counters = {}
+
+
+class InstrumentedProxy:
+    def __init__(self, profiler: Profiler, obj, prefix: str) -> None:
+        self.__profiler = profiler
+        self.__obj = obj
+        self.__prefix = prefix
+
+    def __getattr__(self, item):
+        attr = getattr(self.__obj, item)
+        if not callable(attr):
+            return attr
+        name = f"{self.__prefix}.{item}"
+        profiler = self.__profiler
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            with profiler.stage(name):
+                return attr(*args, **kwargs)
+        return wrapper
+
+
+profiler = Profiler()
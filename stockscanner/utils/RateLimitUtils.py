@@ -0,0 +1,62 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts of up to `capacity`. Shared across threads."""
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        if rate <= 0:
+            raise Exception("rate should be a positive number")
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __take(self, tokens: float) -> float:
+        # takes the tokens if they are there and returns 0, otherwise the seconds until they will be. Needs the lock.
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        while True:
+            with self.lock:
+                wait = self.__take(tokens)
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self.lock:
+            return self.__take(tokens) == 0
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    # "full jitter": a random delay up to the exponential backoff so that retrying workers don't move in lockstep
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry(fn, retries: int = 3, base_delay: float = 1, max_delay: float = 30, limiter: TokenBucket = None):
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"Attempt {attempt + 1} failed: {e}. Retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1